@@ -0,0 +1,1410 @@
+"""Offline benchmarks for the assistant's hot paths, run against the local stand-ins in fakes.py.
+
+Usage: python benchmarks.py <name> [...]   (python benchmarks.py --help lists them)
+       python benchmarks.py replay --report run.json --baseline previous.json
+"""
+import argparse
+import contextlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from fakes import FakeGmailService, make_fake_summarizer, make_gmail_message
+
+# Set BENCH_REAL_MODELS=1 to benchmark the real models instead of the CPU-bound stand-ins
+REAL_MODELS = os.getenv("BENCH_REAL_MODELS") == "1"
+
+BENCHMARKS = {}
+RESULTS = []  # every _report() row of this run, for --report
+_current = [None]  # name of the running benchmark
+
+
+def benchmark(func):
+    """Register a benchmark under its function name (minus the bench_ prefix)."""
+    BENCHMARKS[func.__name__[len("bench_"):]] = func
+    return func
+
+
+def _report(label, elapsed, count, **extra):
+    rate = count / elapsed if elapsed else float("inf")
+    RESULTS.append({"benchmark": _current[0], "label": label, "elapsed_ms": round(elapsed * 1000, 3), "count": count,
+                    "rate": round(rate, 1) if elapsed else None, **extra})
+    details = "".join(f"  {key}={value}" for key, value in extra.items())
+    print(f"{label:<40} {elapsed * 1000:>10.1f} ms  {rate:>12.0f} items/s{details}")
+
+
+def _gmail_corpus(n):
+    return [make_gmail_message(f"m{i}", f"Subject {i}", f"user{i}@example.com", f"Body of message {i}. " * 20)
+            for i in range(n)]
+
+
+@benchmark
+def bench_gmail_fetch(latency=0.002):
+    """Round trips and wall time: legacy double-get vs batched vs threaded retrieval."""
+    from gmail_fetch import fetch_emails, get_header
+    from mime_body import extract_body
+
+    for n in (10, 100, 1000):
+        ids = [f"m{i}" for i in range(n)]
+
+        service = FakeGmailService(_gmail_corpus(n), latency=latency)
+        start = time.perf_counter()
+        for msg_id in ids:
+            # Legacy path: one get for the headers, a second one for the body
+            headers = service.users().messages().get(userId="me", id=msg_id).execute()["payload"]["headers"]
+            get_header(headers, "Subject", "No Subject")
+            extract_body(service.users().messages().get(userId="me", id=msg_id).execute()["payload"])
+        _report(f"legacy double get (n={n})", time.perf_counter() - start, n, round_trips=service.round_trips)
+
+        service = FakeGmailService(_gmail_corpus(n), latency=latency)
+        start = time.perf_counter()
+        fetch_emails(service, ids)
+        _report(f"batched (n={n})", time.perf_counter() - start, n, round_trips=service.round_trips)
+
+        service = FakeGmailService(_gmail_corpus(n), latency=latency)
+        start = time.perf_counter()
+        fetch_emails(service, ids, max_workers=8, service_factory=lambda: service)
+        _report(f"thread pool x8 (n={n})", time.perf_counter() - start, n, round_trips=service.round_trips)
+
+
+@benchmark
+def bench_gmail_sync(mailbox=5000, new_per_run=5):
+    """Round trips per run: full listing vs incremental history sync in steady state."""
+    import sqlite3
+    from gmail_fetch import fetch_emails
+    from gmail_sync import GmailSync
+
+    service = FakeGmailService(_gmail_corpus(mailbox))
+    sync = GmailSync(sqlite3.connect(":memory:"), full_sync_limit=mailbox)
+
+    for run in range(4):
+        for i in range(new_per_run if run else 0):
+            service.add_message(make_gmail_message(f"n{run}-{i}", "New mail", "new@example.com", "Fresh body"))
+        service.round_trips = 0
+        start = time.perf_counter()
+        ids = sync.pending_message_ids(service)
+        emails = fetch_emails(service, ids)
+        sync.commit(emails)
+        label = "initial full sync" if run == 0 else f"incremental run {run}"
+        _report(label, time.perf_counter() - start, len(emails), round_trips=service.round_trips)
+
+    for i in range(new_per_run):
+        service.add_message(make_gmail_message(f"late-{i}", "Late mail", "new@example.com", "Fresh body"))
+    service.expire_history()
+    service.round_trips = 0
+    start = time.perf_counter()
+    ids = sync.pending_message_ids(service)
+    sync.commit(fetch_emails(service, ids))
+    _report("resync after expired history", time.perf_counter() - start, len(ids), round_trips=service.round_trips)
+
+    # A get that fails inside a batch must not be skipped when the cursor moves on
+    service.add_message(make_gmail_message("retry-b", "Mail", "new@example.com", "Body"))
+    service.add_message(make_gmail_message("retry-c", "Mail", "new@example.com", "Body"))
+    service.failing.add("retry-c")
+    ids = sync.pending_message_ids(service)
+    assert ids == ["retry-c", "retry-b"], ids
+    sync.commit(fetch_emails(service, ids))
+    service.failing.clear()
+    ids = sync.pending_message_ids(service)
+    assert ids == ["retry-c"], ids
+    sync.commit(fetch_emails(service, ids))
+    assert sync.pending_message_ids(service) == [] and "retry-c" in sync.processed
+    print(f"{'failed get retried on the next run':<40} ok")
+
+
+@benchmark
+def bench_summarize(n=200):
+    """Summaries per second: one pipeline call per email vs bucketed batches vs cache hits."""
+    from summary_engine import SummaryEngine, load_pipeline, summary_max_length
+
+    factory = load_pipeline if REAL_MODELS else make_fake_summarizer
+    bodies = [f"Email {i} about the quarterly report and next steps. " * (1 + i % 12) for i in range(n)]
+    summarizer = factory()
+
+    start = time.perf_counter()
+    for body in bodies:
+        summarizer(body, max_length=summary_max_length(body), min_length=5, do_sample=False)
+    _report("per-email pipeline calls", time.perf_counter() - start, n)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = SummaryEngine(pipeline=summarizer, cache_path=os.path.join(tmp, "cache.json"), batch_size=16)
+        start = time.perf_counter()
+        engine.summarize_many(bodies)
+        _report("batched engine, cold cache", time.perf_counter() - start, n)
+
+        start = time.perf_counter()
+        SummaryEngine(pipeline=summarizer, cache_path=os.path.join(tmp, "cache.json")).summarize_many(bodies)
+        _report("batched engine, cache loaded from disk", time.perf_counter() - start, n)
+
+        workers = os.cpu_count() or 1
+        engine = SummaryEngine(pipeline_factory=factory, cache_path=None, batch_size=16, processes=workers)
+        engine.summarize_many(bodies[:1])  # start the workers outside the timing
+        start = time.perf_counter()
+        engine.summarize_many(bodies[1:])
+        _report(f"batched engine, {workers} processes", time.perf_counter() - start, n - 1)
+        engine.close()
+
+
+@benchmark
+def bench_import_time():
+    """Cold import time of each bot module in a fresh interpreter (models must stay unloaded)."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    for module in ("gmail_bot", "slack_bot", "whatsapp_bot"):
+        code = f"import time; start = time.perf_counter(); import {module}; print(time.perf_counter() - start)"
+        result = subprocess.run([sys.executable, "-c", code], cwd=here, capture_output=True, text=True)
+        if result.returncode != 0:
+            error = result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "unknown error"
+            print(f"{module:<40} ⚠️ import failed: {error}")
+            continue
+        elapsed = float(result.stdout.strip().splitlines()[-1])
+        verdict = "✅" if elapsed < 1.0 else "❌"
+        print(f"{module:<40} {elapsed * 1000:>10.1f} ms  {verdict}")
+
+
+def _synthetic_intents(n):
+    words = ["invoice", "meeting", "deadline", "refund", "shipping", "password", "contract", "schedule",
+             "payment", "report", "budget", "access", "account", "order", "delivery", "review"]
+    return [{"intent": f"intent-{i}", "text": f"{words[i % 16]} {words[(i // 16) % 16]} topic{i}",
+             "replies": [f"Reply for intent {i}"]} for i in range(n)]
+
+
+@benchmark
+def bench_reply_index(catalog_size=2000):
+    """Emails per second: per-call TF-IDF transform + cosine vs the precomputed batched index."""
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.metrics.pairwise import cosine_similarity
+    from reply_index import ReplyIndex
+
+    # The shipped catalog must still match everyday emails, whatever else they say
+    shipped = ReplyIndex.from_file(os.path.join(os.path.dirname(os.path.abspath(__file__)), "responses.json"))
+    typical = {
+        "meeting": "Hi team, can we schedule a meeting next week to go over the roadmap?",
+        "urgent": "This is urgent: the production server is down and customers are affected.",
+        "invoice": "Please find attached the invoice for March; payment is due within 30 days.",
+        "support": "I need support with my account, I cannot log in since yesterday.",
+        "deadline": "Reminder that the deadline for the quarterly report is this Friday.",
+        "thank you": "Thank you for your help with the migration yesterday!",
+    }
+    for intent, email in typical.items():
+        matches = shipped.search([email], k=1)[0]
+        assert matches and matches[0][0] == intent and matches[0][1] > shipped.threshold, (intent, matches)
+    # Equal scores go to the intent listed first in the catalog, as argmax did
+    tied = shipped.search(["asap support hello pay invoice"], k=2)[0]
+    assert [intent for intent, _ in tied] == ["invoice", "support"] and tied[0][1] == tied[1][1], tied
+    print(f"{'shipped catalog':<40} all {len(typical)} intents match typical emails")
+
+    catalog = _synthetic_intents(catalog_size)
+    start = time.perf_counter()
+    index = ReplyIndex(catalog)
+    _report(f"build index ({catalog_size} intents)", time.perf_counter() - start, catalog_size)
+
+    for n in (1000, 10000):
+        emails = [f"Hi, quick question about the {catalog[i % catalog_size]['text']} for next week" for i in range(n)]
+
+        # Legacy path, timed on a sample: transform the email and every category per call
+        queries = [entry["text"] for entry in catalog]
+        vectorizer = TfidfVectorizer().fit(queries)
+        sample = emails[:100]
+        start = time.perf_counter()
+        for email in sample:
+            cosine_similarity(vectorizer.transform([email]), vectorizer.transform(queries)).flatten().argmax()
+        _report(f"per-call TF-IDF (sample of {len(sample)}/{n})", time.perf_counter() - start, len(sample))
+
+        start = time.perf_counter()
+        index.search(emails, k=3)
+        _report(f"batched index top-3 (n={n})", time.perf_counter() - start, n)
+
+    start = time.perf_counter()
+    index.add_many(_synthetic_intents(catalog_size + 100)[catalog_size:])
+    for i in range(100):
+        index.remove(f"intent-{i}")
+    _report("incremental add 100 + remove 100", time.perf_counter() - start, 200)
+
+
+@benchmark
+def bench_rule_engine(n_rules=300, n_subjects=100000):
+    """Subjects per second: per-rule any(keyword in text) scans vs the compiled rule engine."""
+    import random
+    from rule_engine import RuleEngine
+
+    rng = random.Random(7)
+    alphabet = "abcdefghijklmnopqrstuvwxyz"
+    vocab = ["".join(rng.choice(alphabet) for _ in range(rng.randint(4, 9))) for _ in range(5000)]
+    rules = [{"label": f"rule-{i}", "priority": i, "fields": ["subject"], "keywords": rng.sample(vocab, 5)}
+             for i in range(n_rules)]
+    subjects = [" ".join(rng.choice(vocab) for _ in range(8)) for _ in range(n_subjects)]
+
+    sample = subjects[:10000]
+    start = time.perf_counter()
+    for subject in sample:
+        lowered = subject.lower()
+        next((rule["label"] for rule in rules if any(k in lowered for k in rule["keywords"])), None)
+    _report(f"any() scans, {n_rules} rules (sample {len(sample)})", time.perf_counter() - start, len(sample))
+
+    start = time.perf_counter()
+    engine = RuleEngine(rules)
+    _report(f"compile {n_rules} rules", time.perf_counter() - start, n_rules)
+
+    start = time.perf_counter()
+    engine.classify_many({"subject": subject} for subject in subjects)
+    _report(f"compiled engine, batch of {n_subjects}", time.perf_counter() - start, n_subjects)
+
+
+@benchmark
+def bench_tracker(n=100000):
+    """Tracked emails per second: per-row insert + commit vs bulk upserts in one transaction."""
+    import sqlite3
+    from email_tracker import TrackerStore
+
+    rows = [(f"m{i}", f"user{i % 500}@example.com", f"Subject {i}", "General 📩") for i in range(n)]
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = sqlite3.connect(os.path.join(tmp, "legacy.db"))
+        conn.execute("CREATE TABLE unanswered_emails (id INTEGER PRIMARY KEY AUTOINCREMENT, sender TEXT, "
+                     "subject TEXT, category TEXT, timestamp DATETIME DEFAULT CURRENT_TIMESTAMP, reminded INTEGER DEFAULT 0)")
+        sample = rows[:2000]
+        start = time.perf_counter()
+        for _, sender, subject, category in sample:
+            conn.execute("INSERT INTO unanswered_emails (sender, subject, category) VALUES (?, ?, ?)",
+                         (sender, subject, category))
+            conn.commit()
+        _report(f"insert + commit per row (sample {len(sample)})", time.perf_counter() - start, len(sample))
+        conn.close()
+
+        store = TrackerStore(os.path.join(tmp, "tracker.db"))
+        start = time.perf_counter()
+        store.track_many(rows)
+        _report(f"bulk upsert, WAL (n={n})", time.perf_counter() - start, n)
+
+        start = time.perf_counter()
+        store.track_many(rows)
+        _report(f"re-ingest same {n} (dedupe)", time.perf_counter() - start, n, pending=store.pending_count())
+        store.close()
+
+
+@benchmark
+def bench_reminders(n=100000):
+    """Reminders per second: fetchall + per-row UPDATE/commit vs chunked, set-based digests."""
+    import sqlite3
+    from email_tracker import TrackerStore
+    from reminders import FileSink, send_reminders
+
+    rows = [(f"m{i}", f"user{i % 50}@example.com", f"Subject {i}", "General 📩") for i in range(n)]
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_path = os.path.join(tmp, "legacy.db")
+        TrackerStore(legacy_path).track_many(rows[:2000])
+        conn = sqlite3.connect(legacy_path)
+        start = time.perf_counter()
+        for email_id, *_ in conn.execute("SELECT * FROM unanswered_emails WHERE reminded=0").fetchall():
+            conn.execute("UPDATE unanswered_emails SET reminded=1 WHERE id=?", (email_id,))
+            conn.commit()
+        _report("per-row UPDATE + commit (sample 2000)", time.perf_counter() - start, 2000)
+        conn.close()
+
+        store = TrackerStore(os.path.join(tmp, "tracker.db"))
+        store.track_many(rows)
+        sink_path = os.path.join(tmp, "reminders.jsonl")
+        start = time.perf_counter()
+        sent = send_reminders(store, FileSink(sink_path))
+        with open(sink_path, encoding="utf-8") as f:
+            digests = sum(1 for _ in f)
+        _report(f"chunked digests (n={n})", time.perf_counter() - start, sent, digests=digests,
+                pending=store.pending_count())
+        store.close()
+
+
+@benchmark
+def bench_mime_body(n=300):
+    """Bodies per second over large, deeply nested messages: full decode of top-level parts vs bounded walk."""
+    import base64
+    from fakes import make_nested_payload
+    from mime_body import extract_body
+
+    def legacy_extract(payload):
+        body = ""
+        if "parts" in payload:
+            for part in payload["parts"]:
+                if part["mimeType"] == "text/plain":
+                    body = base64.urlsafe_b64decode(part["body"]["data"]).decode("utf-8", errors="ignore")
+                    break
+        elif "body" in payload and "data" in payload["body"]:
+            body = base64.urlsafe_b64decode(payload["body"]["data"]).decode("utf-8", errors="ignore")
+        return body[:1000] if body else "No content available."
+
+    text = "Quarterly numbers are in, please review the attached deck before Friday. " * 4000  # ~300 KB
+    corpus = [make_nested_payload(text, depth=1 + i % 6, html_only=(i % 3 == 0), attachment_size=50000)
+              for i in range(n)]
+    flat = [{"mimeType": "text/plain", "body": {"data": p["parts"][0]["body"]["data"]}}
+            for p in (make_nested_payload(text, depth=1) for _ in range(n))]
+
+    for label, payloads in (("flat single-part", flat), ("nested multipart", corpus)):
+        start = time.perf_counter()
+        found = sum(legacy_extract(p) != "No content available." for p in payloads)
+        _report(f"legacy full decode, {label}", time.perf_counter() - start, n, with_content=found)
+
+        start = time.perf_counter()
+        found = sum(extract_body(p) != "No content available." for p in payloads)
+        _report(f"bounded MIME walk, {label}", time.perf_counter() - start, n, with_content=found)
+
+
+@benchmark
+def bench_gmail_client(calls=50):
+    """Cost of getting a Gmail service: authenticate + build per call vs the cached client manager."""
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+    from fakes import slow_credentials_loader, slow_service_builder
+    from gmail_client import GmailClientManager
+
+    start = time.perf_counter()
+    for _ in range(calls):
+        slow_service_builder(slow_credentials_loader())
+    _report("authenticate_gmail() per call", time.perf_counter() - start, calls)
+
+    manager = GmailClientManager(token_path=None, credentials_loader=slow_credentials_loader,
+                                 service_builder=slow_service_builder, refresher=lambda creds: creds.refresh())
+    start = time.perf_counter()
+    for _ in range(calls):
+        manager.get_service()
+    _report("client manager, one thread", time.perf_counter() - start, calls, services_built=manager.services_built)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        list(pool.map(lambda _: manager.get_service(), range(calls)))
+    _report("client manager, 4 worker threads", time.perf_counter() - start, calls,
+            services_built=manager.services_built)
+
+    # Proactive refresh: a token expiring inside the margin is refreshed by the background thread
+    manager.credentials.lifetime = 1.0
+    manager.credentials.refresh()
+    manager.refresh_margin = 0.5
+    manager.start()
+    deadline = time.perf_counter() + 5
+    while manager.refreshes == 0 and time.perf_counter() < deadline:
+        time.sleep(0.05)
+    manager.stop()
+    print(f"{'background refresh before expiry':<40} refreshes={manager.refreshes} "
+          f"({threading.active_count()} threads alive)")
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))] if ordered else 0.0
+
+
+def _signed_slack_request(secret, body):
+    import hashlib
+    import hmac
+    timestamp = str(int(time.time()))
+    digest = hmac.new(secret.encode(), f"v0:{timestamp}:{body}".encode(), hashlib.sha256).hexdigest()
+    return {"X-Slack-Request-Timestamp": timestamp, "X-Slack-Signature": f"v0={digest}",
+            "Content-Type": "application/json"}
+
+
+@contextlib.contextmanager
+def _isolated_slack_bot():
+    """Point slack_bot at a throwaway database with fresh stores, so runs never touch ./slack_bot.db."""
+    import slack_bot
+    saved = slack_bot.SLACK_DB_PATH
+    names = ("_dispatcher", "_dedupe_store", "_message_store", "_task_store", "_user_directory")
+    with tempfile.TemporaryDirectory() as tmp:
+        slack_bot.SLACK_DB_PATH = os.path.join(tmp, "slack_bot.db")
+        for name in names:
+            setattr(slack_bot, name, None)
+        try:
+            yield slack_bot
+        finally:
+            for name in names:
+                setattr(slack_bot, name, None)
+            slack_bot.SLACK_DB_PATH = saved
+
+
+@benchmark
+def bench_slack_ingest(n=5000, channels=50, work_seconds=0.002):
+    """Flask test-client load test: ack latency of /slack/events with processing on the worker pool."""
+    from slack_worker import EventDispatcher
+
+    seen, out_of_order = {}, [0]
+
+    def slow_handler(event):
+        # Stands in for users_info + spaCy + chat_postMessage
+        seq = int(event["ts"].split(".")[1])
+        if seq < seen.get(event["channel"], -1):
+            out_of_order[0] += 1
+        seen[event["channel"]] = seq
+        time.sleep(work_seconds)
+
+    with _isolated_slack_bot() as slack_bot:
+        saved_secret = slack_bot.SLACK_SIGNING_SECRET
+        slack_bot.SLACK_SIGNING_SECRET = "bench-secret"
+        slack_bot._dispatcher = EventDispatcher(slow_handler, workers=8, max_queue=n)
+        client = slack_bot.app.test_client()
+
+        latencies = []
+        start = time.perf_counter()
+        for i in range(n):
+            body = json.dumps({"event": {"type": "message", "user": "U1", "text": f"task {i}",
+                                         "channel": f"C{i % channels}", "ts": f"1700000000.{i:06d}"}})
+            headers = _signed_slack_request("bench-secret", body)
+            sent = time.perf_counter()
+            response = client.post("/slack/events", data=body, headers=headers)
+            latencies.append(time.perf_counter() - sent)
+            assert response.status_code == 200, response.status_code
+        elapsed = time.perf_counter() - start
+        _report(f"acked {n} events", elapsed, n, p50_ms=round(_percentile(latencies, 50) * 1000, 2),
+                p99_ms=round(_percentile(latencies, 99) * 1000, 2))
+
+        print(f"{'queue after ingest':<40} {slack_bot._dispatcher.stats()}")
+        slack_bot._dispatcher.join()
+        _report("drained by 8 workers", time.perf_counter() - start, n, out_of_order=out_of_order[0])
+        stats = slack_bot._dispatcher.stats()
+        slack_bot._dispatcher.stop()
+        slack_bot.SLACK_SIGNING_SECRET = saved_secret
+    assert stats["submitted"] == stats["processed"] == n, stats
+    assert out_of_order[0] == 0, f"{out_of_order[0]} events handled out of channel order"
+
+
+@benchmark
+def bench_user_directory(users=2000, lookups=20000, latency=0.001):
+    """users_info round trips for a busy workspace: direct calls vs the cached, coalescing directory."""
+    import random
+    from concurrent.futures import ThreadPoolExecutor
+    from fakes import FakeSlackClient, make_slack_users
+    from slack_users import UserDirectory
+
+    rng = random.Random(1)
+    # Chat traffic is skewed: a few people write most messages
+    ids = [f"U{min(int(rng.paretovariate(1.2)) - 1, users - 1):05d}" for _ in range(lookups)]
+
+    client = FakeSlackClient(make_slack_users(users), latency=latency)
+    sample = ids[:2000]
+    start = time.perf_counter()
+    for user_id in sample:
+        client.users_info(user=user_id)["user"].get("real_name")
+    _report(f"users_info per event (sample {len(sample)})", time.perf_counter() - start, len(sample),
+            api_calls=client.calls["users_info"])
+
+    client = FakeSlackClient(make_slack_users(users), latency=latency)
+    directory = UserDirectory(client)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(directory.get_name, ids))
+    _report(f"cold cache, 8 threads (n={lookups})", time.perf_counter() - start, lookups, **directory.stats())
+
+    with tempfile.TemporaryDirectory() as tmp:
+        client = FakeSlackClient(make_slack_users(users), latency=latency)
+        directory = UserDirectory(client, db_path=os.path.join(tmp, "users.db"))
+        start = time.perf_counter()
+        directory.prewarm()
+        for user_id in ids:
+            directory.get_name(user_id)
+        _report(f"prewarmed via users_list (n={lookups})", time.perf_counter() - start, lookups, **directory.stats())
+
+        restarted = UserDirectory(FakeSlackClient(make_slack_users(users)), db_path=os.path.join(tmp, "users.db"))
+        for user_id in ids:
+            restarted.get_name(user_id)
+        print(f"{'after restart, warm from SQLite':<40} {restarted.stats()}")
+
+
+@benchmark
+def bench_dedupe_memory(events=1000000, rate=200):
+    """Memory over a simulated long run (200 events/s): unbounded set of ts vs the time-bucketed store."""
+    import tracemalloc
+    from dedupe_store import DedupeStore
+
+    clock = [0.0]
+    store = DedupeStore(window=3600, clock=lambda: clock[0])
+    legacy = set()
+
+    for label, record in (("unbounded set", legacy.add), ("time-bucketed store", store.check_and_add)):
+        tracemalloc.start()
+        start = time.perf_counter()
+        for i in range(events):
+            clock[0] = i / rate
+            record(f"C{i % 40}:{1700000000 + i / rate:.6f}")
+            if (i + 1) % (events // 4) == 0:
+                current, peak = tracemalloc.get_traced_memory()
+                hours = (i + 1) / rate / 3600
+                print(f"{label:<28} after {hours:5.2f} h: {current / 1e6:7.1f} MB (peak {peak / 1e6:.1f} MB)")
+        elapsed = time.perf_counter() - start
+        tracemalloc.stop()
+        _report(f"{label} total", elapsed, events)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "dedupe.db")
+        store = DedupeStore(window=3600, db_path=path)
+        for i in range(5000):
+            store.check_and_add(f"Ev{i}")
+        store.flush()
+        restarted = DedupeStore(window=3600, db_path=path)
+        retried = sum(not restarted.check_and_add(f"Ev{i}") for i in range(5000))
+        print(f"{'retries caught after restart':<40} {retried}/5000")
+
+
+def _chat_corpus(n):
+    subjects = ["The marketing team", "Our new dashboard", "The Q3 budget", "Priya", "The release checklist",
+                "Customer onboarding", "The API migration", "Design review"]
+    verbs = ["needs an update before", "was discussed during", "should be ready for", "blocks"]
+    objects = ["the Friday demo", "next sprint planning", "the board meeting", "the launch"]
+    return [f"{subjects[i % 8]} {verbs[i % 4]} {objects[(i // 3) % 4]}, can someone follow up with {subjects[(i + 3) % 8]}?"
+            for i in range(n)]
+
+
+@benchmark
+def bench_keyphrases(n=2000):
+    """Messages per second: full pipeline one message at a time vs trimmed pipeline through nlp.pipe."""
+    from concurrent.futures import ThreadPoolExecutor
+    from keyphrases import KeyphraseExtractor, load_trimmed_nlp, rank_keyphrases
+
+    try:
+        import spacy
+        full_nlp = spacy.load("en_core_web_sm")
+        trimmed_factory = load_trimmed_nlp
+        print("using spaCy en_core_web_sm")
+    except (ImportError, OSError):
+        from fakes import FakeNLP, make_fake_trimmed_nlp
+        full_nlp, trimmed_factory = FakeNLP(), make_fake_trimmed_nlp
+        print("spaCy model not installed, using the CPU-bound stand-in")
+
+    corpus = _chat_corpus(n)
+    start = time.perf_counter()
+    for text in corpus:
+        ", ".join(set(chunk.text for chunk in full_nlp(text).noun_chunks))
+    _report("full pipeline, one nlp() call each", time.perf_counter() - start, n)
+
+    extractor = KeyphraseExtractor(nlp_factory=trimmed_factory, batch_size=64)
+    extractor.nlp  # load outside the timing
+    start = time.perf_counter()
+    extractor.extract_many(corpus)
+    _report("trimmed pipeline, nlp.pipe batches of 64", time.perf_counter() - start, n)
+
+    for threads in (4, 16):  # 4 is the Slack bot's default worker count
+        extractor = KeyphraseExtractor(nlp_factory=trimmed_factory, batch_size=64)
+        extractor.nlp
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            list(pool.map(extractor.extract, corpus))
+        _report(f"micro-batched extract() from {threads} threads", time.perf_counter() - start, n,
+                **extractor.stats())
+
+    print(f"{'ranked keyphrases':<40} {rank_keyphrases(full_nlp(corpus[0]))}")
+
+
+@benchmark
+def bench_digest(channels=6, per_channel=3000, latency=0.02):
+    """Daily digest over busy channels: first page + one prompt vs paginated map-reduce in parallel."""
+    from digest import CHUNK_PROMPT, DIGEST_PROMPT, DigestEngine
+    from fakes import FakeGeminiModel, FakeSlackClient
+
+    client = FakeSlackClient(latency=0.005)
+    corpus = _chat_corpus(per_channel)
+    for c in range(channels):
+        client.history[f"C{c}"] = [{"ts": f"{1700000000 + i}.000100", "user": "U1", "text": text}
+                                   for i, text in enumerate(corpus)]
+
+    model = FakeGeminiModel(latency=latency, max_prompt_tokens=30000)
+    start = time.perf_counter()
+    covered = 0
+    for c in range(channels):
+        messages = [m["text"] for m in client.conversations_history(channel=f"C{c}", oldest="0")["messages"]]
+        covered += len(messages)
+        try:
+            model.generate_content(f"{DIGEST_PROMPT}{messages}")
+        except ValueError as e:
+            print(f"⚠️ {e}")
+    _report("legacy: first page, one prompt each", time.perf_counter() - start, channels,
+            messages_covered=covered, llm_calls=model.calls)
+
+    model = FakeGeminiModel(latency=latency, max_prompt_tokens=30000)
+    client.calls.clear()
+    engine = DigestEngine(lambda prompt: model.generate_content(prompt).text, chunk_tokens=4000, fan_in=4)
+    start = time.perf_counter()
+    digests = engine.digest_channels(client, [f"C{c}" for c in range(channels)], oldest="0")
+    failures = [c for c, summary in digests.items() if isinstance(summary, Exception)]
+    covered = sum(p.count("\n- ") for p in model.prompts if p.startswith((CHUNK_PROMPT, DIGEST_PROMPT)))
+    _report("map-reduce, all pages, 4 channels at once", time.perf_counter() - start, channels,
+            messages_covered=covered, llm_calls=model.calls, history_pages=client.calls["conversations_history"],
+            failures=len(failures))
+    assert sorted(digests) == [f"C{c}" for c in range(channels)] and not failures, failures
+    assert covered >= channels * per_channel, f"only {covered} of {channels * per_channel} messages reached a prompt"
+
+
+@benchmark
+def bench_llm_gateway(requests=400, distinct=60, threads=8, latency=0.02):
+    """Gemini calls from 8 threads with repeated prompts: direct calls vs the shared gateway."""
+    import random
+    from concurrent.futures import ThreadPoolExecutor
+    from fakes import FakeGeminiModel
+    from llm_gateway import LLMGateway
+
+    rng = random.Random(7)
+    prompts = [f"Summarize this text: question {rng.randrange(distinct)} about the order status"
+               for _ in range(requests)]
+
+    model = FakeGeminiModel(latency=latency, fail_every=25)
+    errors = []
+
+    def direct(prompt):
+        try:
+            return model.generate_content(prompt).text
+        except Exception as e:
+            errors.append(e)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        list(pool.map(direct, prompts))
+    _report("direct generate_content", time.perf_counter() - start, requests,
+            model_calls=model.calls, errors=len(errors))
+
+    model = FakeGeminiModel(latency=latency, fail_every=25)
+    gateway = LLMGateway(lambda name: model, rate_per_minute=60000, max_concurrency=4, backoff=0.01)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        results = list(pool.map(gateway.generate, prompts))
+    stats = gateway.stats()
+    _report("gateway (cache + coalescing + retries)", time.perf_counter() - start, requests,
+            model_calls=model.calls, cache_hits=stats["cache_hits"], coalesced=stats["coalesced"],
+            retries=stats["retries"], errors=sum(r is None for r in results), p95_ms=stats["latency_p95_ms"])
+
+    model = FakeGeminiModel()
+    gateway = LLMGateway(lambda name: model, rate_per_minute=1200, max_concurrency=4)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        list(pool.map(gateway.generate, [f"prompt {i}" for i in range(40)]))
+    _report("rate limit 20/s (burst 20), 40 prompts", time.perf_counter() - start, 40,
+            rate_limited_seconds=gateway.stats()["rate_limited_seconds"])
+
+
+@benchmark
+def bench_slack_store(channels=3, per_channel=4000, search_corpus=100000):
+    """Digest API traffic with and without the local message store, then FTS5 search vs a LIKE scan."""
+    import random
+    import sqlite3
+    from digest import iter_channel_messages
+    from fakes import FakeSlackClient
+    from slack_store import MessageStore
+
+    t0 = 1700000000.0
+    now = [t0]
+    client = FakeSlackClient(latency=0.005)
+    corpus = _chat_corpus(per_channel)
+    for c in range(channels):
+        client.history[f"C{c}"] = []
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = MessageStore(os.path.join(tmp, "slack.db"), clock=lambda: now[0])
+        for c in range(channels):
+            store.sync_channel(client, f"C{c}", oldest=t0 - 60)  # startup catch-up, channel still empty
+
+        # A day of traffic: every message reaches Slack's history and arrives as a live event
+        start = time.perf_counter()
+        for i, text in enumerate(corpus):
+            now[0] = t0 + i + 1
+            for c in range(channels):
+                message = {"type": "message", "channel": f"C{c}", "user": "U1", "ts": f"{now[0]:.6f}", "text": text}
+                client.history[f"C{c}"].append(message)
+                store.add_event(message)
+        _report("live events stored", time.perf_counter() - start, channels * per_channel)
+        now[0] += 1
+
+        client.calls.clear()
+        start = time.perf_counter()
+        for c in range(channels):
+            texts = [m["text"] for m in iter_channel_messages(client, f"C{c}", str(t0 - 60))]
+        _report("digest input from the API", time.perf_counter() - start, channels,
+                history_pages=client.calls["conversations_history"])
+
+        client.calls.clear()
+        start = time.perf_counter()
+        for c in range(channels):
+            store.sync_channel(client, f"C{c}", t0 - 60)
+            texts = store.texts(f"C{c}", t0 - 60)
+        _report("digest input from the store", time.perf_counter() - start, channels,
+                history_pages=client.calls["conversations_history"], messages=len(texts))
+
+        rng = random.Random(3)
+        vocab = [f"term{k}" for k in range(20000)]
+        conn = sqlite3.connect(os.path.join(tmp, "search.db"))
+        conn.execute("CREATE TABLE plain (text TEXT)")
+        search_store = MessageStore(os.path.join(tmp, "search.db"))
+        rows = [{"ts": f"{t0 + i:.6f}", "user": "U1", "text": " ".join(rng.choices(vocab, k=12))}
+                for i in range(search_corpus)]
+        search_store.add_messages("C0", rows)
+        with conn:
+            conn.executemany("INSERT INTO plain VALUES (?)", [(r["text"],) for r in rows])
+        queries = [" ".join(rng.sample(rows[rng.randrange(search_corpus)]["text"].split(), 2)) for _ in range(50)]
+
+        start = time.perf_counter()
+        for q in queries:
+            a, b = q.split()
+            conn.execute("SELECT text FROM plain WHERE text LIKE ? AND text LIKE ? LIMIT 20",
+                         (f"%{a}%", f"%{b}%")).fetchall()
+        _report("LIKE scan", time.perf_counter() - start, len(queries), rows=search_corpus)
+
+        start = time.perf_counter()
+        hits = sum(len(search_store.search(q)) for q in queries)
+        _report("FTS5 search", time.perf_counter() - start, len(queries), rows=search_corpus, hits=hits)
+        conn.close()
+        store.close()
+        search_store.close()
+
+
+@benchmark
+def bench_socket_mode(n=3000, channels=50, work_seconds=0.002):
+    """Socket Mode intake against a local websocket stand-in: ack rate, reconnects, redelivery and shutdown."""
+    import asyncio
+    from fakes import FakeSocketModeServer
+    from slack_socket import SocketModeIngestor
+    from slack_worker import EventDispatcher
+
+    def payloads(prefix):
+        return [{"event_id": f"{prefix}{i}", "event": {"type": "message", "user": "U1", "text": f"task {i}",
+                                                        "channel": f"C{i % channels}", "ts": f"1700000000.{i:06d}"}}
+                for i in range(n)]
+
+    def run(server, concurrency, stop_when):
+        ingestor = SocketModeIngestor(server.connect, lambda payload: slack_bot.ingest_event(payload) != "busy",
+                                      max_concurrency=concurrency, should_run=lambda: not stop_when(),
+                                      poll_interval=0.05, reconnect_delay=0.01)
+        start = time.perf_counter()
+        asyncio.run(ingestor.run())
+        return time.perf_counter() - start, ingestor.stats()
+
+    with _isolated_slack_bot() as slack_bot:
+        for concurrency in (1, 8):
+            slack_bot._dispatcher = EventDispatcher(lambda event: time.sleep(work_seconds), workers=8, max_queue=n)
+            server = FakeSocketModeServer(payloads(f"Ev{concurrency}-"), disconnect_every=1000)
+            elapsed, stats = run(server, concurrency, server.done)
+            _report(f"acked, {concurrency} handler(s) in flight", elapsed, n, connections=server.connections,
+                    redelivered=server.delivered - n)
+            slack_bot._dispatcher.join()
+            slack_bot._dispatcher.stop()
+            assert server.done() and slack_bot._dispatcher.stats()["processed"] == n, slack_bot._dispatcher.stats()
+
+        # Tiny worker queues: rejected envelopes stay unacknowledged and come back on the next connection
+        slack_bot._dispatcher = EventDispatcher(lambda event: time.sleep(work_seconds), workers=2, max_queue=50)
+        server = FakeSocketModeServer(payloads("EvBusy-"), disconnect_every=200)
+        elapsed, stats = run(server, 8, server.done)
+        _report("backpressure via redelivery", elapsed, n, rejected=stats["rejected"], connections=server.connections,
+                all_acked=server.done())
+        slack_bot._dispatcher.stop()
+        assert server.done() and slack_bot._dispatcher.stats()["processed"] == n, slack_bot._dispatcher.stats()
+
+        # Shutdown through the running flag while envelopes are still arriving
+        slack_bot._dispatcher = EventDispatcher(lambda event: time.sleep(work_seconds), workers=8, max_queue=n)
+        server = FakeSocketModeServer(payloads("EvStop-"), latency=0.0005)
+        stop_at = time.perf_counter() + 0.5
+        elapsed, stats = run(server, 8, lambda: time.perf_counter() > stop_at)
+        _report("stopped via running flag", elapsed, stats["received"],
+                unacked_in_flight=stats["received"] - stats["acked"])
+        slack_bot._dispatcher.stop()
+        assert stats["received"] == stats["acked"] and elapsed < 5, stats
+
+
+@benchmark
+def bench_task_store(n=200000, users=500, channels=100, duplicate_every=10):
+    """Task writes and open-task queries at a few hundred thousand tasks, plus near-duplicate recall."""
+    import random
+    import sqlite3
+    from task_store import TaskStore
+
+    rng = random.Random(5)
+    verbs = ["review", "deploy", "update", "fix", "schedule", "prepare", "send", "draft", "test", "migrate"]
+    vocab = ["".join(rng.choices("abcdefghijklmnopqrstuvwxyz", k=rng.randint(4, 9))) for _ in range(5000)]
+    tasks, injected = [], 0
+    for i in range(n):
+        if i and i % duplicate_every == 0:
+            channel, user, _, text = tasks[rng.randrange(max(0, i - 500), i)]
+            text = text.upper() + " please!"  # same task reported again, reworded slightly
+            injected += 1
+        else:
+            channel, user = f"C{rng.randrange(channels)}", f"U{rng.randrange(users)}"
+            text = f"{rng.choice(verbs)} the {' '.join(rng.sample(vocab, 6))} before friday"
+        tasks.append((channel, user, f"{1700000000 + i}.000000", text))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = sqlite3.connect(os.path.join(tmp, "naive.db"))
+        conn.execute("CREATE TABLE tasks (channel TEXT, user TEXT, ts TEXT, text TEXT, status TEXT DEFAULT 'open')")
+        sample = 5000
+        start = time.perf_counter()
+        for task in tasks[:sample]:
+            with conn:
+                conn.execute("INSERT INTO tasks (channel, user, ts, text) VALUES (?, ?, ?, ?)", task)
+        _report("one commit per task (first 5k)", time.perf_counter() - start, sample)
+        with conn:
+            conn.executemany("INSERT INTO tasks (channel, user, ts, text) VALUES (?, ?, ?, ?)", tasks[sample:])
+
+        store = TaskStore(os.path.join(tmp, "tasks.db"), batch_size=500)
+        start = time.perf_counter()
+        for task in tasks:
+            store.add(*task)
+        store.flush()
+        stats = store.stats()
+        _report("TaskStore.add, batched + near-dup check", time.perf_counter() - start, n,
+                stored=stats["added"], duplicates=stats["duplicates"], injected=injected)
+
+        probes = [f"U{rng.randrange(users)}" for _ in range(200)]
+        start = time.perf_counter()
+        for user in probes:
+            conn.execute("SELECT * FROM tasks WHERE status='open' AND user=? ORDER BY ts DESC LIMIT 50 OFFSET 100",
+                         (user,)).fetchall()
+        _report("unindexed table, page 3 by user", time.perf_counter() - start, len(probes))
+
+        start = time.perf_counter()
+        for user in probes:
+            _, cursor = store.query(user=user, limit=50)
+            _, cursor = store.query(user=user, limit=50, cursor=cursor)
+            store.query(user=user, limit=50, cursor=cursor)
+        _report("TaskStore, pages 1-3 by user", time.perf_counter() - start, len(probes))
+
+        start = time.perf_counter()
+        for c in range(channels):
+            store.query(channel=f"C{c}", limit=50)
+        _report("TaskStore, first page by channel", time.perf_counter() - start, channels)
+        conn.close()
+
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def _fixture_driver(query=""):
+    """Headless Chrome on the WhatsApp Web fixture, or None when selenium/Chrome are missing."""
+    try:
+        from selenium import webdriver
+        options = webdriver.ChromeOptions()
+        options.add_argument("--headless=new")
+        driver = webdriver.Chrome(options=options)
+    except Exception as e:
+        print(f"⚠️ Needs selenium and a local Chrome ({type(e).__name__}: {e}); skipping.")
+        return None
+    url = "file://" + os.path.join(FIXTURES, "whatsapp_web.html") + query
+    driver.get(url)
+    driver.execute_script("resetFixture()")
+    driver.get(url)
+    return driver
+
+
+@benchmark
+def bench_wa_capture(messages=20, legacy_messages=3):
+    """Reply latency on the WhatsApp Web fixture: refresh-and-sleep polling vs the MutationObserver capture."""
+    import random
+    driver = _fixture_driver("?chats=5")
+    if driver is None:
+        return
+    import whatsapp_bot
+    from wa_capture import MessageCapture
+
+    whatsapp_bot._driver = driver
+    rng = random.Random(11)
+    try:
+        latencies = []
+        for i in range(legacy_messages):
+            arrived = time.perf_counter()
+            driver.execute_script("simulateIncoming(arguments[0], arguments[1])", f"Contact {1 + i % 4}",
+                                  f"where are you located? ({i})")
+            chats = whatsapp_bot.get_unread_chats()  # refresh + fixed sleeps, as in handle_chat
+            chats[0].click()
+            time.sleep(2)
+            sender, message, _ = whatsapp_bot.get_latest_message()
+            whatsapp_bot.send_reply(f"re: {message}")
+            latencies.append(time.perf_counter() - arrived)
+        _report("poll: refresh + sleeps", sum(latencies), legacy_messages,
+                p50_ms=round(_percentile(latencies, 50) * 1000), max_ms=round(max(latencies) * 1000))
+
+        capture = MessageCapture(driver, poll_interval=0.1)
+        capture.install()
+        latencies = []
+        for i in range(messages):
+            # Half the messages land in the open chat, half in other chats (unread badge)
+            chat = capture.current_chat if capture.current_chat and i % 2 else f"Contact {1 + i % 4}"
+            delay = rng.uniform(0, 0.3)
+            driver.execute_script("simulateIncoming(arguments[0], arguments[1], arguments[2])", chat,
+                                  f"where are you located? ({i})", int(delay * 1000))
+            arrived = time.perf_counter() + delay
+            incoming = next(capture.messages())
+            whatsapp_bot.send_reply(f"re: {incoming['text']}", pause=0)
+            latencies.append(time.perf_counter() - arrived)
+        _report("observer: drain every 100 ms", sum(latencies), messages,
+                p50_ms=round(_percentile(latencies, 50) * 1000), max_ms=round(max(latencies) * 1000),
+                chat_opens=capture.chat_opens, drains=capture.drains,
+                replies=driver.execute_script("return window.__replies.length"))
+    finally:
+        driver.quit()
+        whatsapp_bot._driver = None
+
+
+@benchmark
+def bench_wa_extract(history=10000, rounds=20):
+    """Reading the open chat on a fixture page with a 10k-message history: find_elements vs one extraction script."""
+    driver = _fixture_driver(f"?history={history}&open=1")
+    if driver is None:
+        return
+    from selenium.webdriver.common.by import By
+    from wa_capture import extract_chat
+
+    try:
+        start = time.perf_counter()
+        for _ in range(rounds):
+            # What get_latest_message did: one lookup for the header, one for every incoming
+            # message in the chat, then a WebDriver round trip to read the last one's text
+            header = driver.find_elements(By.XPATH, "//header//span[contains(@class, 'selectable-text')]")
+            header[0].text
+            spans = driver.find_elements(By.XPATH, "//div[contains(@class, 'message-in')]//span[@dir='ltr']")
+            spans[-1].text.strip()
+        _report("find_elements: header + all message-in spans", time.perf_counter() - start, rounds,
+                spans=len(spans))
+
+        start = time.perf_counter()
+        for _ in range(rounds):
+            snapshot = extract_chat(driver, limit=1)
+        _report("extract_chat: latest message", time.perf_counter() - start, rounds,
+                same_text=snapshot["messages"][-1]["text"] == spans[-1].text.strip())
+
+        cursor = snapshot["newest_id"]
+        found, elapsed = 0, 0.0
+        for i in range(rounds):
+            driver.execute_script("simulateIncoming('Contact 0', arguments[0])", f"new message {i}")
+            time.sleep(0.05)  # simulateIncoming appends on a timer
+            start = time.perf_counter()
+            snapshot = extract_chat(driver, cursor)
+            elapsed += time.perf_counter() - start
+            cursor = snapshot["newest_id"]
+            found += len(snapshot["messages"])
+        _report("extract_chat: messages after the cursor", elapsed, rounds, found=found)
+    finally:
+        driver.quit()
+
+
+@benchmark
+def bench_wa_pipeline(contacts=6, per_contact=10, llm_latency=0.3):
+    """Replies on a fake WhatsApp page with a 300 ms model: one message at a time vs the reader/worker/sender pipeline."""
+    import itertools
+    import random
+    from fakes import FakeGeminiModel, FakeWhatsAppDriver
+    from llm_gateway import LLMGateway
+    from wa_capture import MessageCapture
+    from wa_pipeline import ReplyPipeline
+
+    total = contacts * per_contact
+    rng = random.Random(5)
+    # Bursts: each contact sends its messages within about a second, contacts overlap
+    arrivals = []
+    for c in range(contacts):
+        at = c * 0.2
+        for i in range(per_contact):
+            at += rng.uniform(0.02, 0.15)
+            arrivals.append((at, f"Contact {c}", f"question {i} from contact {c}"))
+
+    def setup():
+        driver = FakeWhatsAppDriver(arrivals)
+        capture = MessageCapture(driver, poll_interval=0.02)
+        # A bot that has been running already has a cursor in every chat
+        capture.cursors = {chat: rows[-1]["id"] for chat, rows in driver.chats.items()}
+        gateway = LLMGateway(lambda name: FakeGeminiModel(latency=llm_latency), default_model="fake",
+                             rate_per_minute=60000, max_concurrency=8, retries=0)
+
+        def respond(message):
+            return "re: " + message["text"].split(" from")[0] + " " + gateway.generate(message["text"])[-1:]
+
+        def send(chat, text):
+            with capture.lock:
+                capture.open(chat)
+                driver.type_reply(text)
+        return driver, capture, respond, send
+
+    def in_order(driver):
+        for c in range(contacts):
+            numbers = [int(text.split()[2]) for chat, text, _ in driver.replies if chat == f"Contact {c}"]
+            if numbers != sorted(numbers):
+                return False
+        return True
+
+    driver, capture, respond, send = setup()
+    start = time.perf_counter()
+    for message in itertools.islice(capture.messages(), total):
+        send(message["chat"], respond(message))  # the old handle_chat_events loop
+    _report("sequential: read, generate, send", time.perf_counter() - start, total,
+            replies=len(driver.replies), in_order=in_order(driver), chat_opens=capture.chat_opens)
+    assert len(driver.replies) == total and in_order(driver)
+
+    for workers in (4, 8):
+        driver, capture, respond, send = setup()
+        start = time.perf_counter()
+        pipeline = ReplyPipeline(itertools.islice(capture.messages(), total), respond, send, workers=workers).run()
+        stats = pipeline.stats()
+        _report(f"pipeline, {workers} workers", time.perf_counter() - start, total,
+                replies=len(driver.replies), in_order=in_order(driver), chat_opens=capture.chat_opens,
+                p95_ms=stats["latency_p95_ms"], max_incoming=stats["max_incoming_depth"],
+                max_held=stats["max_held_for_order"])
+        assert len(driver.replies) == total and in_order(driver), driver.replies
+
+
+@benchmark
+def bench_wa_store(messages=20000, contacts=500, days=180):
+    """WhatsApp history: text-keyed deque + commit per insert vs the id-keyed ChatStore, and file size with retention."""
+    import random
+    import sqlite3
+    from collections import deque
+    from wa_store import ChatStore
+
+    rng = random.Random(3)
+    common = ["hi", "hello", "ok", "thanks", "where are you located?"]
+    traffic = [(f"Contact {rng.randrange(contacts)}", f"false_{i}",
+                rng.choice(common) if rng.random() < 0.3 else f"message {i} " + "lorem ipsum " * rng.randint(1, 20))
+               for i in range(messages)]
+    with tempfile.TemporaryDirectory() as tmp:
+        # Legacy: dedupe by text in the last 50 messages, UNIQUE(message), one commit per insert
+        conn = sqlite3.connect(os.path.join(tmp, "legacy.db"))
+        conn.execute("CREATE TABLE chats (id INTEGER PRIMARY KEY AUTOINCREMENT, sender TEXT, message TEXT UNIQUE, "
+                     "timestamp DATETIME DEFAULT CURRENT_TIMESTAMP)")
+        processed, answered = deque(maxlen=50), 0
+        start = time.perf_counter()
+        for contact, _, text in traffic:
+            if text in processed:
+                continue
+            processed.append(text)
+            answered += 1
+            conn.execute("INSERT OR IGNORE INTO chats (sender, message) VALUES (?, ?)", (contact, text))
+            conn.commit()
+        stored = conn.execute("SELECT COUNT(*) FROM chats").fetchone()[0]
+        _report("legacy: deque + commit per insert", time.perf_counter() - start, messages,
+                answered=answered, stored=stored, dropped=messages - answered)
+        start = time.perf_counter()
+        for c in range(100):
+            conn.execute("SELECT message FROM chats WHERE sender = ? ORDER BY id DESC LIMIT 20",
+                         (f"Contact {c}",)).fetchall()
+        _report("legacy: history lookups (no index)", time.perf_counter() - start, 100)
+        conn.close()
+
+        clock = [1.7e9]
+        store = ChatStore(os.path.join(tmp, "store.db"), retention_days=None, clock=lambda: clock[0])
+        start = time.perf_counter()
+        answered = sum(store.add(contact, msg_id, text) for contact, msg_id, text in traffic)
+        replays = sum(store.add(contact, msg_id, text) for contact, msg_id, text in traffic[:1000])
+        store.flush()
+        _report("ChatStore: id-keyed, batched", time.perf_counter() - start, messages + 1000,
+                answered=answered, replays_answered=replays, stored=store.stats()["messages"])
+        start = time.perf_counter()
+        for c in range(100):
+            store.history(f"Contact {c}", limit=20)
+        _report("ChatStore: history lookups", time.perf_counter() - start, 100)
+        store.close()
+
+        # Months of traffic, one day per step: no retention vs 30 days with a daily compaction
+        for retention in (None, 30):
+            clock[0] = 1.7e9
+            store = ChatStore(os.path.join(tmp, f"months-{retention}.db"), retention_days=retention,
+                              compact_interval=86400, clock=lambda: clock[0])
+            per_day = messages // days
+            start = time.perf_counter()
+            for day in range(days):
+                for i in range(per_day):
+                    contact, _, text = traffic[(day * per_day + i) % messages]
+                    store.add(contact, f"d{day}-{i}", text)
+                clock[0] += 86400
+            store.flush()
+            stats = store.stats()
+            _report(f"{days} days, retention={retention}", time.perf_counter() - start, per_day * days,
+                    messages=stats["messages"], compacted=stats["compacted"], db_kb=stats["db_bytes"] // 1024)
+            store.close()
+
+
+@benchmark
+def bench_faq_index(entries=5000, queries=5000):
+    """Messages answered without Gemini: exact/substring dicts vs the n-gram FAQ index, lookup latency and reload."""
+    import json
+    import random
+    from faq_index import FaqIndex, ReloadingFaqIndex
+
+    # Messages that contain a shipped question keep their local answer, as with the old substring match
+    shipped = FaqIndex.from_file(os.path.join(os.path.dirname(os.path.abspath(__file__)), "faq.json"))
+    for message, word in (("Hey, how to contact support? I need help with my account", "support@"),
+                          ("what are your services? I am interested in analytics", "analytics"),
+                          ("where are you based? I'd like to visit", "Bangalore")):
+        answer = shipped.answer(message)
+        assert answer and word in answer, (message, answer)
+    assert shipped.answer("this is a question for the model") is None
+    print(f"{'shipped FAQ containment':<40} ok")
+
+    rng = random.Random(17)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    vocab = ["".join(rng.choice(letters) for _ in range(rng.randint(3, 9))) for _ in range(3000)]
+    faq = [{"questions": [" ".join(rng.choice(vocab) for _ in range(rng.randint(4, 8))) for _ in range(2)],
+            "answer": f"answer {i}"} for i in range(entries)]
+
+    def paraphrase(question):
+        words = question.split()
+        if len(words) > 4 and rng.random() < 0.5:
+            del words[rng.randrange(len(words))]  # dropped word
+        i = rng.randrange(len(words))
+        if len(words[i]) > 3:
+            j = rng.randrange(len(words[i]) - 1)  # swapped letters
+            words[i] = words[i][:j] + words[i][j + 1] + words[i][j] + words[i][j + 2:]
+        return rng.choice(["", "hey ", "hi, ", "please "]) + " ".join(words) + rng.choice(["", "?", " please", "!!"])
+
+    traffic = []  # (message, expected answer or None)
+    for _ in range(queries):
+        entry = rng.choice(faq)
+        kind = rng.random()
+        if kind < 0.15:
+            traffic.append((rng.choice(entry["questions"]), entry["answer"]))
+        elif kind < 0.55:
+            traffic.append((paraphrase(rng.choice(entry["questions"])), entry["answer"]))
+        else:
+            traffic.append((" ".join(rng.choice(vocab) for _ in range(rng.randint(4, 10))), None))
+    answerable = sum(expected is not None for _, expected in traffic)
+
+    # Old compose_reply: exact dict, then a substring test against every question
+    exact = {q.lower(): e["answer"] for e in faq for q in e["questions"]}
+    sample = traffic[:500]
+    start = time.perf_counter()
+    local = correct = 0
+    for message, expected in sample:
+        answer = exact.get(message.lower())
+        if answer is None:
+            answer = next((a for q, a in exact.items() if q in message.lower()), None)
+        local += answer is not None
+        correct += answer is not None and answer == expected
+    _report("exact + substring dicts", time.perf_counter() - start, len(sample),
+            llm_avoided=f"{local / len(sample):.1%}", correct=f"{correct / max(local, 1):.1%}")
+
+    start = time.perf_counter()
+    index = FaqIndex(faq)
+    _report(f"FaqIndex build ({entries} entries)", time.perf_counter() - start, entries * 2)
+
+    latencies, local, correct, wrong = [], 0, 0, 0
+    start = time.perf_counter()
+    for message, expected in traffic:
+        t0 = time.perf_counter()
+        answer = index.answer(message)
+        latencies.append(time.perf_counter() - t0)
+        local += answer is not None
+        correct += answer is not None and answer == expected
+        wrong += answer is not None and answer != expected
+    _report("FaqIndex lookups", time.perf_counter() - start, queries,
+            llm_avoided=f"{local / queries:.1%}", of_answerable=f"{correct / answerable:.1%}",
+            wrong=wrong, p50_us=round(_percentile(latencies, 50) * 1e6), p99_us=round(_percentile(latencies, 99) * 1e6))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "faq.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(faq, f)
+        reloading = ReloadingFaqIndex(path, check_interval=0)
+        faq.append({"questions": ["what is the wifi password"], "answer": "It is on the fridge."})
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(faq, f)
+        os.utime(path, ns=(time.time_ns(), time.time_ns() + 1000))
+        start = time.perf_counter()
+        answer = reloading.answer("whats the wifi password?")
+        _report("hot reload + first lookup", time.perf_counter() - start, 1,
+                reloads=reloading.reloads, new_entry_found=answer == "It is on the fridge.")
+
+
+def compare_reports(report, baseline, tolerance=0.2, min_delta_ms=1.0):
+    """✅ Lines describing every stage p95 and benchmark rate that is more than `tolerance` worse than the baseline.
+
+    Stage p95s that moved by less than min_delta_ms are left out, since
+    sub-millisecond stages jitter by more than 20% from run to run.
+    """
+    regressions = []
+    old_stages = baseline.get("metrics", {}).get("stages", {})
+    for stage, summary in report.get("metrics", {}).get("stages", {}).items():
+        old = old_stages.get(stage)
+        if (old and summary["p95_ms"] > old["p95_ms"] * (1 + tolerance)
+                and summary["p95_ms"] - old["p95_ms"] >= min_delta_ms):
+            regressions.append(f"{stage} p95 {old['p95_ms']} -> {summary['p95_ms']} ms")
+    old_rates = {(row["benchmark"], row["label"]): row["rate"] for row in baseline.get("results", [])}
+    for row in report.get("results", []):
+        old = old_rates.get((row["benchmark"], row["label"]))
+        if old and row["rate"] is not None and row["rate"] < old * (1 - tolerance):
+            regressions.append(f"{row['benchmark']}: {row['label']} {old} -> {row['rate']} items/s")
+    return regressions
+
+
+def _replay_gmail(tmp, emails, rounds, latency):
+    import threading
+    import gmail_bot
+    import reminders
+    from email_tracker import TrackerStore
+    from fakes import FakeSlackClient
+    from summary_engine import SummaryEngine
+
+    service = FakeGmailService(latency=latency)
+
+    class Manager:
+        def get_service(self):
+            return service
+
+    gmail_bot._gmail_manager = Manager()
+    gmail_bot._summary_engine = SummaryEngine(pipeline=make_fake_summarizer(), cache_path=None)
+    gmail_bot._tracker = TrackerStore(os.path.join(tmp, "email_tracker.db"))
+    gmail_bot._inbox_sync = threading.local()
+    sink = reminders.SlackSink(FakeSlackClient(), "C-reminders")
+    gmail_bot.get_reply_index()  # built once per process; keep it out of the "suggest" stage
+    per_round = emails // rounds
+    start = time.perf_counter()
+    for r in range(rounds):
+        for i in range(r * per_round, (r + 1) * per_round):
+            subject = ("URGENT: " if i % 5 == 0 else "") + f"Invoice {i} follow-up"
+            body = f"Hello, this is message {i} about the quarterly invoice and the meeting next week. " * (1 + i % 8)
+            service.add_message(make_gmail_message(f"m{i}", subject, f"sender{i % 40}@example.com", body))
+        gmail_bot.fetch_and_process_emails(incremental=True)
+        gmail_bot.check_unanswered_emails()
+        gmail_bot.send_reminders(sink)
+    elapsed = time.perf_counter() - start
+    gmail_bot.get_tracker().close()
+    return elapsed, per_round * rounds, {"round_trips": service.round_trips, "reminder_digests": len(sink.client.posted)}
+
+
+def _replay_slack(tmp, events, channels, latency):
+    import slack_bot
+    from fakes import FakeGeminiModel, FakeSlackClient, make_fake_trimmed_nlp, make_slack_users
+    from keyphrases import KeyphraseExtractor
+    from llm_gateway import LLMGateway
+
+    slack_bot.SLACK_DB_PATH = os.path.join(tmp, "slack_bot.db")
+    slack_bot.SLACK_SIGNING_SECRET = None
+    slack_bot.slack_client = FakeSlackClient(make_slack_users(50), latency=latency)
+    slack_bot._keyphrase_extractor = KeyphraseExtractor(nlp_factory=make_fake_trimmed_nlp)
+    slack_bot._llm_gateway = LLMGateway(lambda name: FakeGeminiModel(latency=latency * 10), default_model="fake",
+                                        rate_per_minute=60000, max_concurrency=4, retries=0)
+    for name in ("_dispatcher", "_user_directory", "_dedupe_store", "_digest_engine", "_message_store", "_task_store"):
+        setattr(slack_bot, name, None)
+    slack_bot.get_nlp()
+    client = slack_bot.app.test_client()
+    texts = ["Action item: review the deployment plan by Friday", "Thanks, looks good to me.",
+             "Can you follow up with the vendor about the contract?", "Lunch at noon?",
+             "New task: fix the login bug before the release."]
+    now = time.time()
+    start = time.perf_counter()
+    for i in range(events):
+        # Every tenth event is a Slack retry of the previous one
+        n = i - 1 if i % 10 == 9 else i
+        body = json.dumps({"event_id": f"Ev{n}", "event": {
+            "type": "message", "user": f"U{n % 50:05d}", "text": f"{texts[n % len(texts)]} (#{n})",
+            "channel": f"C{n % channels}", "ts": f"{now - events + n:.6f}"}})
+        response = client.post("/slack/events", data=body, content_type="application/json")
+        assert response.status_code == 200, response.status_code
+    # An edit and a deletion that arrive while the original messages are still queued
+    edited, deleted = f"{now:.6f}", f"{now + 1:.6f}"
+    for event in ({"type": "message", "user": "U00001", "text": "original", "channel": "C0", "ts": edited},
+                  {"type": "message", "subtype": "message_changed", "channel": "C0",
+                   "message": {"user": "U00001", "text": "edited", "ts": edited}},
+                  {"type": "message", "user": "U00001", "text": "should be deleted", "channel": "C0", "ts": deleted},
+                  {"type": "message", "subtype": "message_deleted", "channel": "C0", "deleted_ts": deleted}):
+        response = client.post("/slack/events", data=json.dumps({"event": event}), content_type="application/json")
+        assert response.status_code == 200, response.status_code
+    slack_bot.get_dispatcher().join()
+    stored = dict(slack_bot.get_message_store().connection().execute(
+        "SELECT ts, text FROM slack_messages WHERE channel='C0' AND ts IN (?, ?)", (edited, deleted)).fetchall())
+    assert stored == {edited: "edited"}, stored
+    slack_bot.generate_daily_digest([f"C{c}" for c in range(channels)])
+    elapsed = time.perf_counter() - start
+    text = client.get("/metrics").get_data(as_text=True)
+    slack_bot.get_task_store().flush()
+    extra = {"posted": len(slack_bot.slack_client.posted), "metrics_lines": text.count("\n")}
+    slack_bot.get_dispatcher().stop()
+    return elapsed, events, extra
+
+
+def _replay_whatsapp(tmp, contacts, per_contact, latency):
+    import metrics
+    import whatsapp_bot
+    from fakes import FakeGeminiModel, FakeWhatsAppDriver
+    from llm_gateway import LLMGateway
+    from wa_capture import MessageCapture
+    from wa_store import ChatStore
+
+    texts = ["hi", "what services do you offer?", "how can I reach support", "where are you located?",
+             "can you tell me a joke about databases", "x" * 150]
+    arrivals, at = [], 0.0
+    for i in range(contacts * per_contact):
+        at += 0.01
+        arrivals.append((at, f"Contact {i % contacts}", f"{texts[i % len(texts)]} {i}"))
+    driver = FakeWhatsAppDriver(arrivals, typing=0.002)
+    whatsapp_bot._driver = driver
+    whatsapp_bot._capture = MessageCapture(driver, poll_interval=0.02)
+    whatsapp_bot._capture.cursors = {chat: rows[-1]["id"] for chat, rows in driver.chats.items()}
+    whatsapp_bot._chat_store = ChatStore(os.path.join(tmp, "whatsapp_chat.db"))
+    whatsapp_bot._llm_gateway = LLMGateway(lambda name: FakeGeminiModel(latency=latency * 10), default_model="fake",
+                                           rate_per_minute=60000, max_concurrency=4, retries=0)
+    original_send_reply = whatsapp_bot.send_reply
+    try:
+        import selenium  # noqa: F401  with it, send_reply finds the fake compose box through WebDriverWait
+    except ImportError:
+        def send_reply(message, pause=1):  # the same stage, typed straight into the fake page
+            with metrics.timer("whatsapp", "send"):
+                driver.type_reply(message)
+            metrics.count("whatsapp", "sent")
+        whatsapp_bot.send_reply = send_reply
+    total = len(arrivals)
+    start = time.perf_counter()
+    try:
+        whatsapp_bot.handle_chat_events(lambda: whatsapp_bot._pipeline is None or whatsapp_bot._pipeline.read < total)
+    finally:
+        whatsapp_bot.send_reply = original_send_reply
+    elapsed = time.perf_counter() - start
+    whatsapp_bot._chat_store.close()
+    assert len(driver.replies) == total, f"{len(driver.replies)} of {total} messages answered"
+    return elapsed, total, {"replies": len(driver.replies), **whatsapp_bot._pipeline.stats()}
+
+
+@benchmark
+def bench_replay(emails=200, rounds=10, events=1000, channels=10, contacts=6, per_contact=10, latency=0.002):
+    """End-to-end replay of synthetic traffic through all three bots on local stand-ins, with per-stage metrics."""
+    import io
+    import metrics
+
+    metrics.REGISTRY.reset()
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, replay in (("gmail: fetch_and_process_emails", lambda: _replay_gmail(tmp, emails, rounds, latency)),
+                              ("slack: /slack/events", lambda: _replay_slack(tmp, events, channels, latency)),
+                              ("whatsapp: handle_chat_events", lambda: _replay_whatsapp(tmp, contacts, per_contact,
+                                                                                       latency))):
+            with contextlib.redirect_stdout(io.StringIO()):  # the bots print every message
+                elapsed, count, extra = replay()
+            _report(label, elapsed, count, **extra)
+
+    print(f"{'stage':<28} {'count':>7} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    snapshot = metrics.REGISTRY.snapshot()
+    for stage, summary in snapshot["stages"].items():
+        print(f"{stage:<28} {summary['count']:>7} {summary['mean_ms']:>9} {summary['p50_ms']:>9} "
+              f"{summary['p95_ms']:>9} {summary['p99_ms']:>9}")
+    print(f"{'counters':<28} {snapshot['counters']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run offline benchmarks.")
+    parser.add_argument("names", nargs="*", help=f"benchmarks to run (default: all): {', '.join(sorted(BENCHMARKS))}")
+    parser.add_argument("--report", help="write the results and stage metrics to this JSON file")
+    parser.add_argument("--baseline", help="compare against a previous --report file; exits 1 on a >20%% regression")
+    args = parser.parse_args()
+    unknown = set(args.names) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(sorted(unknown))}")
+    for name in args.names or sorted(BENCHMARKS):
+        print(f"\n📊 {name}: {BENCHMARKS[name].__doc__}")
+        _current[0] = name
+        BENCHMARKS[name]()
+
+    import metrics
+    report = {"created_at": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": sys.version.split()[0],
+              "benchmarks": args.names or sorted(BENCHMARKS), "results": RESULTS,
+              "metrics": metrics.REGISTRY.snapshot()}
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"\n💾 Report written to {args.report}")
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare_reports(report, json.load(f))
+        for line in regressions:
+            print(f"❌ Regression: {line}")
+        if regressions:
+            sys.exit(1)
+        print("✅ No regressions against the baseline.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""Bounded duplicate detection: time-bucketed key sets with optional SQLite persistence."""
+import sqlite3
+import threading
+import time
+from collections import deque
+
+
+class DedupeStore:
+    """✅ Remembers keys for `window` seconds within a fixed memory ceiling.
+
+    Keys go into time buckets of window / buckets seconds; whole buckets
+    expire together, so cleanup is O(1) per bucket instead of per key. If
+    more than max_keys are held, the oldest buckets are dropped early,
+    which shortens the window under a burst instead of growing memory.
+    With db_path set, new keys are written to SQLite in small batches and
+    keys still inside the window are loaded back on start, so retries
+    that arrive after a restart are still recognised.
+    """
+
+    def __init__(self, window=3600, buckets=12, max_keys=200000, db_path=None, table="seen_events",
+                 flush_every=100, flush_interval=1.0, clock=time.time):
+        self.window = window
+        self.bucket_width = window / buckets
+        self.max_keys = max_keys
+        self.table = table
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.clock = clock
+        self.duplicates = 0
+        self.evicted_early = 0
+        self._buckets = deque()  # (bucket_id, set of keys), oldest first
+        self._size = 0
+        self._pending = []
+        self._last_flush = clock()
+        self._lock = threading.Lock()
+        self._db = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            with self._db:
+                self._db.execute(f"CREATE TABLE IF NOT EXISTS {table} (key TEXT PRIMARY KEY, seen_at REAL)")
+                self._db.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_seen_at ON {table} (seen_at)")
+            self._load()
+
+    def _load(self):
+        rows = self._db.execute(f"SELECT key, seen_at FROM {self.table} WHERE seen_at >= ? ORDER BY seen_at",
+                                (self.clock() - self.window,))
+        for key, seen_at in rows:
+            self._add(key, seen_at)
+
+    def _expire(self, now):
+        oldest_live = int((now - self.window) // self.bucket_width)
+        while self._buckets and self._buckets[0][0] < oldest_live:
+            self._size -= len(self._buckets.popleft()[1])
+        while self._size > self.max_keys and len(self._buckets) > 1:
+            dropped = len(self._buckets.popleft()[1])
+            self._size -= dropped
+            self.evicted_early += dropped
+
+    def _add(self, key, now):
+        bucket_id = int(now // self.bucket_width)
+        if not self._buckets or self._buckets[-1][0] != bucket_id:
+            self._buckets.append((bucket_id, set()))
+        self._buckets[-1][1].add(key)
+        self._size += 1
+        self._expire(now)
+
+    def __contains__(self, key):
+        with self._lock:
+            return any(key in keys for _, keys in self._buckets)
+
+    def __len__(self):
+        return self._size
+
+    def check_and_add(self, key):
+        """✅ Record key and return True if it is new, False if it was seen inside the window."""
+        now = self.clock()
+        with self._lock:
+            self._expire(now)
+            if any(key in keys for _, keys in self._buckets):
+                self.duplicates += 1
+                return False
+            self._add(key, now)
+            if self._db is not None:
+                self._pending.append((key, now))
+                if len(self._pending) >= self.flush_every or now - self._last_flush >= self.flush_interval:
+                    self._flush(now)
+            return True
+
+    def forget(self, key):
+        """✅ Remove a key, e.g. when its event could not be queued and a retry should go through."""
+        with self._lock:
+            for _, keys in self._buckets:
+                if key in keys:
+                    keys.discard(key)
+                    self._size -= 1
+            self._pending = [(k, t) for k, t in self._pending if k != key]
+            if self._db is not None:
+                with self._db:
+                    self._db.execute(f"DELETE FROM {self.table} WHERE key=?", (key,))
+
+    def _flush(self, now):
+        with self._db:
+            if self._pending:
+                self._db.executemany(f"INSERT OR REPLACE INTO {self.table} (key, seen_at) VALUES (?, ?)", self._pending)
+            self._db.execute(f"DELETE FROM {self.table} WHERE seen_at < ?", (now - self.window,))
+        self._pending = []
+        self._last_flush = now
+
+    def flush(self):
+        """Write pending keys to SQLite now."""
+        if self._db is not None:
+            with self._lock:
+                self._flush(self.clock())
+
+    def stats(self):
+        """✅ Size and counters."""
+        with self._lock:
+            return {"keys": self._size, "buckets": len(self._buckets), "duplicates": self.duplicates,
+                    "evicted_early": self.evicted_early}
@@ -0,0 +1,108 @@
+"""Daily digest engine: paginate channel history, summarize token-bounded chunks, merge hierarchically."""
+from concurrent.futures import ThreadPoolExecutor
+
+DIGEST_PROMPT = "Summarize the key discussions from today in a structured format without generating solutions:\n"
+CHUNK_PROMPT = ("Summarize the key discussions in this part of today's conversation in a structured format "
+                "without generating solutions:\n")
+MERGE_PROMPT = ("Merge these partial summaries of today's discussions into one structured summary, without "
+                "generating solutions and without repeating points:\n")
+NO_MESSAGES = "No messages to summarize for today."
+
+
+def iter_channel_messages(client, channel, oldest, page_size=200, latest=None):
+    """✅ Yield every message in the channel since `oldest` (up to `latest`), following cursor pagination."""
+    cursor = None
+    while True:
+        kwargs = {"channel": channel, "oldest": oldest, "limit": page_size}
+        if latest is not None:
+            kwargs["latest"] = latest
+        if cursor:
+            kwargs["cursor"] = cursor
+        response = client.conversations_history(**kwargs)
+        yield from response.get("messages", [])
+        cursor = (response.get("response_metadata") or {}).get("next_cursor")
+        if not response.get("has_more") or not cursor:
+            return
+
+
+def estimate_tokens(text):
+    """Rough token count (about four characters per token) for prompt budgeting."""
+    return len(text) // 4 + 1
+
+
+def chunk_lines(lines, token_budget):
+    """✅ Group lines into chunks that each fit the token budget (an oversized line gets its own chunk)."""
+    chunk, used = [], 0
+    for line in lines:
+        cost = estimate_tokens(line)
+        if chunk and used + cost > token_budget:
+            yield chunk
+            chunk, used = [], 0
+        chunk.append(line)
+        used += cost
+    if chunk:
+        yield chunk
+
+
+class DigestEngine:
+    """✅ Map-reduce summarization over arbitrarily long channel histories.
+
+    Messages are split into chunks that fit chunk_tokens, the chunks are
+    summarized concurrently (at most max_workers LLM calls at a time), and
+    the partial summaries are merged fan_in at a time, level by level,
+    until one summary remains. A history that fits one chunk costs a
+    single call, exactly like the original digest.
+    """
+
+    def __init__(self, generate, chunk_tokens=6000, fan_in=8, max_workers=4):
+        self.generate = generate
+        self.chunk_tokens = chunk_tokens
+        self.fan_in = fan_in
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="digest-llm")
+
+    def summarize(self, texts):
+        """✅ Summarize a chronological list of message texts."""
+        lines = [f"- {text}" for text in texts if text]
+        if not lines:
+            return NO_MESSAGES
+
+        chunks = ["\n".join(chunk) for chunk in chunk_lines(lines, self.chunk_tokens)]
+        if len(chunks) == 1:
+            return self.generate(DIGEST_PROMPT + chunks[0])
+
+        partials = list(self.pool.map(lambda chunk: self.generate(CHUNK_PROMPT + chunk), chunks))
+        while len(partials) > 1:
+            groups = [partials[i:i + self.fan_in] for i in range(0, len(partials), self.fan_in)]
+            partials = list(self.pool.map(self._merge, groups))
+        return partials[0]
+
+    def _merge(self, partials):
+        if len(partials) == 1:
+            return partials[0]
+        body = "\n\n".join(f"Part {i}:\n{partial}" for i, partial in enumerate(partials, 1))
+        return self.generate(MERGE_PROMPT + body)
+
+    def digest_channel(self, client, channel, oldest, store=None):
+        """✅ Summarize every message since `oldest`.
+
+        With a MessageStore, only the part of the day the store is missing
+        is fetched from Slack and the rest is read locally.
+        """
+        if store is not None:
+            store.sync_channel(client, channel, oldest)
+            return self.summarize(store.texts(channel, oldest))
+        messages = list(iter_channel_messages(client, channel, oldest))
+        messages.reverse()  # conversations_history is newest first
+        return self.summarize([msg["text"] for msg in messages if "text" in msg])
+
+    def digest_channels(self, client, channels, oldest, max_channels=4, store=None):
+        """✅ Digest several channels in parallel; returns {channel: summary or exception}."""
+        def run(channel):
+            try:
+                return channel, self.digest_channel(client, channel, oldest, store=store)
+            except Exception as e:
+                return channel, e
+
+        # Channel fetches get their own pool so they never wait on a slot held by an LLM call
+        with ThreadPoolExecutor(max_workers=max_channels, thread_name_prefix="digest-channel") as pool:
+            return dict(pool.map(run, channels))
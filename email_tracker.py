@@ -0,0 +1,87 @@
+"""Storage layer for tracked unanswered emails in email_tracker.db."""
+import sqlite3
+import threading
+
+
+class TrackerStore:
+    """✅ unanswered_emails keyed by Gmail message ID, written in bulk, one connection per thread.
+
+    Rows are upserted by msg_id so re-seeing an unread email refreshes it
+    instead of duplicating it. The database runs in WAL mode so readers do
+    not block the writer.
+    """
+
+    def __init__(self, path="email_tracker.db"):
+        self.path = path
+        self._local = threading.local()
+        self._migrate()
+
+    def connection(self):
+        """✅ Return this thread's connection, opening it on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def close(self):
+        """Close this thread's connection."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def _migrate(self):
+        conn = self.connection()
+        with conn:
+            conn.execute("""
+            CREATE TABLE IF NOT EXISTS unanswered_emails (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                sender TEXT,
+                subject TEXT,
+                category TEXT,
+                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+                reminded INTEGER DEFAULT 0,
+                msg_id TEXT
+            )
+            """)
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(unanswered_emails)")}
+            if "msg_id" not in columns:
+                # Databases created before rows were keyed by message ID; old rows keep a NULL key
+                conn.execute("ALTER TABLE unanswered_emails ADD COLUMN msg_id TEXT")
+            conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_unanswered_msg_id ON unanswered_emails (msg_id)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_unanswered_reminded_ts ON unanswered_emails (reminded, timestamp)")
+
+    def track_many(self, emails, batch_size=5000):
+        """✅ Upsert (msg_id, sender, subject, category) rows in one transaction."""
+        conn = self.connection()
+        count = 0
+        with conn:
+            batch = []
+            for row in emails:
+                batch.append(row)
+                if len(batch) >= batch_size:
+                    count += self._upsert(conn, batch)
+                    batch = []
+            if batch:
+                count += self._upsert(conn, batch)
+        return count
+
+    @staticmethod
+    def _upsert(conn, rows):
+        conn.executemany("""
+            INSERT INTO unanswered_emails (msg_id, sender, subject, category) VALUES (?, ?, ?, ?)
+            ON CONFLICT (msg_id) DO UPDATE SET
+                sender = excluded.sender, subject = excluded.subject, category = excluded.category
+        """, rows)
+        return len(rows)
+
+    def track(self, msg_id, sender, subject, category):
+        """✅ Upsert a single tracked email."""
+        return self.track_many([(msg_id, sender, subject, category)])
+
+    def pending_count(self):
+        """Number of tracked emails that have not been reminded yet."""
+        return self.connection().execute("SELECT COUNT(*) FROM unanswered_emails WHERE reminded=0").fetchone()[0]
@@ -0,0 +1,584 @@
+"""Local stand-ins for the external services the bots talk to, for offline runs and benchmarks."""
+import asyncio
+import base64
+import json
+import threading
+import time
+
+
+def make_gmail_message(msg_id, subject, sender, body, history_id=1):
+    """✅ Build a Gmail API message resource with a single text/plain body."""
+    return {
+        "id": msg_id,
+        "threadId": f"t-{msg_id}",
+        "historyId": str(history_id),
+        "payload": {
+            "mimeType": "text/plain",
+            "headers": [{"name": "Subject", "value": subject}, {"name": "From", "value": sender}],
+            "body": {"data": _b64(body)},
+        },
+    }
+
+
+def _b64(text):
+    return base64.urlsafe_b64encode(text.encode("utf-8")).decode("ascii")
+
+
+def make_nested_payload(text, depth=3, html_only=False, attachment_size=0):
+    """✅ Build a multipart/mixed > multipart/alternative > ... payload nested `depth` levels deep."""
+    if html_only:
+        leaf = [{"mimeType": "text/html", "body": {"data": _b64(f"<html><body><p>{text}</p></body></html>")}}]
+    else:
+        leaf = [{"mimeType": "text/plain", "body": {"data": _b64(text)}},
+                {"mimeType": "text/html", "body": {"data": _b64(f"<p>{text}</p>")}}]
+    payload = {"mimeType": "multipart/alternative", "body": {"size": 0}, "parts": leaf}
+    for _ in range(depth - 1):
+        parts = [payload]
+        if attachment_size:
+            parts.append({"mimeType": "application/pdf", "filename": "report.pdf",
+                          "body": {"data": _b64("%" * attachment_size)}})
+        payload = {"mimeType": "multipart/mixed", "body": {"size": 0}, "parts": parts}
+    payload["headers"] = [{"name": "Subject", "value": "Nested"}, {"name": "From", "value": "a@example.com"}]
+    return payload
+
+
+class _FakeRequest:
+    def __init__(self, service, handler):
+        self._service = service
+        self._handler = handler
+
+    def execute(self):
+        self._service._round_trip()
+        return self._handler()
+
+
+class _FakeBatch:
+    def __init__(self, service, callback):
+        self._service = service
+        self._callback = callback
+        self._requests = []
+
+    def add(self, request, request_id=None):
+        self._requests.append((request_id or str(len(self._requests)), request))
+
+    def execute(self):
+        # The whole batch is a single HTTP round trip
+        self._service._round_trip()
+        for request_id, request in self._requests:
+            try:
+                response, error = request._handler(), None
+            except Exception as e:
+                response, error = None, e
+            self._callback(request_id, response, error)
+
+
+class _FakeMessages:
+    def __init__(self, service):
+        self._service = service
+
+    def list(self, userId="me", q=None, maxResults=100, pageToken=None, **kwargs):
+        def handler():
+            ids = self._service.list_ids(q)
+            start = int(pageToken or 0)
+            page = ids[start:start + maxResults]
+            result = {"messages": [{"id": i, "threadId": f"t-{i}"} for i in page]}
+            if start + maxResults < len(ids):
+                result["nextPageToken"] = str(start + maxResults)
+            return result
+        return _FakeRequest(self._service, handler)
+
+    def get(self, userId="me", id=None, format="full", **kwargs):
+        def handler():
+            if id in self._service.failing:
+                raise FakeHttpError(429, "Too many concurrent requests for user")
+            msg = self._service.messages[id]
+            if format == "metadata":
+                payload = {k: v for k, v in msg["payload"].items() if k in ("mimeType", "headers")}
+                return dict(msg, payload=payload)
+            return msg
+        return _FakeRequest(self._service, handler)
+
+
+class _FakeHistory:
+    def __init__(self, service):
+        self._service = service
+
+    def list(self, userId="me", startHistoryId=None, maxResults=100, pageToken=None, **kwargs):
+        def handler():
+            service = self._service
+            start = int(startHistoryId)
+            if start < service.oldest_history_id:
+                raise FakeHttpError(404, "Requested entity was not found.")
+            records = [r for r in service.history if r["id"] > start]
+            offset = int(pageToken or 0)
+            page = records[offset:offset + maxResults]
+            result = {
+                "historyId": str(service.history_id),
+                "history": [{"id": str(r["id"]), "messagesAdded": [{"message": {"id": r["msg_id"]}}]} for r in page],
+            }
+            if offset + maxResults < len(records):
+                result["nextPageToken"] = str(offset + maxResults)
+            return result
+        return _FakeRequest(self._service, handler)
+
+
+class _FakeUsers:
+    def __init__(self, service):
+        self._service = service
+
+    def messages(self):
+        return _FakeMessages(self._service)
+
+    def history(self):
+        return _FakeHistory(self._service)
+
+    def getProfile(self, userId="me"):
+        return _FakeRequest(self._service, lambda: {"historyId": str(self._service.history_id)})
+
+
+class _FakeResponse:
+    def __init__(self, status):
+        self.status = status
+
+
+class FakeHttpError(Exception):
+    """Mimics googleapiclient.errors.HttpError closely enough for status checks."""
+
+    def __init__(self, status, reason):
+        super().__init__(f"<HttpError {status}: {reason}>")
+        self.resp = _FakeResponse(status)
+
+
+class FakeGmailService:
+    """✅ In-memory Gmail API double that counts HTTP round trips."""
+
+    def __init__(self, messages=(), latency=0.0, unread=None):
+        self.messages = {m["id"]: m for m in messages}
+        self.unread = set(self.messages) if unread is None else set(unread)
+        self.latency = latency
+        self.round_trips = 0
+        self.failing = set()  # message ids whose get() answers 429
+        self.history = []
+        self.history_id = 1
+        self.oldest_history_id = 1
+        self._lock = threading.Lock()
+
+    def _round_trip(self):
+        with self._lock:
+            self.round_trips += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def add_message(self, msg, unread=True):
+        """✅ Deliver a new message and record it in the mailbox history."""
+        self.history_id += 1
+        self.messages[msg["id"]] = dict(msg, historyId=str(self.history_id))
+        self.history.append({"id": self.history_id, "msg_id": msg["id"]})
+        if unread:
+            self.unread.add(msg["id"])
+
+    def expire_history(self):
+        """Drop all retained history, as Gmail does after about a week."""
+        self.history.clear()
+        self.oldest_history_id = self.history_id
+
+    def list_ids(self, q=None):
+        """Newest first, like the real API."""
+        ids = list(reversed(list(self.messages)))
+        if q == "is:unread":
+            ids = [i for i in ids if i in self.unread]
+        return ids
+
+    def users(self):
+        return _FakeUsers(self)
+
+    def new_batch_http_request(self, callback=None):
+        return _FakeBatch(self, callback)
+
+
+def _burn_cpu(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+class FakeSummarizer:
+    """✅ CPU-bound stand-in for the transformers summarization pipeline.
+
+    Every call pays a fixed overhead (tokenizer and model dispatch) plus a
+    per-text cost, so batching behaves like it does with the real model.
+    """
+
+    def __init__(self, call_overhead=0.004, per_text=0.001):
+        self.call_overhead = call_overhead
+        self.per_text = per_text
+        self.calls = 0
+
+    def __call__(self, texts, max_length=100, min_length=5, do_sample=False, **kwargs):
+        self.calls += 1
+        batch = [texts] if isinstance(texts, str) else list(texts)
+        _burn_cpu(self.call_overhead + self.per_text * len(batch))
+        return [{"summary_text": " ".join(text.split()[:max_length // 4])} for text in batch]
+
+
+def make_fake_summarizer():
+    """Picklable pipeline factory for process-pool runs."""
+    return FakeSummarizer()
+
+
+class FakeCredentials:
+    """✅ Stand-in for google.oauth2 credentials with a controllable expiry."""
+
+    def __init__(self, lifetime=3600.0):
+        self.lifetime = lifetime
+        self.refreshes = 0
+        self.token = "token-0"
+        self._set_expiry()
+
+    def _set_expiry(self):
+        import datetime
+        now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+        self.expiry = now + datetime.timedelta(seconds=self.lifetime)
+
+    @property
+    def valid(self):
+        return True
+
+    def refresh(self, request=None):
+        self.refreshes += 1
+        self.token = f"token-{self.refreshes}"
+        self._set_expiry()
+
+
+def slow_credentials_loader(cost=0.005):
+    """Mimics unpickling token.pickle and checking validity."""
+    _burn_cpu(cost)
+    return FakeCredentials()
+
+
+def slow_service_builder(creds, cost=0.03, latency=0.0):
+    """Mimics build("gmail", "v1"): parsing the discovery document and wiring up resources."""
+    _burn_cpu(cost)
+    return FakeGmailService(latency=latency)
+
+
+class FakeSlackClient:
+    """✅ In-memory slack_sdk WebClient double that counts API calls per method."""
+
+    def __init__(self, users=(), latency=0.0):
+        self.users = {u["id"]: u for u in users}
+        self.history = {}
+        self.latency = latency
+        self.calls = {}
+        self.posted = []
+        self._lock = threading.Lock()
+
+    def _call(self, method):
+        with self._lock:
+            self.calls[method] = self.calls.get(method, 0) + 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def users_info(self, user):
+        self._call("users_info")
+        return {"ok": True, "user": self.users[user]}
+
+    def users_list(self, limit=200, cursor=None):
+        self._call("users_list")
+        members = list(self.users.values())
+        start = int(cursor or 0)
+        next_cursor = str(start + limit) if start + limit < len(members) else ""
+        return {"ok": True, "members": members[start:start + limit], "response_metadata": {"next_cursor": next_cursor}}
+
+    def conversations_history(self, channel, oldest="0", limit=100, cursor=None, latest=None, **kwargs):
+        """Newest first, like Slack; `history` maps channel -> messages in chronological order."""
+        self._call("conversations_history")
+        messages = [m for m in reversed(self.history.get(channel, []))
+                    if float(m["ts"]) > float(oldest) and (latest is None or float(m["ts"]) < float(latest))]
+        start = int(cursor or 0)
+        has_more = start + limit < len(messages)
+        return {"ok": True, "messages": messages[start:start + limit], "has_more": has_more,
+                "response_metadata": {"next_cursor": str(start + limit) if has_more else ""}}
+
+    def chat_postMessage(self, channel, text, **kwargs):
+        self._call("chat_postMessage")
+        with self._lock:
+            self.posted.append({"channel": channel, "text": text})
+        return {"ok": True, "channel": channel, "ts": f"{time.time():.6f}"}
+
+
+def make_slack_users(n):
+    return [{"id": f"U{i:05d}", "name": f"user{i}", "real_name": f"User Number {i}"} for i in range(n)]
+
+
+class _FakeSpan:
+    def __init__(self, text):
+        self.text = text
+
+
+class _FakeDoc:
+    def __init__(self, text):
+        words = text.replace(",", " ").replace(".", " ").split()
+        self.noun_chunks = [_FakeSpan(w) for w in words if w[:1].isupper() or len(w) > 6]
+
+
+class FakeNLP:
+    """✅ CPU-bound stand-in for a spaCy Language: per-call dispatch cost plus per-component work."""
+
+    def __init__(self, components=("tok2vec", "tagger", "parser", "attribute_ruler", "lemmatizer", "ner"),
+                 call_overhead=0.0003, per_component=0.00008):
+        self.pipe_names = list(components)
+        self.call_overhead = call_overhead
+        self.per_component = per_component
+
+    def __call__(self, text):
+        _burn_cpu(self.call_overhead + self.per_component * len(self.pipe_names))
+        return _FakeDoc(text)
+
+    def pipe(self, texts, batch_size=64, n_process=1):
+        texts = list(texts)
+        for start in range(0, len(texts), batch_size):
+            batch = texts[start:start + batch_size]
+            _burn_cpu(self.call_overhead + self.per_component * len(self.pipe_names) * len(batch) * 0.6)
+            for text in batch:
+                yield _FakeDoc(text)
+
+
+def make_fake_trimmed_nlp():
+    return FakeNLP(components=("tok2vec", "tagger", "parser", "attribute_ruler"))
+
+
+class _FakeUsage:
+    def __init__(self, prompt_tokens, output_tokens):
+        self.prompt_token_count = prompt_tokens
+        self.candidates_token_count = output_tokens
+        self.total_token_count = prompt_tokens + output_tokens
+
+
+class _FakeLLMResponse:
+    def __init__(self, text, prompt):
+        self.text = text
+        self.usage_metadata = _FakeUsage(len(prompt) // 4 + 1, len(text) // 4 + 1)
+
+
+class FakeGeminiModel:
+    """✅ Local stand-in for genai.GenerativeModel with latency, a context limit and call counting."""
+
+    def __init__(self, latency=0.0, max_prompt_tokens=None, fail_every=0):
+        self.latency = latency
+        self.max_prompt_tokens = max_prompt_tokens
+        self.fail_every = fail_every
+        self.calls = 0
+        self.prompts = []
+        self._lock = threading.Lock()
+
+    def generate_content(self, prompt):
+        with self._lock:
+            self.calls += 1
+            calls = self.calls
+            self.prompts.append(prompt)
+        if self.latency:
+            time.sleep(self.latency)
+        if self.fail_every and calls % self.fail_every == 0:
+            raise RuntimeError("429 Resource has been exhausted")
+        if self.max_prompt_tokens and len(prompt) // 4 > self.max_prompt_tokens:
+            raise ValueError("400 The input token count exceeds the maximum number of tokens allowed")
+        lines = prompt.count("\n")
+        return _FakeLLMResponse(f"Summary covering {lines} lines: {prompt[-60:].strip()}", prompt)
+
+
+class FakeSocketModeServer:
+    """✅ Local stand-in for Slack's Socket Mode endpoint.
+
+    Delivers every payload as an events_api envelope, closes the
+    connection with a disconnect frame every `disconnect_every` envelopes,
+    and redelivers envelopes that were not acknowledged on the next
+    connection, like Slack does.
+    """
+
+    def __init__(self, payloads, disconnect_every=0, latency=0.0):
+        self.pending = [{"envelope_id": f"env-{i}", "type": "events_api", "payload": payload,
+                         "accepts_response_payload": False} for i, payload in enumerate(payloads)]
+        self.disconnect_every = disconnect_every
+        self.latency = latency
+        self.acked = set()
+        self.delivered = 0
+        self.connections = 0
+
+    async def connect(self):
+        self.connections += 1
+        return FakeSocketModeConnection(self)
+
+    def done(self):
+        return len(self.acked) == len(self.pending)
+
+
+class FakeSocketModeConnection:
+    """One websocket connection to FakeSocketModeServer (recv/send/close like websockets)."""
+
+    def __init__(self, server):
+        self.server = server
+        self.closed = False
+        self.frames = [{"type": "hello"}]
+        unacked = [e for e in server.pending if e["envelope_id"] not in server.acked]
+        for count, envelope in enumerate(unacked, 1):
+            self.frames.append(envelope)
+            if server.disconnect_every and count % server.disconnect_every == 0:
+                self.frames.append({"type": "disconnect", "reason": "refresh_requested"})
+                break
+        self.frames.reverse()
+
+    async def recv(self):
+        if self.server.latency:
+            await asyncio.sleep(self.server.latency)
+        if not self.frames:
+            if self.server.done():
+                await asyncio.sleep(3600)  # idle connection; the reader's poll timeout fires first
+            await asyncio.sleep(0.01)
+            return json.dumps({"type": "disconnect", "reason": "refresh_requested"})  # retry the unacked ones
+        frame = self.frames.pop()
+        if frame.get("type") == "events_api":
+            self.server.delivered += 1
+        return json.dumps(frame)
+
+    async def send(self, message):
+        self.server.acked.add(json.loads(message)["envelope_id"])
+
+    async def close(self):
+        self.closed = True
+
+
+class _FakeComposeBox:
+    ENTER = "\ue007"  # selenium's Keys.ENTER
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.text = ""
+
+    def send_keys(self, keys):
+        if keys == self.ENTER:
+            text, self.text = self.text, ""
+            self.driver.type_reply(text)
+        else:
+            self.text += keys
+
+
+class FakeWhatsAppDriver:
+    """✅ Local stand-in for a WebDriver on WhatsApp Web, answering the wa_capture scripts.
+
+    Every chat in `arrivals` starts with `history` old messages.
+    `arrivals` is a list of (seconds after start, chat, text); a message
+    shows up once its time has passed, in the open chat or as an unread
+    badge, and the installed observer queues the same events the real
+    page would. Every execute_script call costs `latency` seconds and
+    type_reply() (the compose box) `typing` seconds. Replies are recorded
+    in `replies` as (chat, text, seconds after start).
+    """
+
+    def __init__(self, arrivals=(), history=1, latency=0.002, typing=0.01, clock=time.monotonic):
+        self.arrivals = sorted(arrivals)
+        self.latency = latency
+        self.typing = typing
+        self.clock = clock
+        self.start = clock()
+        self.chats = {}  # chat -> [{"id", "dir", "text"}]
+        self.unread = {}
+        self.open = None
+        self.events = None  # the observer's queue once installed
+        self.replies = []
+        self.scripts = 0
+        self._next_id = 1
+        self._lock = threading.Lock()
+        for _, chat, _ in self.arrivals:
+            if chat not in self.chats:
+                self.chats[chat] = [self._message(chat, "in", f"old message {i}") for i in range(history)]
+                self.unread[chat] = 0
+
+    def _message(self, chat, direction, text):
+        self._next_id += 1
+        return {"id": f"{direction == 'out'}_{chat}_{self._next_id}".lower(), "dir": direction, "text": text}
+
+    def _deliver_due(self):
+        now = self.clock() - self.start
+        while self.arrivals and self.arrivals[0][0] <= now:
+            _, chat, text = self.arrivals.pop(0)
+            self.chats[chat].append(self._message(chat, "in", text))
+            if chat == self.open:
+                self._observe("message", chat)
+            else:
+                self.unread[chat] += 1
+                self._observe("unread", chat, self.unread[chat])
+
+    def _observe(self, kind, chat, count=None):
+        if self.events is not None:
+            event = {"kind": kind, "chat": chat, "at": self.clock()}
+            if count is not None:
+                event["count"] = count
+            self.events.append(event)
+
+    def execute_script(self, script, *args):
+        from wa_capture import DRAIN_JS, EXTRACT_JS, INSTALL_JS, OPEN_CHAT_JS
+
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.scripts += 1
+            self._deliver_due()
+            if script is INSTALL_JS:
+                if self.events is not None:
+                    return False
+                self.events = [{"kind": "unread", "chat": c, "count": n, "at": self.clock()}
+                               for c, n in self.unread.items() if n]
+                return True
+            if script is DRAIN_JS:
+                if self.events is None:
+                    return None
+                events, self.events = self.events, []
+                return events
+            if script is OPEN_CHAT_JS:
+                if args[0] not in self.chats:
+                    return False
+                self.open = args[0]
+                self.unread[self.open] = 0
+                if self.chats[self.open]:
+                    self._observe("message", self.open)  # rendering the chat adds its rows
+                return True
+            if script is EXTRACT_JS:
+                return self._extract(*args)
+        raise NotImplementedError("FakeWhatsAppDriver only runs the wa_capture scripts")
+
+    def _extract(self, cursor, limit):
+        rows = self.chats.get(self.open, [])
+        messages, reached = [], False
+        for row in reversed(rows):
+            if len(messages) >= limit:
+                break
+            if row["id"] == cursor:
+                reached = True
+                break
+            if row["dir"] == "in":
+                messages.append({"id": row["id"], "chat": self.open, "text": row["text"], "sender": self.open,
+                                 "timestamp": None})
+        messages.reverse()
+        unread = [{"chat": c, "count": n, "preview": self.chats[c][-1]["text"]} for c, n in self.unread.items() if n]
+        return {"chat": self.open, "messages": messages, "newest_id": rows[-1]["id"] if rows else None,
+                "reached_cursor": reached, "unread": unread}
+
+    def find_element(self, by=None, value=None):
+        """The compose box: whatsapp_bot.send_reply() finds it through WebDriverWait."""
+        return _FakeComposeBox(self)
+
+    def type_reply(self, text):
+        """Type text into the open chat's compose box and press Enter."""
+        if self.typing:
+            time.sleep(self.typing)
+        with self._lock:
+            if self.open is None:
+                raise RuntimeError("no chat is open")
+            self.chats[self.open].append(self._message(self.open, "out", text))
+            self.replies.append((self.open, text, self.clock() - self.start))
+
+    def pending(self):
+        """Messages that have not arrived yet."""
+        with self._lock:
+            return len(self.arrivals)
@@ -0,0 +1,225 @@
+"""FAQ answers for chat messages: exact lookups plus a character n-gram TF-IDF index, reloaded on change."""
+import json
+import os
+import re
+import threading
+import time
+
+from collections import Counter
+
+import numpy as np
+import scipy.sparse as sp
+
+NGRAM_SIZES = (3, 4)
+
+_WORD = re.compile(r"\w+")
+
+
+def normalize_text(text):
+    """Lowercase words separated by single spaces, punctuation dropped."""
+    return " ".join(_WORD.findall(text.lower()))
+
+
+def char_ngrams(key):
+    """Character 3- and 4-grams of every word, padded with a space on each side (" hi", "hi ", " hi ")."""
+    grams = []
+    for word in key.split():
+        padded = f" {word} "
+        for n in NGRAM_SIZES:
+            grams.extend(padded[i:i + n] for i in range(max(1, len(padded) - n + 1)))
+    return grams
+
+
+def load_faq(path):
+    """✅ Read FAQ entries: a JSON list of {"questions": [...], "answer": "...", "exact": false}.
+
+    An entry marked "exact" (greetings like "hi") only answers a message
+    that is exactly one of its questions, as the old auto-reply dict did.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+class FaqIndex:
+    """✅ Answers a message from the FAQ when it is close enough to a known question.
+
+    Every question is split into character 3- and 4-grams within words
+    (so typos and word order cost little), IDF-weighted and L2-normalized
+    once, and stored as an inverted index: for every n-gram, the
+    questions containing it and their weights. A lookup only touches the
+    postings of the message's own n-grams, so it stays well under a
+    millisecond with thousands of entries. The best question wins if its
+    cosine similarity reaches `threshold`; n-grams no question has still
+    count towards the message's norm, so unrelated text scores low.
+    Messages that match a question exactly after normalization, or contain
+    one as whole words ("hey, how to contact support? my account is
+    locked"), skip the vector step entirely, as the old substring match did.
+    """
+
+    def __init__(self, entries=(), threshold=0.6):
+        self.threshold = threshold
+        self.exact = {}  # normalized question -> answer
+        self.questions = []
+        self.answers = []  # answer for each row of the matrix
+        for entry in entries:
+            for question in entry["questions"]:
+                key = normalize_text(question)
+                self.exact.setdefault(key, entry["answer"])
+                if not entry.get("exact"):
+                    self.questions.append(key)
+                    self.answers.append(entry["answer"])
+        self._starts = {}  # first word -> questions as word tuples, longest first, for the containment check
+        for key in dict.fromkeys(self.questions):
+            words = tuple(key.split())
+            self._starts.setdefault(words[0], []).append(words)
+        for candidates in self._starts.values():
+            candidates.sort(key=len, reverse=True)
+        self.vocabulary = {}  # n-gram -> column
+        rows, cols, counts = [], [], []
+        for row, question in enumerate(self.questions):
+            for gram, count in Counter(char_ngrams(question)).items():
+                rows.append(row)
+                cols.append(self.vocabulary.setdefault(gram, len(self.vocabulary)))
+                counts.append(count)
+        matrix = sp.csr_matrix((np.array(counts, dtype=np.float32), (rows, cols)),
+                               shape=(len(self.questions), len(self.vocabulary)))
+        df = np.bincount(matrix.indices, minlength=len(self.vocabulary))
+        self.idf = (np.log((1 + len(self.questions)) / (1 + df)) + 1.0).astype(np.float32)
+        self.unknown_idf = float(np.log(1 + len(self.questions)) + 1.0)
+        # Inverted index: row g of the transposed matrix lists the questions containing n-gram g
+        weighted = matrix.multiply(self.idf).tocsr()
+        norms = np.sqrt(np.asarray(weighted.multiply(weighted).sum(axis=1)).ravel())
+        weighted = sp.diags(np.divide(1.0, norms, out=np.zeros_like(norms), where=norms > 0)) @ weighted
+        postings = weighted.T.tocsr()
+        self._indptr, self._indices, self._weights = postings.indptr, postings.indices, postings.data
+        self.hits = 0
+        self.exact_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_file(cls, path, **kwargs):
+        return cls(load_faq(path), **kwargs)
+
+    def __len__(self):
+        return len(self.exact)
+
+    def _contained(self, key):
+        """The first (at a tie, longest) question the message contains as whole words, or None."""
+        words = key.split()
+        for i, word in enumerate(words):
+            for question in self._starts.get(word, ()):
+                if tuple(words[i:i + len(question)]) == question:
+                    return " ".join(question)
+        return None
+
+    def _nearest(self, key):
+        """(cosine similarity, row) of the closest question, or None."""
+        if not self.questions or not key:
+            return None
+        norm = 0.0
+        postings, weights = [], []
+        for gram, count in Counter(char_ngrams(key)).items():
+            col = self.vocabulary.get(gram)
+            if col is None:
+                norm += (count * self.unknown_idf) ** 2
+                continue
+            weight = count * self.idf[col]
+            norm += weight * weight
+            start, end = self._indptr[col], self._indptr[col + 1]
+            postings.append(self._indices[start:end])
+            weights.append(self._weights[start:end] * weight)
+        if not postings:
+            return None
+        scores = np.bincount(np.concatenate(postings), weights=np.concatenate(weights), minlength=len(self.questions))
+        best = int(scores.argmax())
+        return float(scores[best] / norm ** 0.5), best
+
+    def search(self, text):
+        """✅ Return (answer, score, question) for the closest question, or None if there are none."""
+        key = normalize_text(text)
+        if key in self.exact:
+            return self.exact[key], 1.0, key
+        contained = self._contained(key)
+        if contained:
+            return self.exact[contained], 1.0, contained
+        nearest = self._nearest(key)
+        if nearest is None:
+            return None
+        score, row = nearest
+        return self.answers[row], score, self.questions[row]
+
+    def answer(self, text):
+        """✅ Return the FAQ answer for a message, or None when nothing reaches the threshold."""
+        key = normalize_text(text)
+        contained = key if key in self.exact else self._contained(key)
+        if contained is not None:
+            answer = self.exact[contained]
+            with self._lock:
+                self.hits += 1
+                self.exact_hits += 1
+            return answer
+        nearest = self._nearest(key)
+        found = nearest is not None and nearest[0] >= self.threshold
+        with self._lock:
+            if found:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return self.answers[nearest[1]] if found else None
+
+    def stats(self):
+        """✅ Size and hit counters."""
+        with self._lock:
+            asked = self.hits + self.misses
+            return {"questions": len(self.exact), "hits": self.hits, "exact_hits": self.exact_hits,
+                    "misses": self.misses, "hit_rate": round(self.hits / asked, 3) if asked else 0.0}
+
+
+class ReloadingFaqIndex:
+    """✅ A FaqIndex that rebuilds itself when its file changes.
+
+    The file's mtime is checked at most every check_interval seconds; a
+    changed file is parsed and indexed in full before it replaces the
+    current index, so lookups never see a half-built one, and a file that
+    fails to load leaves the previous index in place.
+    """
+
+    def __init__(self, path, check_interval=2.0, clock=time.monotonic, **kwargs):
+        self.path = path
+        self.check_interval = check_interval
+        self.clock = clock
+        self.kwargs = kwargs
+        self.reloads = 0
+        self._lock = threading.Lock()
+        self._mtime = os.stat(path).st_mtime_ns
+        self._checked_at = clock()
+        self.index = FaqIndex.from_file(path, **kwargs)
+
+    def _maybe_reload(self):
+        now = self.clock()
+        if now - self._checked_at < self.check_interval:
+            return
+        with self._lock:
+            if now - self._checked_at < self.check_interval:
+                return
+            self._checked_at = now
+            try:
+                mtime = os.stat(self.path).st_mtime_ns
+                if mtime == self._mtime:
+                    return
+                self.index = FaqIndex.from_file(self.path, **self.kwargs)
+                self._mtime = mtime
+                self.reloads += 1
+                print(f"🔄 Reloaded {len(self.index)} FAQ questions from {self.path}")
+            except Exception as e:
+                print(f"⚠️ Keeping the current FAQ, reload failed: {e}")
+
+    def answer(self, text):
+        """✅ FaqIndex.answer() on the current version of the file."""
+        self._maybe_reload()
+        return self.index.answer(text)
+
+    def stats(self):
+        """✅ The current index's counters (they restart on reload) and the number of reloads."""
+        return dict(self.index.stats(), reloads=self.reloads)
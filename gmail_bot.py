@@ -1,178 +1,162 @@
 
 import os
-import sqlite3
-import pickle
-import base64
+import threading
 import time
 import json
 from email.mime.text import MIMEText
 from dotenv import load_dotenv
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
-from transformers import pipeline
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+from email_tracker import TrackerStore
+from gmail_client import SCOPES, GmailClientManager
+from gmail_fetch import fetch_emails
+from mime_body import extract_body
+from gmail_sync import GmailSync
+import metrics
+import reminders
+from rule_engine import get_engine
+from summary_engine import SummaryEngine
 
 # Load environment variables
 load_dotenv()
 GMAIL_SENDER_EMAIL = os.getenv("GMAIL_SENDER_EMAIL")
 GMAIL_APP_PASSWORD = os.getenv("GMAIL_APP_PASSWORD")
 
-# Load Local NLP Summarizer
-summarizer = pipeline("summarization", model="facebook/bart-large-cnn")
+# Heavy resources (BART, TF-IDF) and the tracker database are loaded on first use, see the accessors below
+_models_lock = threading.Lock()
+_summary_engine = None
+_reply_index = None
+_gmail_manager = None
+_tracker = None
 
-# Define OAuth Scopes
-SCOPES = ['https://www.googleapis.com/auth/gmail.readonly']
 
-# Initialize SQLite Database
-conn = sqlite3.connect("email_tracker.db", check_same_thread=False)
-cursor = conn.cursor()
-cursor.execute("""
-CREATE TABLE IF NOT EXISTS unanswered_emails (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    sender TEXT,
-    subject TEXT,
-    category TEXT,
-    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-    reminded INTEGER DEFAULT 0
-)
-""")
-conn.commit()
+def get_tracker():
+    """✅ Return the SQLite tracker store, creating email_tracker.db on first use (one connection per thread)."""
+    global _tracker
+    with _models_lock:
+        if _tracker is None:
+            _tracker = TrackerStore("email_tracker.db")
+        return _tracker
 
 
-def authenticate_gmail():
-    """✅ Authenticate and return Gmail API service."""
-    creds = None
-    if os.path.exists("token.pickle"):
-        with open("token.pickle", "rb") as token:
-            creds = pickle.load(token)
-
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            creds.refresh(Request())
-        else:
-            flow = InstalledAppFlow.from_client_secrets_file("credentials.json", SCOPES)
-            creds = flow.run_local_server(port=0)
+def get_gmail_manager():
+    """✅ Return the shared Gmail client manager, starting its token refresher on first use."""
+    global _gmail_manager
+    with _models_lock:
+        if _gmail_manager is None:
+            manager = GmailClientManager(scopes=SCOPES)
+            manager.credentials  # Authorize in the caller's thread, never in the refresher
+            _gmail_manager = manager.start()
+        return _gmail_manager
 
-        with open("token.pickle", "wb") as token:
-            pickle.dump(creds, token)
 
-    return build("gmail", "v1", credentials=creds)
+def authenticate_gmail():
+    """✅ Authenticate and return Gmail API service."""
+    return get_gmail_manager().get_service()
 
 
 def get_email_body(service, msg_id):
     """✅ Extract the email body."""
     try:
         msg = service.users().messages().get(userId="me", id=msg_id).execute()
-        payload = msg["payload"]
-
-        body = ""
-        if "parts" in payload:
-            for part in payload["parts"]:
-                if part["mimeType"] == "text/plain":
-                    body = base64.urlsafe_b64decode(part["body"]["data"]).decode("utf-8", errors="ignore")
-                    break
-        elif "body" in payload and "data" in payload["body"]:
-            body = base64.urlsafe_b64decode(payload["body"]["data"]).decode("utf-8", errors="ignore")
-
-        return body[:1000] if body else "No content available."
+        return extract_body(msg["payload"])
     except Exception as e:
         print(f"⚠️ Error fetching email body: {e}")
         return "No content available."
 
 
+def get_summary_engine():
+    """✅ Return the summarization engine; BART itself loads on the first summary."""
+    global _summary_engine
+    with _models_lock:
+        if _summary_engine is None:
+            _summary_engine = SummaryEngine()
+        return _summary_engine
+
+
+def get_summarizer():
+    """✅ Return the local BART summarization pipeline, loading it on first use."""
+    return get_summary_engine().pipeline
+
+
 def summarize_email(email_body):
     """✅ Summarize email using a local NLP model."""
-    try:
-        max_len = max(10, min(len(email_body) // 2, 100))
-        return summarizer(email_body, max_length=max_len, min_length=5, do_sample=False)[0]["summary_text"]
-    except Exception as e:
-        print(f"⚠️ Summarization Error: {e}")
-        return "Summary unavailable."
+    return get_summary_engine().summarize(email_body)
+
 
+# Reply intents for context-aware suggestions; override with REPLY_CATALOG (.json or .jsonl)
+REPLY_CATALOG = os.getenv("REPLY_CATALOG", os.path.join(os.path.dirname(os.path.abspath(__file__)), "responses.json"))
 
-# Predefined responses for context-aware suggestions
-response_database = {
-    "meeting": ["What time works for you?", "Let’s schedule it.", "Do we need an agenda?"],
-    "urgent": ["Got it! I'll handle it ASAP.", "I'll prioritize this.", "I'll get back to you shortly."],
-    "invoice": ["Please find the attached invoice.", "I'll check the payment status.", "Can you share the invoice number?"],
-    "support": ["How can I assist you?", "Can you provide more details?", "I'll forward this to the support team."],
-    "deadline": ["Understood! I'll ensure it's completed on time.", "I'll work on it and update you soon.", "Can you confirm the due date?"],
-    "thank you": ["You're welcome!", "Happy to help!", "Glad I could assist!"]
-}
 
-# Train TF-IDF model on predefined response categories
-queries = list(response_database.keys())
-vectorizer = TfidfVectorizer().fit(queries)
+def get_reply_index():
+    """✅ Build the precomputed TF-IDF reply index from the catalog on first use."""
+    global _reply_index
+    with _models_lock:
+        if _reply_index is None:
+            from reply_index import ReplyIndex
+            _reply_index = ReplyIndex.from_file(REPLY_CATALOG)
+        return _reply_index
 
 
 def suggest_reply(email_body):
     """✅ Suggest replies using TF-IDF similarity."""
-    email_vec = vectorizer.transform([email_body])
-    query_vecs = vectorizer.transform(queries)
+    return get_reply_index().suggest([email_body])[0]
 
-    # Compute similarity scores
-    similarities = cosine_similarity(email_vec, query_vecs).flatten()
 
-    # Get the best matching response
-    best_match_index = similarities.argmax()
-    best_match_score = similarities[best_match_index]
+def categorize_email(subject, sender, body=""):
+    """Categorize an email."""
+    return get_engine("email").classify({"subject": subject, "sender": sender, "body": body})
 
-    # If similarity score is good, return the matching replies
-    if best_match_score > 0.3:
-        return response_database[queries[best_match_index]]
 
-    # Otherwise, return fallback replies
-    return ["Thanks for reaching out!", "I'll check and update you.", "Let me get back to you soon."]
+# One GmailSync per thread, each on that thread's tracker connection
+_inbox_sync = threading.local()
 
 
-def categorize_email(subject, sender):
-    """Categorize an email."""
-    urgent_keywords = ["urgent", "immediate", "important", "asap", "action required"]
-    follow_up_keywords = ["follow up", "reminder", "update", "check-in"]
-    low_priority_keywords = ["newsletter", "promotion", "sale", "discount", "subscription"]
-
-    subject_lower = subject.lower()
-    if any(keyword in subject_lower for keyword in urgent_keywords):
-        return "Urgent 🚨"
-    elif any(keyword in subject_lower for keyword in follow_up_keywords):
-        return "Follow-up ⏳"
-    elif any(keyword in subject_lower for keyword in low_priority_keywords):
-        return "Low Priority 📨"
-    else:
-        return "General 📩"
-
-
-def fetch_and_process_emails():
-    """Fetch and process emails."""
+def get_inbox_sync():
+    """✅ Return this thread's inbox sync state, loading processed message IDs once per thread."""
+    sync = getattr(_inbox_sync, "sync", None)
+    if sync is None:
+        sync = _inbox_sync.sync = GmailSync(get_tracker().connection(), name="inbox")
+    return sync
+
+
+def fetch_and_process_emails(incremental=False):
+    """Fetch and process emails.
+
+    With incremental=True only mail added since the last run is fetched,
+    using the Gmail history cursor stored in email_tracker.db.
+    """
     service = authenticate_gmail()
-    results = service.users().messages().list(userId="me", maxResults=10).execute()
-    messages = results.get("messages", [])
+    with metrics.timer("gmail", "fetch"):
+        if incremental:
+            sync = get_inbox_sync()
+            msg_ids = sync.pending_message_ids(service)
+        else:
+            results = service.users().messages().list(userId="me", maxResults=10).execute()
+            msg_ids = [msg["id"] for msg in results.get("messages", [])]
 
-    if not messages:
+    if not msg_ids:
+        if incremental:
+            sync.commit([])
         print("✅ No new messages.")
         return
 
     email_data = []
+    with metrics.timer("gmail", "fetch"):
+        emails = fetch_emails(service, msg_ids)
+    metrics.count("gmail", "emails", len(emails))
+    bodies = [email["body"] for email in emails]
+    with metrics.timer("gmail", "summarize"):
+        summaries = get_summary_engine().summarize_many(bodies)
+    with metrics.timer("gmail", "suggest"):
+        replies = get_reply_index().suggest(bodies)
+    with metrics.timer("gmail", "classify"):
+        categories = get_engine("email").classify_many(emails)
+
+    for email, category, summary, suggested_replies in zip(emails, categories, summaries, replies):
+        subject, sender = email["subject"], email["sender"]
 
-    for msg in messages:
-        msg_id = msg["id"]
-        msg_data = service.users().messages().get(userId="me", id=msg_id).execute()
-        headers = msg_data["payload"]["headers"]
-
-        subject = next((h["value"] for h in headers if h["name"] == "Subject"), "No Subject")
-        sender = next((h["value"] for h in headers if h["name"] == "From"), "Unknown Sender")
-        email_body = get_email_body(service, msg_id)
-
-        category = categorize_email(subject, sender)
         priority_order = {"Urgent 🚨": 1, "Follow-up ⏳": 2, "General 📩": 3, "Low Priority 📨": 4}
         priority = priority_order.get(category, 3)
 
-        summary = summarize_email(email_body)
-        suggested_replies = suggest_reply(email_body)
-
         email_data.append((priority, category, sender, subject, summary, suggested_replies))
 
     email_data.sort(key=lambda x: x[0])
@@ -187,6 +171,10 @@ def fetch_and_process_emails():
             print(f" {reply}")
         print("\n")
 
+    if incremental:
+        with metrics.timer("gmail", "db_write"):
+            sync.commit(emails)
+
 def check_unanswered_emails():
     """Find and track important unanswered emails."""
     service = authenticate_gmail()
@@ -197,43 +185,39 @@ def check_unanswered_emails():
         print("✅ No unanswered emails.")
         return
 
-    for msg in messages:
-        msg_id = msg["id"]
-        msg_data = service.users().messages().get(userId="me", id=msg_id).execute()
-        headers = msg_data["payload"]["headers"]
+    with metrics.timer("gmail", "fetch"):
+        emails = fetch_emails(service, [msg["id"] for msg in messages], with_body=False)
+    with metrics.timer("gmail", "classify"):
+        categories = get_engine("email").classify_many(emails)
+    with metrics.timer("gmail", "db_write"):
+        get_tracker().track_many((email["id"], email["sender"], email["subject"], category)
+                                 for email, category in zip(emails, categories))
 
-        subject = next((h["value"] for h in headers if h["name"] == "Subject"), "No Subject")
-        sender = next((h["value"] for h in headers if h["name"] == "From"), "Unknown Sender")
-
-        category = categorize_email(subject, sender)
-        cursor.execute("INSERT INTO unanswered_emails (sender, subject, category) VALUES (?, ?, ?)",
-                       (sender, subject, category))
-        conn.commit()
-        print(f"📩 Unanswered Email Tracked: {subject} from {sender}")
+    for email in emails:
+        print(f"📩 Unanswered Email Tracked: {email['subject']} from {email['sender']}")
 
-def send_reminders():
+def send_reminders(sink=None):
     """Send reminders for unanswered emails that are still pending."""
-    cursor.execute("SELECT * FROM unanswered_emails WHERE reminded=0")  # Get unreminded emails
-    emails = cursor.fetchall()
-
-    if not emails:
+    with metrics.timer("gmail", "send"):
+        count = reminders.send_reminders(get_tracker(), sink or reminders.StdoutSink())
+    metrics.count("gmail", "reminders", count)
+    if not count:
         print("✅ No pending reminders.")
         return
 
-    for email in emails:
-        email_id, sender, subject, category, timestamp, reminded = email
-
-        reminder_msg = f"🔔 *Reminder: Unanswered Email!*\n🔹 *From:* {sender}\n🔹 *Subject:* {subject}\n🔹 *Category:* {category}\n⏳ Please respond soon."
+    print(f"🔔 Reminders sent for {count} unanswered emails.")
 
-        # Mark the email as reminded in the database
-        cursor.execute("UPDATE unanswered_emails SET reminded=1 WHERE id=?", (email_id,))
-        conn.commit()
 
-        print(f"🔔 Reminder for: {subject}")
+def warm_up():
+    """✅ Load every heavy model up front, for long-running deployments."""
+    get_summarizer()
+    get_reply_index()
+    authenticate_gmail()
+    print("🔥 Gmail bot models and client loaded.")
 
 
 if __name__ == "__main__":
-    fetch_and_process_emails()
+    fetch_and_process_emails(incremental=os.getenv("GMAIL_INCREMENTAL_SYNC") == "1")
     time.sleep(1)
     check_unanswered_emails()
     time.sleep(1)
@@ -0,0 +1,155 @@
+"""Long-lived Gmail client: credentials loaded once, services reused, tokens refreshed ahead of expiry."""
+import datetime
+import os
+import pickle
+import threading
+
+SCOPES = ['https://www.googleapis.com/auth/gmail.readonly']
+
+
+def load_credentials(token_path="token.pickle", credentials_path="credentials.json", scopes=SCOPES):
+    """✅ Load OAuth credentials from the token file, refreshing or re-authorizing if needed."""
+    from google.auth.transport.requests import Request
+    from google_auth_oauthlib.flow import InstalledAppFlow
+
+    creds = None
+    if os.path.exists(token_path):
+        with open(token_path, "rb") as token:
+            creds = pickle.load(token)
+
+    if not creds or not creds.valid:
+        if creds and creds.expired and creds.refresh_token:
+            creds.refresh(Request())
+        else:
+            flow = InstalledAppFlow.from_client_secrets_file(credentials_path, scopes)
+            creds = flow.run_local_server(port=0)
+        save_credentials(creds, token_path)
+    return creds
+
+
+def save_credentials(creds, token_path="token.pickle"):
+    with open(token_path, "wb") as token:
+        pickle.dump(creds, token)
+
+
+def refresh_credentials(creds):
+    from google.auth.transport.requests import Request
+    creds.refresh(Request())
+
+
+_discovery_doc = None
+
+
+def build_service(creds):
+    """✅ Build a Gmail service with its own persistent HTTP connection.
+
+    The discovery document is read once per process and reused, so later
+    builds skip both the network and the JSON load of build().
+    """
+    global _discovery_doc
+    import google_auth_httplib2
+    import httplib2
+    from googleapiclient.discovery import build, build_from_document
+
+    http = google_auth_httplib2.AuthorizedHttp(creds, http=httplib2.Http())
+    if _discovery_doc is None:
+        try:
+            from googleapiclient.discovery_cache import get_static_doc
+            _discovery_doc = get_static_doc("gmail", "v1")
+        except ImportError:
+            _discovery_doc = None
+        if _discovery_doc is None:
+            return build("gmail", "v1", http=http, cache_discovery=False)
+    return build_from_document(_discovery_doc, http=http)
+
+
+class GmailClientManager:
+    """✅ Hands out Gmail services that share one set of credentials.
+
+    The Google client and httplib2 are not thread-safe, so every thread gets
+    its own service (and so its own keep-alive connection), built once and
+    reused for the life of the thread. A background thread refreshes the
+    token refresh_margin seconds before it expires and persists it.
+    """
+
+    def __init__(self, token_path="token.pickle", credentials_path="credentials.json", scopes=SCOPES,
+                 refresh_margin=300, credentials_loader=None, service_builder=build_service,
+                 refresher=refresh_credentials):
+        self.token_path = token_path
+        self.refresh_margin = refresh_margin
+        self.credentials_loader = credentials_loader or (lambda: load_credentials(token_path, credentials_path, scopes))
+        self.service_builder = service_builder
+        self.refresher = refresher
+        self.services_built = 0
+        self.refreshes = 0
+        self._creds = None
+        self._lock = threading.RLock()
+        self._local = threading.local()
+        self._stop = threading.Event()
+        self._refresh_thread = None
+
+    @property
+    def credentials(self):
+        with self._lock:
+            if self._creds is None:
+                self._creds = self.credentials_loader()
+            return self._creds
+
+    def get_service(self):
+        """✅ Return this thread's Gmail service, building it on first use."""
+        service = getattr(self._local, "service", None)
+        if service is None:
+            service = self.service_builder(self.credentials)
+            self._local.service = service
+            with self._lock:
+                self.services_built += 1
+        return service
+
+    def refresh(self):
+        """✅ Refresh the access token now and persist it."""
+        with self._lock:
+            creds = self.credentials
+            self.refresher(creds)
+            self.refreshes += 1
+            if self.token_path:
+                try:
+                    save_credentials(creds, self.token_path)
+                except (OSError, pickle.PicklingError) as e:
+                    print(f"⚠️ Could not save refreshed token: {e}")
+
+    def seconds_until_refresh(self):
+        expiry = getattr(self.credentials, "expiry", None)
+        if expiry is None:
+            return 60.0
+        # google-auth stores expiry as a naive UTC datetime
+        now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+        return (expiry - now).total_seconds() - self.refresh_margin
+
+    def _refresh_loop(self):
+        while not self._stop.is_set():
+            wait = self.seconds_until_refresh()
+            if wait > 0:
+                self._stop.wait(min(wait, 60.0))
+                continue
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"⚠️ Gmail token refresh failed: {e}")
+                self._stop.wait(30.0)
+
+    def start(self):
+        """✅ Start the background token refresher."""
+        with self._lock:
+            if self._refresh_thread is None or not self._refresh_thread.is_alive():
+                self._stop.clear()
+                self._refresh_thread = threading.Thread(target=self._refresh_loop, name="gmail-token-refresh",
+                                                        daemon=True)
+                self._refresh_thread.start()
+        return self
+
+    def stop(self):
+        """Stop the background token refresher."""
+        self._stop.set()
+        if self._refresh_thread is not None:
+            self._refresh_thread.join(timeout=5)
+            self._refresh_thread = None
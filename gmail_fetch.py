@@ -0,0 +1,114 @@
+"""Gmail message retrieval: fetch every message exactly once, in batches."""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+from mime_body import DEFAULT_MAX_CHARS, METADATA_HEADERS, NO_CONTENT, extract_body
+
+# Gmail accepts up to 100 calls per batch but recommends staying at or below 50
+BATCH_SIZE = 50
+
+
+def get_header(headers, name, default):
+    """✅ Return the value of a message header, or a default."""
+    return next((h["value"] for h in headers if h["name"] == name), default)
+
+
+def parse_message(msg_data, with_body=True, max_chars=DEFAULT_MAX_CHARS):
+    """✅ Turn a raw Gmail message into the fields both bot code paths use."""
+    payload = msg_data.get("payload", {})
+    headers = payload.get("headers", [])
+    email = {
+        "id": msg_data["id"],
+        "thread_id": msg_data.get("threadId"),
+        "history_id": msg_data.get("historyId"),
+        "subject": get_header(headers, "Subject", "No Subject"),
+        "sender": get_header(headers, "From", "Unknown Sender"),
+    }
+    if with_body:
+        try:
+            with metrics.timer("gmail", "body_decode"):
+                email["body"] = extract_body(payload, max_chars)
+        except Exception as e:
+            print(f"⚠️ Error decoding email body: {e}")
+            email["body"] = NO_CONTENT
+    return email
+
+
+def _get_request(service, msg_id, fmt):
+    if fmt == "metadata":
+        return service.users().messages().get(userId="me", id=msg_id, format=fmt, metadataHeaders=METADATA_HEADERS)
+    return service.users().messages().get(userId="me", id=msg_id, format=fmt)
+
+
+def _fetch_batched(service, msg_ids, fmt, batch_size):
+    """Fetch messages through Gmail batch requests, one HTTP round trip per batch."""
+    results = {}
+
+    def on_response(request_id, response, exception):
+        if exception is not None:
+            print(f"⚠️ Error fetching message {request_id}: {exception}")
+        else:
+            results[request_id] = response
+
+    for start in range(0, len(msg_ids), batch_size):
+        batch = service.new_batch_http_request(callback=on_response)
+        for msg_id in msg_ids[start:start + batch_size]:
+            batch.add(_get_request(service, msg_id, fmt), request_id=msg_id)
+        batch.execute()
+    return results
+
+
+def _fetch_threaded(service_factory, msg_ids, fmt, max_workers):
+    """Fetch messages concurrently; each worker thread gets its own service object."""
+    local = threading.local()
+
+    def fetch_one(msg_id):
+        if not hasattr(local, "service"):
+            local.service = service_factory()
+        try:
+            return msg_id, _get_request(local.service, msg_id, fmt).execute()
+        except Exception as e:
+            print(f"⚠️ Error fetching message {msg_id}: {e}")
+            return msg_id, None
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        return {msg_id: msg for msg_id, msg in pool.map(fetch_one, msg_ids) if msg is not None}
+
+
+def fetch_messages(service, msg_ids, fmt="full", batch_size=BATCH_SIZE, max_workers=None, service_factory=None):
+    """✅ Fetch each message exactly once and return them in the order of msg_ids.
+
+    Uses a bounded thread pool when a service_factory and max_workers are given
+    (the Google client is not thread-safe, so every worker builds its own
+    service), Gmail batch requests when the service supports them, and serial
+    requests otherwise. Messages that fail to load are skipped.
+    """
+    msg_ids = list(dict.fromkeys(msg_ids))
+    if not msg_ids:
+        return []
+
+    if service_factory is not None and max_workers:
+        results = _fetch_threaded(service_factory, msg_ids, fmt, max_workers)
+    elif hasattr(service, "new_batch_http_request"):
+        results = _fetch_batched(service, msg_ids, fmt, batch_size)
+    else:
+        results = {}
+        for msg_id in msg_ids:
+            try:
+                results[msg_id] = _get_request(service, msg_id, fmt).execute()
+            except Exception as e:
+                print(f"⚠️ Error fetching message {msg_id}: {e}")
+
+    return [results[msg_id] for msg_id in msg_ids if msg_id in results]
+
+
+def fetch_emails(service, msg_ids, with_body=True, max_chars=DEFAULT_MAX_CHARS, **kwargs):
+    """✅ Fetch and parse messages into subject/sender/body dicts.
+
+    Without the body only headers are requested (format=metadata), which
+    keeps the payload small.
+    """
+    kwargs.setdefault("fmt", "full" if with_body else "metadata")
+    return [parse_message(msg, with_body=with_body, max_chars=max_chars)
+            for msg in fetch_messages(service, msg_ids, **kwargs)]
@@ -0,0 +1,159 @@
+"""Incremental Gmail sync: pull only history deltas since the last run and skip processed mail."""
+
+
+def _is_history_expired(error):
+    """Gmail answers 404 when startHistoryId is older than the retained history."""
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "resp", None), "status", None)
+    return str(status) == "404"
+
+
+class GmailSync:
+    """✅ Tracks the last historyId and per-message metadata in SQLite.
+
+    The state lives in the tracker database next to unanswered_emails, one
+    cursor per sync name so the inbox and unread paths advance independently.
+    Pending messages that could not be fetched (a 429 inside a batch, say)
+    are kept in gmail_sync_retry when the cursor moves past them and handed
+    out again by the next runs, up to max_retries times.
+    """
+
+    def __init__(self, conn, name="inbox", label_id=None, query=None, full_sync_limit=500, max_retries=5):
+        self.conn = conn
+        self.name = name
+        self.label_id = label_id
+        self.query = query
+        self.full_sync_limit = full_sync_limit
+        self.max_retries = max_retries
+        self._pending_history_id = None
+        self._pending_ids = []
+
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS gmail_sync_state (
+            name TEXT PRIMARY KEY,
+            history_id TEXT
+        )
+        """)
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS gmail_messages (
+            sync_name TEXT,
+            msg_id TEXT,
+            thread_id TEXT,
+            history_id TEXT,
+            sender TEXT,
+            subject TEXT,
+            processed_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (sync_name, msg_id)
+        )
+        """)
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS gmail_sync_retry (
+            sync_name TEXT,
+            msg_id TEXT,
+            attempts INTEGER DEFAULT 1,
+            PRIMARY KEY (sync_name, msg_id)
+        )
+        """)
+        conn.commit()
+
+        # Loaded once so every later membership check is an O(1) set lookup
+        rows = conn.execute("SELECT msg_id FROM gmail_messages WHERE sync_name=?", (name,))
+        self.processed = {msg_id for (msg_id,) in rows}
+
+    @property
+    def history_id(self):
+        row = self.conn.execute("SELECT history_id FROM gmail_sync_state WHERE name=?", (self.name,)).fetchone()
+        return row[0] if row else None
+
+    def _full_sync(self, service):
+        """List message IDs from scratch, newest first, following pagination."""
+        # Take the history cursor before listing so nothing added meanwhile is lost
+        history_id = service.users().getProfile(userId="me").execute()["historyId"]
+        ids, page_token = [], None
+        while len(ids) < self.full_sync_limit:
+            kwargs = {"userId": "me", "maxResults": min(500, self.full_sync_limit - len(ids))}
+            if self.query:
+                kwargs["q"] = self.query
+            if page_token:
+                kwargs["pageToken"] = page_token
+            response = service.users().messages().list(**kwargs).execute()
+            ids.extend(m["id"] for m in response.get("messages", []))
+            page_token = response.get("nextPageToken")
+            if not page_token:
+                break
+        return ids, history_id
+
+    def _delta_sync(self, service, start_history_id):
+        """Collect the IDs of messages added since start_history_id."""
+        ids, page_token, history_id = [], None, start_history_id
+        while True:
+            kwargs = {"userId": "me", "startHistoryId": start_history_id, "historyTypes": ["messageAdded"]}
+            if self.label_id:
+                kwargs["labelId"] = self.label_id
+            if page_token:
+                kwargs["pageToken"] = page_token
+            response = service.users().history().list(**kwargs).execute()
+            for record in response.get("history", []):
+                ids.extend(added["message"]["id"] for added in record.get("messagesAdded", []))
+            history_id = response.get("historyId", history_id)
+            page_token = response.get("nextPageToken")
+            if not page_token:
+                return ids, history_id
+
+    def pending_message_ids(self, service):
+        """✅ Return IDs of messages not processed yet, newest first, then earlier ones still to retry.
+
+        Falls back to a full resync when there is no stored cursor or Gmail
+        reports that the stored history has expired.
+        """
+        start_history_id = self.history_id
+        if start_history_id is None:
+            ids, history_id = self._full_sync(service)
+        else:
+            try:
+                ids, history_id = self._delta_sync(service, start_history_id)
+                ids.reverse()  # history is oldest first
+            except Exception as e:
+                if not _is_history_expired(e):
+                    raise
+                print("⚠️ Gmail history expired, running a full resync...")
+                ids, history_id = self._full_sync(service)
+
+        self._pending_history_id = history_id
+        ids += [msg_id for (msg_id,) in self.conn.execute(
+            "SELECT msg_id FROM gmail_sync_retry WHERE sync_name=? ORDER BY rowid", (self.name,))]
+        self._pending_ids = [msg_id for msg_id in dict.fromkeys(ids) if msg_id not in self.processed]
+        return list(self._pending_ids)
+
+    def commit(self, emails):
+        """✅ Record processed emails and advance the history cursor in one transaction.
+
+        Pending IDs missing from `emails` failed to load; they are queued for
+        the next run before the cursor moves past them.
+        """
+        fetched = {e["id"] for e in emails}
+        failed = [(self.name, msg_id) for msg_id in self._pending_ids if msg_id not in fetched]
+        with self.conn:
+            self.conn.executemany("""
+                INSERT INTO gmail_sync_retry (sync_name, msg_id) VALUES (?, ?)
+                ON CONFLICT (sync_name, msg_id) DO UPDATE SET attempts = attempts + 1
+            """, failed)
+            dropped = self.conn.execute("DELETE FROM gmail_sync_retry WHERE sync_name=? AND attempts > ?",
+                                        (self.name, self.max_retries)).rowcount
+            self.conn.executemany("DELETE FROM gmail_sync_retry WHERE sync_name=? AND msg_id=?",
+                                  [(self.name, msg_id) for msg_id in fetched])
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO gmail_messages (sync_name, msg_id, thread_id, history_id, sender, subject) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(self.name, e["id"], e.get("thread_id"), e.get("history_id"), e.get("sender"), e.get("subject"))
+                 for e in emails],
+            )
+            if self._pending_history_id is not None:
+                self.conn.execute("INSERT OR REPLACE INTO gmail_sync_state (name, history_id) VALUES (?, ?)",
+                                  (self.name, str(self._pending_history_id)))
+        self.processed.update(fetched)
+        self._pending_history_id = None
+        self._pending_ids = []
+        if failed:
+            print(f"⚠️ {len(failed)} message(s) failed to load and will be retried on the next sync.")
+        if dropped:
+            print(f"❌ Gave up on {dropped} message(s) after {self.max_retries} failed attempts.")
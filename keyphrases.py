@@ -0,0 +1,104 @@
+"""Keyphrase extraction for chat messages: trimmed spaCy pipeline, micro-batched through nlp.pipe."""
+import queue
+import threading
+from concurrent.futures import Future
+
+SPACY_MODEL = "en_core_web_sm"
+
+# noun_chunks only need the tagger and parser; these components would run for nothing
+UNUSED_COMPONENTS = ["ner", "lemmatizer"]
+
+
+def load_trimmed_nlp(model=SPACY_MODEL):
+    """✅ Load the spaCy model without the components keyphrase extraction never reads."""
+    import spacy
+    return spacy.load(model, exclude=UNUSED_COMPONENTS)
+
+
+def rank_keyphrases(doc):
+    """✅ Noun chunks ranked by frequency, then first appearance; case-insensitive duplicates merged."""
+    counts, first_seen, surface = {}, {}, {}
+    for position, chunk in enumerate(doc.noun_chunks):
+        text = chunk.text.strip()
+        key = text.lower()
+        if not key:
+            continue
+        if key not in counts:
+            counts[key], first_seen[key], surface[key] = 0, position, text
+        counts[key] += 1
+    return [surface[key] for key in sorted(counts, key=lambda k: (-counts[k], first_seen[k]))]
+
+
+class KeyphraseExtractor:
+    """✅ Extracts ranked keyphrases, batching concurrent requests through nlp.pipe.
+
+    extract_many() runs a list straight through nlp.pipe. extract() and
+    submit() queue single messages; a background thread takes everything
+    that is waiting (up to batch_size) and processes it at once, without
+    waiting for more. Messages that arrive while a batch runs form the next
+    batch, so batches grow with the load and a lone message is not delayed.
+    n_process > 1 lets spaCy fan large batches out to worker processes.
+    """
+
+    def __init__(self, nlp_factory=load_trimmed_nlp, batch_size=64, n_process=1):
+        self.nlp_factory = nlp_factory
+        self.batch_size = batch_size
+        self.n_process = n_process
+        self.batches = 0
+        self.messages = 0
+        self._nlp = None
+        self._nlp_lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    @property
+    def nlp(self):
+        with self._nlp_lock:
+            if self._nlp is None:
+                self._nlp = self.nlp_factory()
+            return self._nlp
+
+    def extract_many(self, texts):
+        """✅ Return ranked keyphrases for every text, in order."""
+        texts = list(texts)
+        docs = self.nlp.pipe(texts, batch_size=self.batch_size, n_process=self.n_process)
+        results = [rank_keyphrases(doc) for doc in docs]
+        self.batches += 1
+        self.messages += len(texts)
+        return results
+
+    def submit(self, text):
+        """✅ Queue one message for the next micro-batch; returns a Future of its keyphrases."""
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="keyphrase-batcher", daemon=True)
+                self._thread.start()
+        future = Future()
+        self._queue.put((text, future))
+        return future
+
+    def extract(self, text):
+        """✅ Ranked keyphrases for a single message (micro-batched with concurrent callers)."""
+        return self.submit(text).result()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            try:
+                while len(batch) < self.batch_size:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                pass
+            try:
+                results = self.extract_many(text for text, _ in batch)
+                for (_, future), keyphrases in zip(batch, results):
+                    future.set_result(keyphrases)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+
+    def stats(self):
+        """Messages processed and average batch size."""
+        return {"messages": self.messages, "batches": self.batches,
+                "avg_batch": round(self.messages / self.batches, 2) if self.batches else 0.0}
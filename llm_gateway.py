@@ -0,0 +1,229 @@
+"""One front door for Gemini calls: cached, coalesced, rate limited, bounded and retried."""
+import hashlib
+import random
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+
+# Errors worth retrying: quota (429), server side (500/503) and timeouts
+RETRYABLE_MARKERS = ("429", "500", "503", "resource has been exhausted", "unavailable", "deadline", "timed out")
+RETRYABLE_TYPES = ("ResourceExhausted", "ServiceUnavailable", "InternalServerError", "DeadlineExceeded",
+                   "TooManyRequests", "TimeoutError", "ConnectionError")
+
+
+def is_retryable(error):
+    """✅ True for rate limit, server and timeout errors; False for bad requests and safety blocks."""
+    if any(cls.__name__ in RETRYABLE_TYPES for cls in type(error).__mro__):
+        return True
+    message = str(error).lower()
+    return any(marker in message for marker in RETRYABLE_MARKERS)
+
+
+def response_text(response):
+    """Text of a Gemini response, or None when it was blocked or empty."""
+    try:
+        return response.text if response else None
+    except ValueError:  # blocked responses raise instead of returning text
+        return None
+
+
+class TokenBucket:
+    """✅ Allows `rate` acquisitions per second on average, with bursts of up to `capacity`."""
+
+    def __init__(self, rate, capacity=None, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self.clock = clock
+        self.sleep = sleep
+        self.tokens = self.capacity
+        self.waited = 0.0
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Take one token, sleeping until one is available."""
+        while True:
+            with self._lock:
+                now = self.clock()
+                self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+                self.waited += wait
+            self.sleep(wait)
+
+
+class ResponseCache:
+    """✅ LRU of responses keyed by prompt hash; entries expire after ttl seconds."""
+
+    def __init__(self, ttl=3600, max_entries=1024, clock=time.monotonic):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.clock = clock
+        self.entries = OrderedDict()  # key -> (expires_at, text)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(model, prompt):
+        return hashlib.sha256(f"{model}\0{prompt}".encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= self.clock():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key, text):
+        with self._lock:
+            self.entries[key] = (self.clock() + self.ttl, text)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class LLMGateway:
+    """✅ Shared Gemini client for the bots.
+
+    Model handles are created once per name by model_factory and reused.
+    generate() answers repeated prompts from a TTL/LRU cache, lets
+    concurrent identical prompts share one call, spends a token from a
+    token bucket (rate_per_minute) and a slot of a semaphore
+    (max_concurrency) per model call, and retries quota and server errors
+    with jittered exponential backoff. stats() reports call counts,
+    latency percentiles and token usage.
+    """
+
+    def __init__(self, model_factory, default_model="gemini-pro", rate_per_minute=60, max_concurrency=4,
+                 cache_ttl=3600, cache_size=1024, retries=3, backoff=1.0, max_backoff=30.0,
+                 clock=time.monotonic, sleep=time.sleep):
+        self.model_factory = model_factory
+        self.default_model = default_model
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.sleep = sleep
+        self.cache = ResponseCache(cache_ttl, cache_size, clock=clock)
+        self.bucket = TokenBucket(rate_per_minute / 60.0, clock=clock, sleep=sleep)
+        self.semaphore = threading.BoundedSemaphore(max_concurrency)
+        self.requests = 0
+        self.calls = 0
+        self.cache_hits = 0
+        self.coalesced = 0
+        self.retried = 0
+        self.failures = 0
+        self.prompt_tokens = 0
+        self.output_tokens = 0
+        self.latencies = deque(maxlen=1000)
+        self._models = {}
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def model(self, name=None):
+        """✅ Return the reusable handle for a model, creating it on first use."""
+        name = name or self.default_model
+        with self._lock:
+            if name not in self._models:
+                self._models[name] = self.model_factory(name)
+            return self._models[name]
+
+    def generate(self, prompt, model=None, cache=True):
+        """✅ Return the model's text for prompt, or None if the response was blocked or empty."""
+        name = model or self.default_model
+        key = ResponseCache.key(name, prompt)
+        with self._lock:
+            self.requests += 1
+        if cache:
+            text = self.cache.get(key)
+            if text is not None:
+                with self._lock:
+                    self.cache_hits += 1
+                return text
+
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+            else:
+                self.coalesced += 1
+        if not leader:
+            return future.result()
+
+        try:
+            text = self._call(name, prompt)
+            if cache and text:
+                self.cache.put(key, text)
+            future.set_result(text)
+            return text
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def _call(self, name, prompt):
+        handle = self.model(name)
+        for attempt in range(self.retries + 1):
+            self.bucket.acquire()
+            try:
+                with self.semaphore:
+                    start = time.perf_counter()
+                    response = handle.generate_content(prompt)
+                    elapsed = time.perf_counter() - start
+            except Exception as e:
+                if attempt == self.retries or not is_retryable(e):
+                    with self._lock:
+                        self.failures += 1
+                    raise
+                delay = min(self.max_backoff, self.backoff * 2 ** attempt) * random.uniform(0.5, 1.0)
+                print(f"⚠️ Gemini call failed ({e}), retrying in {delay:.1f}s...")
+                with self._lock:
+                    self.retried += 1
+                self.sleep(delay)
+                continue
+            self._record(elapsed, response)
+            return response_text(response)
+
+    def _record(self, elapsed, response):
+        usage = getattr(response, "usage_metadata", None)
+        with self._lock:
+            self.calls += 1
+            self.latencies.append(elapsed)
+            if usage is not None:
+                self.prompt_tokens += getattr(usage, "prompt_token_count", 0) or 0
+                self.output_tokens += getattr(usage, "candidates_token_count", 0) or 0
+
+    def stats(self):
+        """✅ Counters, latency percentiles (ms) and token usage."""
+        with self._lock:
+            latencies = sorted(self.latencies)
+
+            def percentile(p):
+                return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 1) if latencies else 0.0
+
+            return {
+                "requests": self.requests,
+                "model_calls": self.calls,
+                "cache_hits": self.cache_hits,
+                "coalesced": self.coalesced,
+                "retries": self.retried,
+                "failures": self.failures,
+                "cache_size": len(self.cache),
+                "rate_limited_seconds": round(self.bucket.waited, 3),
+                "latency_p50_ms": percentile(0.5),
+                "latency_p95_ms": percentile(0.95),
+                "prompt_tokens": self.prompt_tokens,
+                "output_tokens": self.output_tokens,
+            }
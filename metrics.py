@@ -0,0 +1,127 @@
+"""Per-stage latency histograms and counters for the bots, exported as Prometheus text or JSON."""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# Upper bounds in seconds, from 100 us (a dict lookup) to a minute (a slow model call)
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+           10.0, 30.0, 60.0)
+
+
+class Histogram:
+    """✅ Fixed-bucket latency histogram (cumulative buckets are derived on export)."""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # the last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+
+    def quantile(self, q):
+        """Estimate a quantile by interpolating inside its bucket, as Prometheus' histogram_quantile does."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                lower = self.buckets[i - 1] if i else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.max
+                return min(self.max, lower + (upper - lower) * (rank - seen) / count)
+            seen += count
+        return self.max
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "sum_s": round(self.sum, 6),
+            "mean_ms": round(self.sum / self.count * 1000, 3) if self.count else 0.0,
+            "p50_ms": round(self.quantile(0.5) * 1000, 3),
+            "p95_ms": round(self.quantile(0.95) * 1000, 3),
+            "p99_ms": round(self.quantile(0.99) * 1000, 3),
+            "max_ms": round(self.max * 1000, 3),
+        }
+
+
+class Registry:
+    """✅ Stage histograms and event counters, keyed by (bot, stage) and (bot, event).
+
+    Stages can nest (a Gmail "fetch" includes its "body_decode"), so stage
+    times are not meant to add up to the total.
+    """
+
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self._stages = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def observe(self, bot, stage, seconds):
+        with self._lock:
+            histogram = self._stages.get((bot, stage))
+            if histogram is None:
+                histogram = self._stages[(bot, stage)] = Histogram()
+            histogram.observe(seconds)
+
+    @contextmanager
+    def timer(self, bot, stage):
+        """✅ Time the with-block as one observation of bot/stage, also when it raises."""
+        start = self.clock()
+        try:
+            yield
+        finally:
+            self.observe(bot, stage, self.clock() - start)
+
+    def count(self, bot, event, n=1):
+        with self._lock:
+            self._counters[(bot, event)] = self._counters.get((bot, event), 0) + n
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+            self._counters.clear()
+
+    def snapshot(self):
+        """✅ {"stages": {"bot.stage": summary}, "counters": {"bot.event": n}} for JSON reports."""
+        with self._lock:
+            return {
+                "stages": {f"{bot}.{stage}": h.summary() for (bot, stage), h in sorted(self._stages.items())},
+                "counters": {f"{bot}.{event}": n for (bot, event), n in sorted(self._counters.items())},
+            }
+
+    def prometheus(self):
+        """✅ The Prometheus text exposition format (version 0.0.4)."""
+        lines = ["# HELP assistant_stage_seconds Time spent in each processing stage.",
+                 "# TYPE assistant_stage_seconds histogram"]
+        with self._lock:
+            for (bot, stage), h in sorted(self._stages.items()):
+                labels = f'bot="{bot}",stage="{stage}"'
+                cumulative = 0
+                for bound, count in zip(self.bucket_labels(h), h.counts):
+                    cumulative += count
+                    lines.append(f'assistant_stage_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f"assistant_stage_seconds_sum{{{labels}}} {h.sum:.6f}")
+                lines.append(f"assistant_stage_seconds_count{{{labels}}} {h.count}")
+            lines += ["# HELP assistant_events_total Events counted by the bots.",
+                      "# TYPE assistant_events_total counter"]
+            for (bot, event), n in sorted(self._counters.items()):
+                lines.append(f'assistant_events_total{{bot="{bot}",event="{event}"}} {n}')
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def bucket_labels(histogram):
+        return [repr(bound) for bound in histogram.buckets] + ["+Inf"]
+
+
+# One registry per process, shared by every bot running in it
+REGISTRY = Registry()
+timer = REGISTRY.timer
+count = REGISTRY.count
@@ -0,0 +1,123 @@
+"""Bounded-memory body extraction from Gmail MIME payloads."""
+import base64
+import binascii
+import codecs
+import re
+from html.parser import HTMLParser
+
+NO_CONTENT = "No content available."
+DEFAULT_MAX_CHARS = 1000
+
+# Headers requested with format=metadata when the body is not needed
+METADATA_HEADERS = ["Subject", "From"]
+
+# Base64 characters decoded per step; a multiple of 4 so every slice decodes on its own
+_CHUNK = 4096
+
+
+def walk_parts(payload):
+    """✅ Yield every MIME part depth-first in document order, without recursion."""
+    stack = [payload]
+    while stack:
+        part = stack.pop()
+        yield part
+        stack.extend(reversed(part.get("parts") or []))
+
+
+def iter_decoded(data, chunk_size=_CHUNK):
+    """✅ Decode base64url data into text pieces, a slice at a time."""
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+    for start in range(0, len(data), chunk_size):
+        piece = data[start:start + chunk_size]
+        if start + chunk_size >= len(data):
+            piece += "=" * (-len(piece) % 4)
+        try:
+            raw = base64.urlsafe_b64decode(piece)
+        except (binascii.Error, ValueError):
+            return
+        yield decoder.decode(raw)
+    yield decoder.decode(b"", final=True)
+
+
+def decode_text(data, max_chars=DEFAULT_MAX_CHARS):
+    """✅ Decode at most max_chars characters of base64url text."""
+    pieces, length = [], 0
+    for piece in iter_decoded(data):
+        pieces.append(piece)
+        length += len(piece)
+        if length >= max_chars:
+            break
+    return "".join(pieces)[:max_chars]
+
+
+class _TextExtractor(HTMLParser):
+    """Collects visible text, skipping script and style, until the budget is met."""
+
+    def __init__(self, max_chars):
+        super().__init__(convert_charrefs=True)
+        self.max_chars = max_chars
+        self.pieces = []
+        self.length = 0
+        self._skip = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in ("script", "style"):
+            self._skip += 1
+        elif tag in ("br", "p", "div", "li", "tr"):
+            self._add(" ")
+
+    def handle_endtag(self, tag):
+        if tag in ("script", "style") and self._skip:
+            self._skip -= 1
+
+    def handle_data(self, data):
+        if not self._skip:
+            self._add(data)
+
+    def _add(self, text):
+        self.pieces.append(text)
+        self.length += len(text)
+
+    @property
+    def full(self):
+        return self.length >= self.max_chars * 2
+
+    def text(self):
+        return re.sub(r"\s+", " ", "".join(self.pieces)).strip()[:self.max_chars]
+
+
+def html_to_text(data, max_chars=DEFAULT_MAX_CHARS):
+    """✅ Decode base64url HTML and strip it to plain text, stopping once the budget is met."""
+    parser = _TextExtractor(max_chars)
+    for piece in iter_decoded(data):
+        parser.feed(piece)
+        if parser.full:
+            break
+    parser.close()
+    return parser.text()
+
+
+def _is_attachment(part):
+    return bool(part.get("filename")) or "attachmentId" in part.get("body", {})
+
+
+def extract_body(payload, max_chars=DEFAULT_MAX_CHARS):
+    """✅ Extract the email body: the first text/plain part, else the first text/html part stripped."""
+    html_part = None
+    for part in walk_parts(payload):
+        data = part.get("body", {}).get("data")
+        if not data or _is_attachment(part):
+            continue
+        mime_type = part.get("mimeType", "")
+        if mime_type == "text/plain":
+            body = decode_text(data, max_chars)
+            if body.strip():
+                return body
+        elif mime_type == "text/html" and html_part is None:
+            html_part = part
+
+    if html_part is not None:
+        body = html_to_text(html_part["body"]["data"], max_chars)
+        if body:
+            return body
+    return NO_CONTENT
@@ -0,0 +1,88 @@
+"""Reminder pipeline: stream pending tracked emails in chunks and deliver grouped digests."""
+import json
+from collections import OrderedDict
+
+
+class StdoutSink:
+    """✅ Prints reminders to the console."""
+
+    def deliver(self, digests):
+        for digest in digests:
+            print(digest["text"])
+
+
+class FileSink:
+    """✅ Appends reminders as JSON lines to a local file (a stand-in for a real channel)."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def deliver(self, digests):
+        with open(self.path, "a", encoding="utf-8") as f:
+            for digest in digests:
+                f.write(json.dumps(digest, ensure_ascii=False) + "\n")
+            f.flush()
+
+
+class SlackSink:
+    """✅ Posts each reminder digest to a Slack channel."""
+
+    def __init__(self, client, channel):
+        self.client = client
+        self.channel = channel
+
+    def deliver(self, digests):
+        for digest in digests:
+            self.client.chat_postMessage(channel=self.channel, text=digest["text"])
+
+
+def format_digest(sender, category, subjects):
+    """✅ Build one reminder message for all pending emails from a sender in a category."""
+    if len(subjects) == 1:
+        return (f"🔔 *Reminder: Unanswered Email!*\n🔹 *From:* {sender}\n🔹 *Subject:* {subjects[0]}\n"
+                f"🔹 *Category:* {category}\n⏳ Please respond soon.")
+    lines = "\n".join(f"   • {subject}" for subject in subjects)
+    return (f"🔔 *Reminder: {len(subjects)} Unanswered Emails!*\n🔹 *From:* {sender}\n🔹 *Category:* {category}\n"
+            f"🔹 *Subjects:*\n{lines}\n⏳ Please respond soon.")
+
+
+def group_digests(rows):
+    """✅ Group (id, sender, subject, category, timestamp) rows by sender and category."""
+    groups = OrderedDict()
+    for _, sender, subject, category, _ in rows:
+        groups.setdefault((sender, category), []).append(subject)
+    return [{"sender": sender, "category": category, "count": len(subjects),
+             "text": format_digest(sender, category, subjects)}
+            for (sender, category), subjects in groups.items()]
+
+
+_PENDING_CHUNK = "SELECT id FROM unanswered_emails WHERE reminded=0 ORDER BY timestamp, id LIMIT ?"
+
+
+def send_reminders(store, sink, chunk_size=500):
+    """✅ Deliver digests for every pending email, one chunk per transaction.
+
+    Each chunk is claimed under BEGIN IMMEDIATE, so no other process can take
+    it, marked reminded with a single set-based UPDATE and committed right
+    after the sink accepted it. A failed delivery rolls the chunk back to be
+    retried; a committed chunk is never selected again. Only a crash between
+    delivery and commit can repeat a chunk. Returns the number of emails
+    reminded.
+    """
+    conn = store.connection()
+    total = 0
+    while True:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute("SELECT id, sender, subject, category, timestamp FROM unanswered_emails "
+                                "WHERE reminded=0 ORDER BY timestamp, id LIMIT ?", (chunk_size,)).fetchall()
+            if not rows:
+                conn.rollback()
+                return total
+            conn.execute(f"UPDATE unanswered_emails SET reminded=1 WHERE id IN ({_PENDING_CHUNK})", (chunk_size,))
+            sink.deliver(group_digests(rows))
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        total += len(rows)
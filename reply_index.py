@@ -0,0 +1,144 @@
+"""Precomputed TF-IDF index that matches emails to reply intents in batches."""
+import json
+
+import numpy as np
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.preprocessing import normalize
+
+FALLBACK_REPLIES = ["Thanks for reaching out!", "I'll check and update you.", "Let me get back to you soon."]
+
+
+def load_catalog(path):
+    """✅ Read reply intents from a JSON list or a JSON-lines file.
+
+    Each entry looks like {"intent": "meeting", "replies": [...]} with an
+    optional "text" to match on instead of the intent name.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith(".jsonl"):
+            return [json.loads(line) for line in f if line.strip()]
+        return json.load(f)
+
+
+class ReplyIndex:
+    """✅ Scores whole batches of emails against every intent with one sparse product.
+
+    Intent vectors are hashed, IDF-weighted and L2-normalized once, so scoring
+    is a plain dot product (cosine similarity). Like a TfidfVectorizer fitted
+    on the intents, an email is only weighed on the terms some intent uses;
+    the rest of its words do not dilute the score. Because hashing needs no
+    vocabulary, intents can be added without refitting: they reuse the IDF
+    computed at build time. Removed intents are masked out and the matrix is
+    compacted once enough of them pile up; rebuild() recomputes the IDF.
+    """
+
+    def __init__(self, entries=(), threshold=0.3, n_features=2 ** 18):
+        self.threshold = threshold
+        self.hasher = HashingVectorizer(n_features=n_features, alternate_sign=False, norm=None)
+        self.rebuild(entries)
+
+    @classmethod
+    def from_file(cls, path, **kwargs):
+        return cls(load_catalog(path), **kwargs)
+
+    def rebuild(self, entries=None):
+        """✅ (Re)compute the IDF weights and the normalized intent matrix."""
+        if entries is None:
+            entries = [{"intent": intent, "text": text, "replies": self.replies[intent]}
+                       for intent, text, alive in zip(self.intents, self.texts, self.alive) if alive]
+        entries = list(entries)
+        self.intents = [e["intent"] for e in entries]
+        self.texts = [e.get("text", e["intent"]) for e in entries]
+        self.replies = {e["intent"]: list(e["replies"]) for e in entries}
+
+        counts = self.hasher.transform(self.texts)
+        df = np.bincount(counts.indices, minlength=self.hasher.n_features)
+        self.known = df > 0  # columns of the intent vocabulary
+        self.idf = np.log((1 + len(entries)) / (1 + df)) + 1.0
+        self.matrix = self._weigh(counts)
+        self.alive = np.ones(len(entries), dtype=bool)
+        self.positions = {intent: row for row, intent in enumerate(self.intents)}
+
+    def _weigh(self, counts):
+        return normalize(sp.csr_matrix(counts.multiply(self.idf)), copy=False)
+
+    def vectorize(self, texts):
+        """Query vectors restricted to the intent vocabulary, then normalized."""
+        counts = self.hasher.transform(texts)
+        counts.data *= self.known[counts.indices]
+        counts.eliminate_zeros()
+        return self._weigh(counts)
+
+    def __len__(self):
+        return len(self.replies)
+
+    def add(self, intent, replies, text=None):
+        """✅ Add or replace one intent."""
+        self.add_many([{"intent": intent, "replies": replies, "text": text or intent}])
+
+    def add_many(self, entries):
+        """✅ Append intents to the index without refitting the existing ones."""
+        entries = list(entries)
+        for entry in entries:
+            if entry["intent"] in self.positions:
+                self.remove(entry["intent"])
+        texts = [e.get("text", e["intent"]) for e in entries]
+        counts = self.hasher.transform(texts)
+        self.known[counts.indices] = True
+        self.matrix = sp.vstack([self.matrix, self._weigh(counts)], format="csr")
+        self.alive = np.concatenate([self.alive, np.ones(len(entries), dtype=bool)])
+        for entry, text in zip(entries, texts):
+            self.positions[entry["intent"]] = len(self.intents)
+            self.intents.append(entry["intent"])
+            self.texts.append(text)
+            self.replies[entry["intent"]] = list(entry["replies"])
+
+    def remove(self, intent):
+        """✅ Drop an intent; its row is masked and reclaimed by a later compaction."""
+        row = self.positions.pop(intent, None)
+        if row is None:
+            return False
+        self.alive[row] = False
+        del self.replies[intent]
+        if (~self.alive).sum() > max(64, len(self.alive) // 2):
+            self._compact()
+        return True
+
+    def _compact(self):
+        keep = np.flatnonzero(self.alive)
+        self.matrix = self.matrix[keep]
+        self.intents = [self.intents[row] for row in keep]
+        self.texts = [self.texts[row] for row in keep]
+        self.alive = np.ones(len(keep), dtype=bool)
+        self.positions = {intent: row for row, intent in enumerate(self.intents)}
+
+    def search(self, texts, k=3, chunk_size=1024):
+        """✅ Return the top-k (intent, score) pairs for every text, best first."""
+        results = []
+        if not len(self.alive):
+            return [[] for _ in texts]
+        k = min(k, len(self.alive))
+        queries = self.vectorize(texts)
+        for start in range(0, queries.shape[0], chunk_size):
+            scores = (queries[start:start + chunk_size] @ self.matrix.T).toarray()
+            scores[:, ~self.alive] = -1.0
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            for row, candidates in zip(scores, top):
+                # argpartition splits ties arbitrarily, so take every column tied with the k-th score
+                # and rank by (-score, col) to keep catalog order as the tie-break.
+                cutoff = row[candidates].min()
+                candidates = np.flatnonzero(row >= cutoff) if cutoff > 0 else np.flatnonzero(row > 0)
+                ranked = sorted(candidates, key=lambda col: (-row[col], col))[:k]
+                results.append([(self.intents[col], float(row[col])) for col in ranked if row[col] > 0])
+        return results
+
+    def suggest(self, texts):
+        """✅ Return the replies of the best intent per text, or fallback replies below the threshold."""
+        suggestions = []
+        for matches in self.search(texts, k=1):
+            if matches and matches[0][1] > self.threshold:
+                suggestions.append(self.replies[matches[0][0]])
+            else:
+                suggestions.append(FALLBACK_REPLIES)
+        return suggestions
@@ -0,0 +1,106 @@
+"""Keyword rule engine: rule sets compiled once into trie-shaped regexes, classified in one pass."""
+import bisect
+import json
+import os
+import re
+import threading
+
+RULES_PATH = os.getenv("CLASSIFICATION_RULES", os.path.join(os.path.dirname(os.path.abspath(__file__)), "rules.json"))
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+def _trie_pattern(words):
+    """Build a regex whose alternation is factored by common prefix, longest match first."""
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = True
+
+    def build(node):
+        optional = "" in node
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if optional:
+            return "(?:" + body + ")?"
+        return body
+
+    return build(trie)
+
+
+class RuleEngine:
+    """✅ Classifies records (dicts of field -> text) by keyword rules with priorities.
+
+    Each rule has a label, a priority (lower wins, ties go to the earlier
+    rule), the fields it applies to and its keywords. Matching is a
+    case-insensitive substring test, like the keyword lists it replaces.
+    """
+
+    def __init__(self, rules, default=None):
+        self.default = default
+        self.rules = list(rules)
+        self._fields = {}
+
+        by_field = {}
+        for order, rule in enumerate(self.rules):
+            rank = (rule.get("priority", 100), order)
+            for field in rule.get("fields", ["subject"]):
+                best = by_field.setdefault(field, {})
+                for keyword in rule["keywords"]:
+                    keyword = keyword.lower()
+                    if keyword and (keyword not in best or rank < best[keyword][0]):
+                        best[keyword] = (rank, rule["label"])
+
+        for field, best in by_field.items():
+            # The regex reports the longest keyword at each position, so fold in
+            # every shorter keyword that is a prefix of it and also matched there
+            effective = {}
+            for keyword in best:
+                prefixes = [best[keyword[:i]] for i in range(1, len(keyword) + 1) if keyword[:i] in best]
+                effective[keyword] = min(prefixes)
+            pattern = re.compile("(?=(" + _trie_pattern(best) + "))")
+            self._fields[field] = (pattern, effective, min(rank for rank, _ in effective.values()))
+
+    @classmethod
+    def from_file(cls, path, section):
+        with open(path, "r", encoding="utf-8") as f:
+            config = json.load(f)[section]
+        return cls(config["rules"], default=config.get("default"))
+
+    def classify(self, record):
+        """✅ Return the label of the best matching rule, or the default."""
+        return self.classify_many([record])[0]
+
+    def classify_many(self, records):
+        """✅ Classify a batch; each field is scanned once over the whole batch."""
+        records = list(records)
+        best = [None] * len(records)
+        for field, (pattern, effective, top_rank) in self._fields.items():
+            texts = [(record.get(field) or "").lower().replace("\n", " ") for record in records]
+            starts, offset = [], 0
+            for text in texts:
+                starts.append(offset)
+                offset += len(text) + 1
+            joined = "\n".join(texts)
+
+            for match in pattern.finditer(joined):
+                i = bisect.bisect_right(starts, match.start()) - 1
+                if best[i] is not None and best[i][0] == top_rank:
+                    continue
+                hit = effective[match.group(1)]
+                if best[i] is None or hit[0] < best[i][0]:
+                    best[i] = hit
+        return [hit[1] if hit else self.default for hit in best]
+
+
+def get_engine(section, path=RULES_PATH):
+    """✅ Return the compiled engine for a rules section, compiling it on first use."""
+    with _engines_lock:
+        if (path, section) not in _engines:
+            _engines[(path, section)] = RuleEngine.from_file(path, section)
+        return _engines[(path, section)]
@@ -0,0 +1,113 @@
+"""Slack Socket Mode intake: asyncio websocket loop feeding the same event pipeline as the webhook."""
+import asyncio
+import json
+
+from slack_sdk import WebClient
+
+
+async def open_socket_mode_connection(app_token):
+    """✅ Ask Slack for a Socket Mode URL (apps.connections.open) and connect to it."""
+    import websockets  # only needed in Socket Mode
+
+    loop = asyncio.get_running_loop()
+    response = await loop.run_in_executor(None, lambda: WebClient(token=app_token).apps_connections_open())
+    return await websockets.connect(response["url"])
+
+
+class SocketModeIngestor:
+    """✅ Reads Socket Mode envelopes and runs the event handler on them concurrently.
+
+    handler(payload) is the webhook's event pipeline; it runs in the
+    default thread pool with at most max_concurrency calls in flight, and
+    the reader stops pulling new envelopes while all slots are taken. An
+    envelope is acknowledged once the handler has accepted it; returning
+    False (e.g. the worker queues are full) leaves it unacknowledged so
+    Slack delivers it again. The loop reconnects when Slack asks it to or
+    the connection drops, and exits once should_run() turns False, after
+    the handlers already started have finished.
+    """
+
+    def __init__(self, connect, handler, max_concurrency=8, should_run=lambda: True, poll_interval=1.0,
+                 reconnect_delay=1.0, max_reconnect_delay=30.0):
+        self.connect = connect
+        self.handler = handler
+        self.max_concurrency = max_concurrency
+        self.should_run = should_run
+        self.poll_interval = poll_interval
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.received = 0
+        self.acked = 0
+        self.rejected = 0
+        self.failed = 0
+        self.connections = 0
+
+    async def run(self):
+        """✅ Consume events until should_run() is False."""
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        tasks = set()
+        delay = self.reconnect_delay
+        while self.should_run():
+            try:
+                ws = await self.connect()
+            except Exception as e:
+                print(f"⚠️ Socket Mode connection failed ({e}), retrying in {delay:.0f}s...")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_reconnect_delay)
+                continue
+            self.connections += 1
+            delay = self.reconnect_delay
+            try:
+                await self._read(ws, semaphore, tasks)
+            except Exception as e:
+                print(f"⚠️ Socket Mode connection lost: {e}")
+            finally:
+                if tasks:
+                    await asyncio.gather(*tasks, return_exceptions=True)
+                await ws.close()
+        print("🛑 Socket Mode listener stopped.")
+
+    async def _read(self, ws, semaphore, tasks):
+        send_lock = asyncio.Lock()
+        while self.should_run():
+            try:
+                frame = await asyncio.wait_for(ws.recv(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                continue  # check the running flag again
+            envelope = json.loads(frame)
+            kind = envelope.get("type")
+            if kind == "disconnect":
+                return  # Slack is rotating the connection; reconnect
+            if "envelope_id" not in envelope:
+                continue  # hello and other control frames
+            self.received += 1
+            if kind != "events_api":
+                await self._ack(ws, send_lock, envelope)  # nothing to do, but Slack expects an ack
+                continue
+            await semaphore.acquire()
+            task = asyncio.ensure_future(self._handle(ws, send_lock, semaphore, envelope))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+    async def _handle(self, ws, send_lock, semaphore, envelope):
+        try:
+            accepted = await asyncio.get_running_loop().run_in_executor(None, self.handler, envelope["payload"])
+            if accepted is False:
+                self.rejected += 1
+                return
+            await self._ack(ws, send_lock, envelope)
+        except Exception as e:
+            self.failed += 1
+            print(f"⚠️ Error handling Socket Mode event: {e}")
+        finally:
+            semaphore.release()
+
+    async def _ack(self, ws, send_lock, envelope):
+        async with send_lock:
+            await ws.send(json.dumps({"envelope_id": envelope["envelope_id"]}))
+        self.acked += 1
+
+    def stats(self):
+        """Envelope counters."""
+        return {"connections": self.connections, "received": self.received, "acked": self.acked,
+                "rejected": self.rejected, "failed": self.failed}
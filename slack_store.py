@@ -0,0 +1,210 @@
+"""Local Slack history: messages in SQLite with an FTS5 index and per-channel sync marks."""
+import sqlite3
+import threading
+import time
+
+from digest import iter_channel_messages
+
+
+def fts_query(text):
+    """Quote every word so user input is matched literally instead of parsed as FTS5 syntax."""
+    return " ".join('"' + word.replace('"', '""') + '"' for word in text.split())
+
+
+class MessageStore:
+    """✅ Slack messages kept locally so digests and searches stop re-reading the API.
+
+    Every channel has a synced range (synced_from, synced_to]: the store
+    holds the complete history for it. sync_channel() only fetches what
+    lies outside that range. Live events extend the range as they arrive,
+    but only once the channel has been synced since this process started,
+    because events received before then may have gaps. Message text is
+    indexed with FTS5 for search().
+    """
+
+    def __init__(self, path="slack_bot.db", clock=time.time):
+        self.path = path
+        self.clock = clock
+        self.started_at = clock()
+        self.fetched = 0
+        self.live = 0
+        self._stats_lock = threading.Lock()
+        self._local = threading.local()
+        self._migrate()
+
+    def connection(self):
+        """✅ Return this thread's connection, opening it on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def close(self):
+        """Close this thread's connection."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def _migrate(self):
+        conn = self.connection()
+        with conn:
+            conn.execute("""
+            CREATE TABLE IF NOT EXISTS slack_messages (
+                id INTEGER PRIMARY KEY,
+                channel TEXT NOT NULL,
+                ts TEXT NOT NULL,
+                ts_num REAL NOT NULL,
+                user TEXT,
+                text TEXT,
+                thread_ts TEXT,
+                UNIQUE (channel, ts)
+            )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_slack_messages_channel_ts ON slack_messages (channel, ts_num)")
+            conn.execute("""
+            CREATE TABLE IF NOT EXISTS slack_channel_sync (
+                channel TEXT PRIMARY KEY,
+                synced_from REAL NOT NULL,
+                synced_to REAL NOT NULL
+            )
+            """)
+            # External-content FTS5 table kept in step with slack_messages by triggers
+            conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS slack_messages_fts USING fts5("
+                         "text, content='slack_messages', content_rowid='id', tokenize='unicode61 remove_diacritics 2')")
+            conn.execute("""
+            CREATE TRIGGER IF NOT EXISTS slack_messages_ai AFTER INSERT ON slack_messages BEGIN
+                INSERT INTO slack_messages_fts (rowid, text) VALUES (new.id, new.text);
+            END
+            """)
+            conn.execute("""
+            CREATE TRIGGER IF NOT EXISTS slack_messages_ad AFTER DELETE ON slack_messages BEGIN
+                INSERT INTO slack_messages_fts (slack_messages_fts, rowid, text) VALUES ('delete', old.id, old.text);
+            END
+            """)
+            conn.execute("""
+            CREATE TRIGGER IF NOT EXISTS slack_messages_au AFTER UPDATE OF text ON slack_messages BEGIN
+                INSERT INTO slack_messages_fts (slack_messages_fts, rowid, text) VALUES ('delete', old.id, old.text);
+                INSERT INTO slack_messages_fts (rowid, text) VALUES (new.id, new.text);
+            END
+            """)
+
+    @staticmethod
+    def _row(channel, message):
+        return (channel, message["ts"], float(message["ts"]), message.get("user"), message.get("text"),
+                message.get("thread_ts"))
+
+    def _upsert(self, conn, rows):
+        conn.executemany("""
+            INSERT INTO slack_messages (channel, ts, ts_num, user, text, thread_ts) VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (channel, ts) DO UPDATE SET text = excluded.text, user = excluded.user
+            WHERE slack_messages.text IS NOT excluded.text
+        """, rows)
+
+    def add_messages(self, channel, messages):
+        """✅ Upsert API messages for one channel in a single transaction; returns how many were given."""
+        rows = [self._row(channel, m) for m in messages if m.get("ts") and m.get("text")]
+        if rows:
+            conn = self.connection()
+            with conn:
+                self._upsert(conn, rows)
+        return len(rows)
+
+    def add_event(self, event):
+        """✅ Apply one live message event: new message, edit (message_changed) or deletion."""
+        channel = event.get("channel")
+        subtype = event.get("subtype")
+        conn = self.connection()
+        with conn:
+            if subtype == "message_deleted":
+                conn.execute("DELETE FROM slack_messages WHERE channel=? AND ts=?", (channel, event.get("deleted_ts")))
+                return
+            message = event.get("message", {}) if subtype == "message_changed" else event
+            if not message.get("ts") or not message.get("text"):
+                return
+            self._upsert(conn, [self._row(channel, message)])
+            if subtype is None:
+                # Extend the synced range only if nothing can be missing since the last sync
+                conn.execute("UPDATE slack_channel_sync SET synced_to = MAX(synced_to, ?) "
+                             "WHERE channel=? AND synced_to >= ?", (float(message["ts"]), channel, self.started_at))
+        with self._stats_lock:
+            self.live += 1
+
+    def synced_range(self, channel):
+        """(synced_from, synced_to) for a channel, or None if it was never synced."""
+        row = self.connection().execute("SELECT synced_from, synced_to FROM slack_channel_sync WHERE channel=?",
+                                        (channel,)).fetchone()
+        return tuple(row) if row else None
+
+    def sync_channel(self, client, channel, oldest, latest=None):
+        """✅ Make the store complete for (oldest, latest], fetching only the missing part; returns messages fetched."""
+        oldest = float(oldest)
+        latest = float(latest) if latest is not None else self.clock()
+        synced = self.synced_range(channel)
+        if synced and synced[0] <= oldest <= synced[1]:
+            start, synced_from = synced[1], synced[0]  # only the gap since the last sync
+        else:
+            start, synced_from = oldest, oldest
+        if start >= latest:
+            return 0
+
+        count = 0
+        batch = []
+        for message in iter_channel_messages(client, channel, f"{start:.6f}", latest=f"{latest:.6f}"):
+            batch.append(message)
+            if len(batch) >= 1000:
+                count += self.add_messages(channel, batch)
+                batch = []
+        count += self.add_messages(channel, batch)
+
+        conn = self.connection()
+        with conn:
+            conn.execute("""
+                INSERT INTO slack_channel_sync (channel, synced_from, synced_to) VALUES (?, ?, ?)
+                ON CONFLICT (channel) DO UPDATE SET synced_from = excluded.synced_from,
+                    synced_to = MAX(slack_channel_sync.synced_to, excluded.synced_to)
+            """, (channel, synced_from, latest))
+        with self._stats_lock:
+            self.fetched += count
+        return count
+
+    def texts(self, channel, oldest, latest=None):
+        """✅ Message texts in (oldest, latest], oldest first."""
+        latest = float(latest) if latest is not None else float("inf")
+        rows = self.connection().execute(
+            "SELECT text FROM slack_messages WHERE channel=? AND ts_num > ? AND ts_num <= ? ORDER BY ts_num",
+            (channel, float(oldest), latest))
+        return [text for (text,) in rows]
+
+    def search(self, query, channel=None, limit=20, offset=0):
+        """✅ Full-text search over stored messages, best matches first."""
+        if not query.strip():
+            return []
+        sql = """
+            SELECT m.channel, m.ts, m.user, m.text,
+                   snippet(slack_messages_fts, 0, '*', '*', '…', 12)
+            FROM slack_messages_fts JOIN slack_messages m ON m.id = slack_messages_fts.rowid
+            WHERE slack_messages_fts MATCH ?
+        """
+        params = [fts_query(query)]
+        if channel:
+            sql += " AND m.channel = ?"
+            params.append(channel)
+        sql += " ORDER BY bm25(slack_messages_fts) LIMIT ? OFFSET ?"
+        params += [limit, offset]
+        return [{"channel": c, "ts": ts, "user": user, "text": text, "snippet": snippet}
+                for c, ts, user, text, snippet in self.connection().execute(sql, params)]
+
+    def stats(self):
+        """✅ Stored messages and channels, plus messages fetched from the API and received live."""
+        conn = self.connection()
+        with self._stats_lock:
+            return {
+                "messages": conn.execute("SELECT COUNT(*) FROM slack_messages").fetchone()[0],
+                "channels_synced": conn.execute("SELECT COUNT(*) FROM slack_channel_sync").fetchone()[0],
+                "fetched": self.fetched,
+                "live": self.live,
+            }
@@ -0,0 +1,142 @@
+"""Slack user directory: LRU + TTL cache in front of users_info, with coalescing and persistence."""
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+
+class UserDirectory:
+    """✅ Resolves Slack user IDs to profiles with as few API calls as possible.
+
+    Profiles live in an LRU capped at max_size and expire after ttl seconds.
+    Concurrent lookups of the same uncached user share one users_info call.
+    With db_path set, profiles are also stored in SQLite and loaded back on
+    start so a restart begins warm.
+    """
+
+    def __init__(self, client, ttl=3600, max_size=10000, db_path=None):
+        self.client = client
+        self.ttl = ttl
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.coalesced = 0
+        self.api_calls = 0
+        self._cache = OrderedDict()  # user_id -> (expires_at, profile)
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._db = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            with self._db:
+                self._db.execute("""
+                CREATE TABLE IF NOT EXISTS slack_users (
+                    id TEXT PRIMARY KEY,
+                    name TEXT,
+                    real_name TEXT,
+                    expires_at REAL
+                )
+                """)
+            self._load()
+
+    def _load(self):
+        rows = self._db.execute("SELECT id, name, real_name, expires_at FROM slack_users WHERE expires_at > ? "
+                                "ORDER BY expires_at DESC LIMIT ?", (time.time(), self.max_size)).fetchall()
+        for user_id, name, real_name, expires_at in reversed(rows):
+            self._cache[user_id] = (expires_at, {"id": user_id, "name": name, "real_name": real_name})
+
+    def _store(self, profiles):
+        """Cache profiles (and persist them); caller holds no lock."""
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            for profile in profiles:
+                self._cache[profile["id"]] = (expires_at, profile)
+                self._cache.move_to_end(profile["id"])
+            while len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+        if self._db is not None:
+            with self._lock, self._db:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO slack_users (id, name, real_name, expires_at) VALUES (?, ?, ?, ?)",
+                    [(p["id"], p.get("name"), p.get("real_name"), expires_at) for p in profiles])
+
+    @staticmethod
+    def _profile(user):
+        return {"id": user["id"], "name": user.get("name"),
+                "real_name": user.get("real_name") or user.get("profile", {}).get("real_name")}
+
+    def get(self, user_id):
+        """✅ Return the cached profile for user_id, fetching it once if needed."""
+        with self._lock:
+            entry = self._cache.get(user_id)
+            if entry is not None:
+                if entry[0] > time.time():
+                    self._cache.move_to_end(user_id)
+                    self.hits += 1
+                    return entry[1]
+                del self._cache[user_id]
+                self.expired += 1
+            self.misses += 1
+            future = self._inflight.get(user_id)
+            leader = future is None
+            if leader:
+                future = self._inflight[user_id] = Future()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            with self._lock:
+                self.api_calls += 1
+            user = self.client.users_info(user=user_id)["user"]
+            profile = self._profile(user)
+            self._store([profile])
+            future.set_result(profile)
+            return profile
+        except Exception as e:
+            print(f"⚠️ Error fetching Slack user {user_id}: {e}")
+            profile = {"id": user_id, "name": None, "real_name": None}
+            future.set_result(profile)
+            return profile
+        finally:
+            with self._lock:
+                self._inflight.pop(user_id, None)
+
+    def get_name(self, user_id):
+        """✅ Return the user's real name, or User-<id> when Slack has none."""
+        return self.get(user_id).get("real_name") or f"User-{user_id}"
+
+    def prewarm(self, page_size=200):
+        """✅ Load the whole workspace through paginated users_list; returns the number of users cached."""
+        count, cursor = 0, None
+        while True:
+            kwargs = {"limit": page_size}
+            if cursor:
+                kwargs["cursor"] = cursor
+            with self._lock:
+                self.api_calls += 1
+            response = self.client.users_list(**kwargs)
+            members = [m for m in response.get("members", []) if not m.get("deleted")]
+            self._store([self._profile(m) for m in members])
+            count += len(members)
+            cursor = (response.get("response_metadata") or {}).get("next_cursor")
+            if not cursor:
+                return count
+
+    def stats(self):
+        """✅ Hit/miss counters and current size."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._cache),
+                "hits": self.hits,
+                "misses": self.misses,
+                "expired": self.expired,
+                "coalesced": self.coalesced,
+                "api_calls": self.api_calls,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
@@ -0,0 +1,103 @@
+"""Background processing for Slack events: bounded, per-channel ordered worker pool."""
+import queue
+import threading
+import time
+import zlib
+
+_STOP = object()
+
+
+class EventDispatcher:
+    """✅ Runs a handler over queued events on a fixed pool of worker threads.
+
+    Every worker owns a bounded queue and events are sharded by key
+    (the channel ID), so events from one channel are handled in arrival
+    order while different channels run in parallel. submit() never blocks
+    longer than put_timeout; a full queue rejects the event (backpressure)
+    and the caller decides what to tell Slack.
+    """
+
+    def __init__(self, handler, workers=4, max_queue=1000, put_timeout=0.0):
+        self.handler = handler
+        self.put_timeout = put_timeout
+        self.queues = [queue.Queue(maxsize=max_queue) for _ in range(workers)]
+        self.submitted = 0
+        self.processed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.max_depth = 0
+        self.busy_seconds = 0.0
+        self._lock = threading.Lock()
+        self._threads = [threading.Thread(target=self._run, args=(q,), name=f"slack-worker-{i}", daemon=True)
+                         for i, q in enumerate(self.queues)]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, event, key=""):
+        """✅ Queue an event for its key's worker; returns False when that queue is full."""
+        q = self.queues[zlib.crc32(str(key).encode("utf-8")) % len(self.queues)]
+        try:
+            if self.put_timeout:
+                q.put(event, timeout=self.put_timeout)
+            else:
+                q.put_nowait(event)
+        except queue.Full:
+            with self._lock:
+                self.rejected += 1
+            return False
+        with self._lock:
+            self.submitted += 1
+            self.max_depth = max(self.max_depth, q.qsize())
+        return True
+
+    def _run(self, q):
+        while True:
+            event = q.get()
+            try:
+                if event is _STOP:
+                    return
+                start = time.perf_counter()
+                try:
+                    self.handler(event)
+                    ok = True
+                except Exception as e:
+                    print(f"⚠️ Error processing Slack event: {e}")
+                    ok = False
+                with self._lock:
+                    self.busy_seconds += time.perf_counter() - start
+                    if ok:
+                        self.processed += 1
+                    else:
+                        self.failed += 1
+            finally:
+                q.task_done()
+
+    def queue_depth(self):
+        return sum(q.qsize() for q in self.queues)
+
+    def stats(self):
+        """✅ Counters and current queue depths."""
+        with self._lock:
+            return {
+                "workers": len(self.queues),
+                "queue_depth": self.queue_depth(),
+                "queue_depths": [q.qsize() for q in self.queues],
+                "max_queue_depth": self.max_depth,
+                "submitted": self.submitted,
+                "processed": self.processed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "busy_seconds": round(self.busy_seconds, 3),
+            }
+
+    def join(self):
+        """Wait until every queued event has been handled."""
+        for q in self.queues:
+            q.join()
+
+    def stop(self):
+        """Finish the queued events, then stop the workers."""
+        for q in self.queues:
+            q.put(_STOP)
+        for thread in self._threads:
+            thread.join()
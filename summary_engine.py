@@ -0,0 +1,183 @@
+"""Batched, cached email summarization on top of the BART summarization pipeline."""
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+MODEL_NAME = "facebook/bart-large-cnn"
+FALLBACK_SUMMARY = "Summary unavailable."
+
+
+def load_pipeline():
+    """✅ Load the local BART summarization pipeline."""
+    from transformers import pipeline
+    return pipeline("summarization", model=MODEL_NAME)
+
+
+def summary_max_length(text):
+    """Same length budget summarize_email has always used."""
+    return max(10, min(len(text) // 2, 100))
+
+
+class SummaryCache:
+    """✅ LRU cache of summaries keyed by a hash of the email content, persisted as JSON."""
+
+    def __init__(self, path=None, max_entries=10000):
+        self.path = path
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.dirty = False
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self.entries.update(json.load(f))
+            except (OSError, ValueError) as e:
+                print(f"⚠️ Ignoring unreadable summary cache {path}: {e}")
+            self._evict()
+
+    @staticmethod
+    def key(text):
+        return hashlib.sha256(f"{MODEL_NAME}\0{text}".encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            summary = self.entries.get(key)
+            if summary is not None:
+                self.entries.move_to_end(key)
+            return summary
+
+    def put(self, key, summary):
+        with self._lock:
+            self.entries[key] = summary
+            self.entries.move_to_end(key)
+            self._evict()
+            self.dirty = True
+
+    def _evict(self):
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def save(self):
+        """✅ Write the cache to disk atomically if it changed."""
+        if not self.path or not self.dirty:
+            return
+        with self._lock:
+            data = dict(self.entries)
+            self.dirty = False
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.path)
+
+
+# Per-process pipeline for the optional process-pool mode
+_worker_pipeline = None
+
+
+def _init_worker(pipeline_factory):
+    global _worker_pipeline
+    _worker_pipeline = pipeline_factory()
+
+
+def _run_batch(summarizer, texts, max_length, batch_size):
+    """Summarize texts sharing one length budget; fall back per item if the batch fails."""
+    try:
+        outputs = summarizer(texts, max_length=max_length, min_length=5, do_sample=False,
+                             truncation=True, batch_size=batch_size)
+        return [out["summary_text"] for out in outputs]
+    except Exception as e:
+        print(f"⚠️ Batch summarization error, retrying one by one: {e}")
+        summaries = []
+        for text in texts:
+            try:
+                summaries.append(summarizer(text, max_length=max_length, min_length=5,
+                                            do_sample=False, truncation=True)[0]["summary_text"])
+            except Exception as e:
+                print(f"⚠️ Summarization Error: {e}")
+                summaries.append(FALLBACK_SUMMARY)
+        return summaries
+
+
+def _run_batch_in_worker(texts, max_length, batch_size):
+    return _run_batch(_worker_pipeline, texts, max_length, batch_size)
+
+
+class SummaryEngine:
+    """✅ Summarizes many emails at once: cache first, then length-bucketed batches.
+
+    Bodies are grouped by their length budget so every pipeline call shares one
+    max_length, and sorted by length inside a bucket to keep padding low. With
+    processes > 0 the batches are spread across a process pool, each worker
+    loading its own pipeline through pipeline_factory (which must be picklable).
+    """
+
+    def __init__(self, pipeline=None, pipeline_factory=load_pipeline, cache_path="summary_cache.json",
+                 max_cache_entries=10000, batch_size=8, processes=0):
+        self._pipeline = pipeline
+        self.pipeline_factory = pipeline_factory
+        self.cache = SummaryCache(cache_path, max_cache_entries)
+        self.batch_size = batch_size
+        self.processes = processes
+        self._pool = None
+        self._lock = threading.Lock()
+
+    @property
+    def pipeline(self):
+        with self._lock:
+            if self._pipeline is None:
+                self._pipeline = self.pipeline_factory()
+            return self._pipeline
+
+    def _batches(self, texts):
+        buckets = {}
+        for text in sorted(texts, key=len):
+            buckets.setdefault(summary_max_length(text), []).append(text)
+        for max_length, bucket in buckets.items():
+            for start in range(0, len(bucket), self.batch_size):
+                yield bucket[start:start + self.batch_size], max_length
+
+    def _summarize_uncached(self, texts):
+        batches = list(self._batches(texts))
+        if self.processes:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.processes, initializer=_init_worker,
+                                                 initargs=(self.pipeline_factory,))
+            futures = [self._pool.submit(_run_batch_in_worker, batch, max_length, self.batch_size)
+                       for batch, max_length in batches]
+            results = [future.result() for future in futures]
+        else:
+            results = [_run_batch(self.pipeline, batch, max_length, self.batch_size) for batch, max_length in batches]
+        return {text: summary for (batch, _), summaries in zip(batches, results)
+                for text, summary in zip(batch, summaries)}
+
+    def summarize_many(self, texts, save=True):
+        """✅ Return one summary per text, in order."""
+        keys = [SummaryCache.key(text) for text in texts]
+        summaries = [self.cache.get(key) for key in keys]
+        missing = list(dict.fromkeys(text for text, summary in zip(texts, summaries) if summary is None))
+
+        if missing:
+            fresh = self._summarize_uncached(missing)
+            for i, text in enumerate(texts):
+                if summaries[i] is None:
+                    summaries[i] = fresh[text]
+            for text, summary in fresh.items():
+                if summary != FALLBACK_SUMMARY:
+                    self.cache.put(SummaryCache.key(text), summary)
+            if save:
+                self.cache.save()
+        return summaries
+
+    def summarize(self, text):
+        """✅ Summarize a single text."""
+        return self.summarize_many([text])[0]
+
+    def close(self):
+        """Persist the cache and stop the worker processes."""
+        self.cache.save()
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
@@ -0,0 +1,199 @@
+"""Tasks extracted from Slack: SQLite store with near-duplicate detection and paginated queries."""
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+import zlib
+
+import numpy as np
+
+SHINGLE_SIZE = 3
+NUM_BANDS = 8
+ROWS_PER_BAND = 4
+NEAR_DUPLICATE_JACCARD = 0.7
+
+_WORD = re.compile(r"\w+")
+_rng = np.random.default_rng(2024)
+# Multiply-shift hash family, one (a, b) pair per MinHash row
+_HASH_A = _rng.integers(1, 2 ** 63, NUM_BANDS * ROWS_PER_BAND, dtype=np.uint64) | np.uint64(1)
+_HASH_B = _rng.integers(0, 2 ** 63, NUM_BANDS * ROWS_PER_BAND, dtype=np.uint64)
+
+# One query per band so each uses its own (channel, bandN) index
+_CANDIDATES_SQL = " UNION ".join(
+    f"SELECT id, text FROM tasks WHERE channel = ? AND band{band} = ? AND status = 'open'" for band in range(NUM_BANDS))
+
+
+def shingles(text):
+    """✅ Character 3-grams of the normalized text (lowercase words joined by single spaces)."""
+    normalized = " ".join(_WORD.findall(text.lower()))
+    return {normalized[i:i + SHINGLE_SIZE] for i in range(max(1, len(normalized) - SHINGLE_SIZE + 1))}
+
+
+def jaccard(a, b):
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+
+def band_keys(shingle_set):
+    """✅ MinHash the shingles and fold every band of rows into one signed 64-bit LSH key.
+
+    Two texts with Jaccard similarity s share at least one band key with
+    probability 1 - (1 - s**4)**8: about 89% at 0.7, over 99% at 0.85 and
+    about 6% at 0.3.
+    """
+    hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingle_set), dtype=np.uint64,
+                         count=len(shingle_set))
+    with np.errstate(over="ignore"):
+        minhashes = ((np.outer(_HASH_A, hashes) + _HASH_B[:, None]) >> np.uint64(32)).min(axis=1)
+    keys = []
+    for band in range(NUM_BANDS):
+        rows = minhashes[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND].tobytes()
+        keys.append(int.from_bytes(hashlib.blake2b(rows, digest_size=8).digest(), "big", signed=True))
+    return keys
+
+
+class TaskStore:
+    """✅ Open tasks keyed by (channel, ts), with near-duplicates folded into the first report.
+
+    add() checks a new task against the channel's open tasks: candidates
+    come from indexed MinHash band keys, and a candidate whose character
+    3-grams have Jaccard similarity of at least `threshold` is a
+    duplicate. Otherwise the task is queued; queued tasks are written in
+    one transaction every batch_size tasks or flush_interval seconds, and
+    before every query. A near-duplicate is not stored again: it bumps
+    the original's mention count instead. Queries page with a keyset
+    cursor so they stay fast however many tasks there are.
+    """
+
+    def __init__(self, path="slack_bot.db", batch_size=100, flush_interval=1.0, threshold=NEAR_DUPLICATE_JACCARD):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.threshold = threshold
+        self.added = 0
+        self.duplicates = 0
+        self._pending = []  # [channel, user, ts, text, band keys, mentions, shingles]
+        self._pending_bands = {}  # (channel, band index, band key) -> pending entries
+        self._mentions = {}  # task id -> extra mentions not written yet
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        with self._db:
+            self._db.execute("""
+            CREATE TABLE IF NOT EXISTS tasks (
+                id INTEGER PRIMARY KEY,
+                channel TEXT NOT NULL,
+                user TEXT,
+                ts TEXT NOT NULL,
+                ts_num REAL NOT NULL,
+                text TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'open',
+                mentions INTEGER NOT NULL DEFAULT 1,
+                band0 INTEGER NOT NULL,
+                band1 INTEGER NOT NULL,
+                band2 INTEGER NOT NULL,
+                band3 INTEGER NOT NULL,
+                band4 INTEGER NOT NULL,
+                band5 INTEGER NOT NULL,
+                band6 INTEGER NOT NULL,
+                band7 INTEGER NOT NULL,
+                UNIQUE (channel, ts)
+            )
+            """)
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_tasks_user ON tasks (user, status, ts_num, id)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_tasks_channel ON tasks (channel, status, ts_num, id)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks (status, ts_num, id)")
+            for band in range(NUM_BANDS):
+                self._db.execute(f"CREATE INDEX IF NOT EXISTS idx_tasks_band{band} ON tasks (channel, band{band})")
+
+    def _find_duplicate(self, channel, keys, shingle_set):
+        """Id of a similar open task in the channel (or its pending entry), else None."""
+        for i, key in enumerate(keys):
+            for entry in self._pending_bands.get((channel, i, key), ()):
+                if jaccard(entry[6], shingle_set) >= self.threshold:
+                    return entry
+        rows = self._db.execute(_CANDIDATES_SQL, [param for key in keys for param in (channel, key)])
+        for task_id, text in rows:
+            if jaccard(shingles(text), shingle_set) >= self.threshold:
+                return task_id
+        return None
+
+    def add(self, channel, user, ts, text):
+        """✅ Queue a task; returns False when it is a near-duplicate of an open task in the channel."""
+        shingle_set = shingles(text)
+        keys = band_keys(shingle_set)
+        with self._lock:
+            duplicate = self._find_duplicate(channel, keys, shingle_set)
+            if duplicate is None:
+                entry = [channel, user, ts, text, keys, 1, shingle_set]
+                self._pending.append(entry)
+                for i, key in enumerate(keys):
+                    self._pending_bands.setdefault((channel, i, key), []).append(entry)
+                self.added += 1
+            elif isinstance(duplicate, list):
+                duplicate[5] += 1
+                self.duplicates += 1
+            else:
+                self._mentions[duplicate] = self._mentions.get(duplicate, 0) + 1
+                self.duplicates += 1
+            if len(self._pending) >= self.batch_size or time.monotonic() - self._last_flush >= self.flush_interval:
+                self._flush()
+            return duplicate is None
+
+    def _flush(self):
+        if self._pending or self._mentions:
+            with self._db:
+                self._db.executemany("""
+                    INSERT OR IGNORE INTO tasks (channel, user, ts, ts_num, text, mentions,
+                                                 band0, band1, band2, band3, band4, band5, band6, band7)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, [(channel, user, ts, float(ts), text, mentions, *keys)
+                      for channel, user, ts, text, keys, mentions, _ in self._pending])
+                self._db.executemany("UPDATE tasks SET mentions = mentions + ? WHERE id = ?",
+                                     [(count, task_id) for task_id, count in self._mentions.items()])
+        self._pending = []
+        self._pending_bands = {}
+        self._mentions = {}
+        self._last_flush = time.monotonic()
+
+    def flush(self):
+        """Write queued tasks now."""
+        with self._lock:
+            self._flush()
+
+    def query(self, user=None, channel=None, status="open", limit=50, cursor=None):
+        """✅ One page of tasks, newest first; returns (tasks, next_cursor or None)."""
+        sql = "SELECT id, channel, user, ts, text, status, mentions, ts_num FROM tasks WHERE status = ?"
+        params = [status]
+        if user:
+            sql += " AND user = ?"
+            params.append(user)
+        if channel:
+            sql += " AND channel = ?"
+            params.append(channel)
+        if cursor:
+            ts_num, task_id = cursor.split(":")
+            sql += " AND (ts_num, id) < (?, ?)"
+            params += [float(ts_num), int(task_id)]
+        sql += " ORDER BY ts_num DESC, id DESC LIMIT ?"
+        params.append(limit + 1)
+        with self._lock:
+            self._flush()
+            rows = self._db.execute(sql, params).fetchall()
+        tasks = [{"id": task_id, "channel": c, "user": u, "ts": ts, "text": text, "status": s, "mentions": m}
+                 for task_id, c, u, ts, text, s, m, _ in rows[:limit]]
+        next_cursor = f"{rows[limit - 1][7]!r}:{rows[limit - 1][0]}" if len(rows) > limit else None
+        return tasks, next_cursor
+
+    def set_status(self, task_id, status):
+        """✅ Mark a task done (or reopen it); returns False if there is no such task."""
+        with self._lock:
+            self._flush()
+            with self._db:
+                return self._db.execute("UPDATE tasks SET status = ? WHERE id = ?", (status, task_id)).rowcount > 0
+
+    def stats(self):
+        """✅ Counters and queued writes."""
+        with self._lock:
+            return {"added": self.added, "duplicates": self.duplicates, "pending": len(self._pending)}
@@ -0,0 +1,219 @@
+"""Event-driven WhatsApp Web capture: a MutationObserver flags new messages, one script reads them."""
+import threading
+import time
+
+import metrics
+from dedupe_store import DedupeStore
+
+# Installed once per page load. A message appended at the bottom of the open chat, or an unread
+# badge appearing or changing in the chat list, queues a {kind, chat, count} event in window.__waCapture.
+INSTALL_JS = r"""
+if (window.__waCapture) { return false; }
+var UNREAD = "span[aria-label*='unread message']";
+var state = window.__waCapture = {queue: []};
+
+function chatTitle() {
+    var title = document.querySelector("#main header span[title]")
+        || document.querySelector("#main header span.selectable-text");
+    return title ? (title.getAttribute("title") || title.innerText).trim() : null;
+}
+function pushMessage(node) {
+    // Rendering a whole chat adds every row at once; only the bottom one means "new message"
+    var row = node.closest("#main [role='row']");
+    if (row && !row.nextElementSibling) { state.queue.push({kind: "message", chat: chatTitle(), at: Date.now()}); }
+}
+function pushUnread(badge) {
+    var row = badge.closest("[role='listitem'], [role='row']");
+    var title = row && row.querySelector("span[title]");
+    if (title) {
+        state.queue.push({kind: "unread", chat: title.getAttribute("title"), count: parseInt(badge.innerText, 10) || 1,
+                          at: Date.now()});
+    }
+}
+function scan(node) {
+    if (node.nodeType !== 1) { return; }
+    if (node.matches("div.message-in")) { pushMessage(node); } else { node.querySelectorAll("div.message-in").forEach(pushMessage); }
+    if (node.matches(UNREAD)) { pushUnread(node); } else { node.querySelectorAll(UNREAD).forEach(pushUnread); }
+}
+
+new MutationObserver(function (mutations) {
+    mutations.forEach(function (mutation) {
+        if (mutation.type === "attributes") {
+            if (mutation.target.matches(UNREAD)) { pushUnread(mutation.target); }
+        } else {
+            mutation.addedNodes.forEach(scan);
+        }
+    });
+}).observe(document.body, {childList: true, subtree: true, attributes: true, attributeFilter: ["aria-label"]});
+document.querySelectorAll(UNREAD).forEach(pushUnread);
+return true;
+"""
+
+# One round trip: hand over everything buffered since the last drain (null if the page was reloaded)
+DRAIN_JS = r"""
+var state = window.__waCapture;
+if (!state) { return null; }
+var events = state.queue;
+state.queue = [];
+return events;
+"""
+
+OPEN_CHAT_JS = r"""
+var rows = document.querySelectorAll("#pane-side [role='listitem'], #pane-side [role='row']");
+for (var i = 0; i < rows.length; i++) {
+    var title = rows[i].querySelector("span[title]");
+    if (title && title.getAttribute("title") === arguments[0]) {
+        (rows[i].querySelector("[tabindex]") || rows[i]).click();
+        return true;
+    }
+}
+return false;
+"""
+
+# Everything the bot needs from the page in one call: the open chat, its incoming messages newer
+# than the cursor (walking up from the bottom, so the cost is the number of new rows, not the
+# chat length), the newest row id to use as the next cursor, and the unread chats in the list.
+# Message rows are the role="row" containers; the data-id sits on an element inside each one.
+EXTRACT_JS = r"""
+var cursor = arguments[0], limit = arguments[1];
+var title = document.querySelector("#main header span[title]")
+    || document.querySelector("#main header span.selectable-text");
+var chat = title ? (title.getAttribute("title") || title.innerText).trim() : null;
+var messages = [], newest = null, reachedCursor = false;
+var first = document.querySelector("#main [role='row']");
+for (var row = first ? first.parentElement.lastElementChild : null; row && messages.length < limit;
+     row = row.previousElementSibling) {
+    var holder = row.matches("[data-id]") ? row : row.querySelector("[data-id]");
+    var id = holder && holder.getAttribute("data-id");
+    if (!id) { continue; }
+    if (newest === null) { newest = id; }
+    if (id === cursor) { reachedCursor = true; break; }
+    var incoming = row.querySelector("div.message-in");
+    if (!incoming) { continue; }
+    var span = incoming.querySelector("span.selectable-text span, span[dir='ltr']");
+    var meta = incoming.querySelector("[data-pre-plain-text]");
+    var match = meta && /^\[([^\]]+)\]\s*([^:]+):/.exec(meta.getAttribute("data-pre-plain-text"));
+    messages.push({id: id, chat: chat, text: span ? span.innerText.trim() : "",
+                   sender: match ? match[2].trim() : chat, timestamp: match ? match[1] : null});
+}
+messages.reverse();
+var unread = [];
+document.querySelectorAll("#pane-side span[aria-label*='unread message']").forEach(function (badge) {
+    var item = badge.closest("[role='listitem'], [role='row']");
+    var titles = item ? item.querySelectorAll("span[title]") : [];
+    if (titles.length) {
+        unread.push({chat: titles[0].getAttribute("title"), count: parseInt(badge.innerText, 10) || 1,
+                     preview: titles.length > 1 ? titles[1].getAttribute("title") : null});
+    }
+});
+return {chat: chat, messages: messages, newest_id: newest, reached_cursor: reachedCursor, unread: unread};
+"""
+
+
+def extract_chat(driver, cursor=None, limit=50):
+    """✅ Read the open chat in one execute_script call.
+
+    Returns {"chat", "messages", "newest_id", "reached_cursor", "unread"}:
+    up to `limit` incoming messages newer than the row with data-id
+    `cursor` (the latest ones when there is no cursor), oldest first, each
+    with id, chat, sender, text and the raw WhatsApp timestamp, plus every
+    unread chat in the list with its count and message preview.
+    """
+    return driver.execute_script(EXTRACT_JS, cursor, limit)
+
+
+class MessageCapture:
+    """✅ Yields new WhatsApp messages without reloading the page or sleeping per chat.
+
+    install() puts a MutationObserver into the page and drain() collects
+    the chats it flagged in one round trip. Each flagged chat is opened if
+    needed (waiting for it to render by polling the DOM, not a fixed
+    sleep) and read with extract_chat() from its remembered cursor, so
+    every message newer than the last one seen is returned exactly once.
+    A chat seen for the first time yields as many of its latest messages
+    as its unread badge counted (the old loop only answered the last
+    one). Every page access happens under `lock`, so a sender in another
+    thread can share the driver by holding it around open() and the reply.
+    """
+
+    def __init__(self, driver, poll_interval=0.25, open_timeout=5.0, batch_limit=50, seen_window=86400):
+        self.driver = driver
+        self.poll_interval = poll_interval
+        self.open_timeout = open_timeout
+        self.batch_limit = batch_limit
+        self.seen = DedupeStore(window=seen_window, max_keys=50000)
+        self.cursors = {}  # chat -> data-id of the newest row already read
+        self.current_chat = None
+        self.drains = 0
+        self.installs = 0
+        self.chat_opens = 0
+        self.lock = threading.RLock()
+
+    def install(self):
+        """✅ Install the observer if this page load does not have it yet; returns True if it was installed now."""
+        installed = self.driver.execute_script(INSTALL_JS)
+        if installed:
+            self.installs += 1
+        return installed
+
+    def drain(self):
+        """✅ Return the buffered events, reinstalling the observer after a page reload."""
+        self.drains += 1
+        events = self.driver.execute_script(DRAIN_JS)
+        if events is None:
+            self.install()
+            return []
+        return events
+
+    def open(self, chat, cursor=None, limit=1):
+        """✅ Make chat the open one, waiting until it has rendered; returns its extract_chat() snapshot or None."""
+        with self.lock:
+            snapshot = extract_chat(self.driver, cursor, limit)
+            if snapshot["chat"] != chat:
+                if not self.driver.execute_script(OPEN_CHAT_JS, chat):
+                    print(f"⚠️ Chat not found in the list: {chat}")
+                    return None
+                self.chat_opens += 1
+                deadline = time.monotonic() + self.open_timeout
+                while snapshot["chat"] != chat or snapshot["newest_id"] is None:
+                    if time.monotonic() > deadline:
+                        print(f"⚠️ Timed out opening chat: {chat}")
+                        return None
+                    time.sleep(0.05)
+                    snapshot = extract_chat(self.driver, cursor, limit)
+            self.current_chat = chat
+            return snapshot
+
+    def read_chat(self, chat, unread=0):
+        """✅ Open chat if it is not on screen and return its messages newer than the cursor."""
+        cursor = self.cursors.get(chat)
+        with metrics.timer("whatsapp", "fetch"):
+            snapshot = self.open(chat, cursor, self.batch_limit if cursor else min(self.batch_limit, max(1, unread)))
+        if snapshot is None:
+            return []
+        if snapshot["newest_id"]:
+            self.cursors[chat] = snapshot["newest_id"]
+        return [m for m in snapshot["messages"] if m["text"] and self.seen.check_and_add(m["id"])]
+
+    def poll(self):
+        """✅ One drain; returns the new messages (id, chat, sender, text, timestamp) of every flagged chat."""
+        with self.lock:
+            chats = {}  # chat -> highest unread count seen, in the order they were flagged
+            for event in self.drain():
+                if event["chat"]:
+                    chats[event["chat"]] = max(chats.get(event["chat"], 0), event.get("count", 0))
+            return [message for chat, unread in chats.items() for message in self.read_chat(chat, unread)]
+
+    def messages(self, should_run=lambda: True):
+        """✅ Yield new messages until should_run() is False, draining every poll_interval when idle.
+
+        The lock is not held while a message is being handled, so another
+        chat may be open by then: reply with open(message["chat"]) first.
+        """
+        with self.lock:
+            self.install()
+        while should_run():
+            batch = self.poll()
+            yield from batch
+            if not batch:
+                time.sleep(self.poll_interval)
@@ -0,0 +1,198 @@
+"""WhatsApp reply pipeline: page reader -> reply workers -> one sender, joined by bounded queues."""
+import queue
+import threading
+import time
+
+_STOP = object()
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))] if ordered else 0.0
+
+
+class ReplyPipeline:
+    """✅ Answers WhatsApp messages without a slow reply holding up the page.
+
+    Three stages, each on its own thread(s):
+      reader   iterates `source` (e.g. MessageCapture.messages()) and queues
+               every message; it blocks while the incoming queue is full,
+               which stops it from reading further ahead than the workers.
+      workers  call respond(message) -> reply text or None (no reply); this
+               is where Gemini runs, `workers` calls at a time.
+      sender   the only stage that types into the page: send(chat, text).
+    Workers finish out of order, so the reader numbers each contact's
+    messages and the sender holds a reply back until every earlier message
+    from that contact has been answered (or skipped). A message whose
+    respond() raises is skipped rather than blocking the contact. The
+    sender sends whatever replies are ready grouped by contact, so a burst
+    costs one chat switch per contact rather than one per reply.
+    """
+
+    def __init__(self, source, respond, send, workers=4, max_queue=100, latency_window=10000):
+        self.source = source
+        self.respond = respond
+        self.send = send
+        self.incoming = queue.Queue(maxsize=max_queue)
+        self.outgoing = queue.Queue(maxsize=max_queue)
+        self.read = 0
+        self.replied = 0
+        self.skipped = 0
+        self.failed = 0
+        self.sent = 0
+        self.send_failed = 0
+        self.max_incoming = 0
+        self.max_outgoing = 0
+        self.max_held = 0
+        self.reader_blocked_seconds = 0.0
+        self.worker_busy_seconds = 0.0
+        self.sender_busy_seconds = 0.0
+        self.latencies = []  # seconds from read to sent, most recent latency_window
+        self.latency_window = latency_window
+        self.started_at = None
+        self.finished_at = None
+        self.workers = workers
+        self._lock = threading.Lock()
+        self._workers_left = workers
+        self._threads = [threading.Thread(target=self._read, name="wa-reader", daemon=True)]
+        self._threads += [threading.Thread(target=self._work, name=f"wa-worker-{i}", daemon=True)
+                          for i in range(workers)]
+        self._threads.append(threading.Thread(target=self._send, name="wa-sender", daemon=True))
+
+    def start(self):
+        """✅ Start every stage; the pipeline drains and stops once the source is exhausted."""
+        self.started_at = time.monotonic()
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def join(self):
+        """Wait until the source is exhausted and every reply has been sent."""
+        for thread in self._threads:
+            thread.join()
+
+    def run(self):
+        """✅ start() and join()."""
+        self.start().join()
+        return self
+
+    def _read(self):
+        sequence = {}  # chat -> number of messages read so far
+        try:
+            for message in self.source:
+                chat = message["chat"]
+                seq = sequence.get(chat, 0)
+                sequence[chat] = seq + 1
+                start = time.monotonic()
+                self.incoming.put((seq, time.monotonic(), message))
+                with self._lock:
+                    self.read += 1
+                    self.reader_blocked_seconds += time.monotonic() - start
+                    self.max_incoming = max(self.max_incoming, self.incoming.qsize())
+        except Exception as e:
+            print(f"⚠️ WhatsApp reader stopped: {e}")
+        finally:
+            for _ in range(self.workers):
+                self.incoming.put(_STOP)
+
+    def _work(self):
+        while True:
+            item = self.incoming.get()
+            if item is _STOP:
+                break
+            seq, read_at, message = item
+            start = time.monotonic()
+            try:
+                reply = self.respond(message)
+                outcome = "replied" if reply else "skipped"
+            except Exception as e:
+                print(f"⚠️ Error generating reply for {message['chat']}: {e}")
+                reply, outcome = None, "failed"
+            with self._lock:
+                self.worker_busy_seconds += time.monotonic() - start
+                setattr(self, outcome, getattr(self, outcome) + 1)
+            self.outgoing.put((seq, read_at, message["chat"], reply))
+            with self._lock:
+                self.max_outgoing = max(self.max_outgoing, self.outgoing.qsize())
+        with self._lock:
+            self._workers_left -= 1
+            last = self._workers_left == 0
+        if last:
+            self.outgoing.put(_STOP)
+
+    def _send(self):
+        expected = {}  # chat -> next sequence number to send
+        held = {}  # chat -> {seq: (read_at, reply)} finished ahead of an earlier message
+        stopping = False
+        while not stopping:
+            # Take everything that is ready, then send it chat by chat to save switching chats
+            items = [self.outgoing.get()]
+            while True:
+                try:
+                    items.append(self.outgoing.get_nowait())
+                except queue.Empty:
+                    break
+            ready = {}  # chat -> [(read_at, reply)] in order
+            for item in items:
+                if item is _STOP:
+                    stopping = True
+                    continue
+                seq, read_at, chat, reply = item
+                pending = held.setdefault(chat, {})
+                pending[seq] = (read_at, reply)
+                while expected.get(chat, 0) in pending:
+                    ready.setdefault(chat, []).append(pending.pop(expected.get(chat, 0)))
+                    expected[chat] = expected.get(chat, 0) + 1
+                if not pending:
+                    del held[chat]
+            with self._lock:
+                self.max_held = max(self.max_held, sum(len(p) for p in held.values()))
+            for chat, replies in ready.items():
+                for read_at, reply in replies:
+                    if reply:
+                        self._deliver(chat, reply, read_at)
+        self.finished_at = time.monotonic()
+
+    def _deliver(self, chat, reply, read_at):
+        start = time.monotonic()
+        try:
+            self.send(chat, reply)
+            ok = True
+        except Exception as e:
+            print(f"⚠️ Error sending reply to {chat}: {e}")
+            ok = False
+        now = time.monotonic()
+        with self._lock:
+            self.sender_busy_seconds += now - start
+            if ok:
+                self.sent += 1
+                self.latencies.append(now - read_at)
+                if len(self.latencies) > self.latency_window:
+                    del self.latencies[:len(self.latencies) - self.latency_window]
+            else:
+                self.send_failed += 1
+
+    def stats(self):
+        """✅ Stage counters, queue depths, throughput and read-to-sent latency."""
+        with self._lock:
+            elapsed = ((self.finished_at or time.monotonic()) - self.started_at) if self.started_at else 0.0
+            return {
+                "workers": self.workers,
+                "read": self.read,
+                "replied": self.replied,
+                "skipped": self.skipped,
+                "failed": self.failed,
+                "sent": self.sent,
+                "send_failed": self.send_failed,
+                "incoming_depth": self.incoming.qsize(),
+                "outgoing_depth": self.outgoing.qsize(),
+                "max_incoming_depth": self.max_incoming,
+                "max_outgoing_depth": self.max_outgoing,
+                "max_held_for_order": self.max_held,
+                "reader_blocked_seconds": round(self.reader_blocked_seconds, 3),
+                "worker_busy_seconds": round(self.worker_busy_seconds, 3),
+                "sender_busy_seconds": round(self.sender_busy_seconds, 3),
+                "sent_per_second": round(self.sent / elapsed, 2) if elapsed else 0.0,
+                "latency_p50_ms": round(_percentile(self.latencies, 50) * 1000),
+                "latency_p95_ms": round(_percentile(self.latencies, 95) * 1000),
+            }
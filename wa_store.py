@@ -0,0 +1,173 @@
+"""WhatsApp chat history: messages keyed by (contact, message id) with bounded dedupe and retention."""
+import sqlite3
+import threading
+import time
+
+from dedupe_store import DedupeStore
+
+
+class ChatStore:
+    """✅ Incoming WhatsApp messages in SQLite, each stored and answered once.
+
+    A message is identified by its contact and WhatsApp message id (the
+    row's data-id), never by its text, so the same "hi" from two contacts
+    is two messages. add() checks a DedupeStore first (in memory, O(1),
+    bounded to dedupe_window seconds and persisted to its own indexed
+    table so restarts keep it), then queues the row; queued rows are
+    written in one transaction every batch_size messages or
+    flush_interval seconds. compact() deletes messages older than
+    retention_days and beyond keep_per_contact per contact and hands the
+    freed pages back to the filesystem; it runs on its own every
+    compact_interval seconds.
+    """
+
+    def __init__(self, path="whatsapp_chat.db", retention_days=90, keep_per_contact=None, dedupe_window=7 * 86400,
+                 batch_size=50, flush_interval=1.0, compact_interval=3600, clock=time.time):
+        self.path = path
+        self.retention_days = retention_days
+        self.keep_per_contact = keep_per_contact
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.compact_interval = compact_interval
+        self.clock = clock
+        self.added = 0
+        self.duplicates = 0
+        self.compacted = 0
+        self.migrated = 0
+        self._pending = []
+        self._last_flush = clock()
+        self._last_compact = clock()
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._migrate()
+        self.seen = DedupeStore(window=dedupe_window, max_keys=200000, db_path=path, table="wa_seen_messages",
+                                clock=clock)
+
+    def _migrate(self):
+        if self._db.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            # Incremental auto-vacuum lets compact() shrink the file; switching an existing file needs one VACUUM
+            self._db.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            self._db.execute("VACUUM")
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        with self._db:
+            self._db.execute("""
+            CREATE TABLE IF NOT EXISTS wa_messages (
+                id INTEGER PRIMARY KEY,
+                contact TEXT NOT NULL,
+                msg_id TEXT NOT NULL,
+                sender TEXT,
+                text TEXT NOT NULL,
+                received_at REAL NOT NULL,
+                UNIQUE (contact, msg_id)
+            )
+            """)
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_wa_messages_contact ON wa_messages (contact, received_at)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_wa_messages_received ON wa_messages (received_at)")
+            legacy = self._db.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='chats'").fetchone()
+            if legacy:
+                # The old table had no message ids and was unique on the text; keep its rows under synthetic ids
+                self.migrated = self._db.execute("""
+                    INSERT OR IGNORE INTO wa_messages (contact, msg_id, sender, text, received_at)
+                    SELECT COALESCE(sender, 'Unknown'), 'legacy-' || id, sender, message,
+                           COALESCE(CAST(strftime('%s', timestamp) AS REAL), 0)
+                    FROM chats WHERE message IS NOT NULL
+                """).rowcount
+                self._db.execute("DROP TABLE chats")
+        if self.migrated:
+            print(f"📦 Moved {self.migrated} messages from the old chats table.")
+
+    def add(self, contact, msg_id, text, sender=None):
+        """✅ Queue a message; returns False if (contact, msg_id) was already added."""
+        if not self.seen.check_and_add(f"{contact}\x1f{msg_id}"):
+            with self._lock:
+                self.duplicates += 1
+            return False
+        now = self.clock()
+        with self._lock:
+            self._pending.append((contact, msg_id, sender or contact, text, now))
+            self.added += 1
+            if len(self._pending) >= self.batch_size or now - self._last_flush >= self.flush_interval:
+                self._flush(now)
+        return True
+
+    def _flush(self, now):
+        if self._pending:
+            with self._db:
+                self._db.executemany("""
+                    INSERT OR IGNORE INTO wa_messages (contact, msg_id, sender, text, received_at)
+                    VALUES (?, ?, ?, ?, ?)
+                """, self._pending)
+            self._pending = []
+        self._last_flush = now
+        if self.compact_interval and now - self._last_compact >= self.compact_interval:
+            self._compact(now)
+
+    def flush(self):
+        """Write queued messages now."""
+        with self._lock:
+            self._flush(self.clock())
+
+    def history(self, contact, limit=50, before=None):
+        """✅ A contact's latest messages, newest first; pass the last received_at as `before` for the next page."""
+        sql = "SELECT msg_id, sender, text, received_at FROM wa_messages WHERE contact = ?"
+        params = [contact]
+        if before is not None:
+            sql += " AND received_at < ?"
+            params.append(before)
+        sql += " ORDER BY received_at DESC LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            self._flush(self.clock())
+            rows = self._db.execute(sql, params).fetchall()
+        return [{"msg_id": msg_id, "sender": sender, "text": text, "received_at": received_at}
+                for msg_id, sender, text, received_at in rows]
+
+    def _compact(self, now):
+        removed = 0
+        with self._db:
+            if self.retention_days:
+                removed += self._db.execute("DELETE FROM wa_messages WHERE received_at < ?",
+                                            (now - self.retention_days * 86400,)).rowcount
+            if self.keep_per_contact:
+                removed += self._db.execute("""
+                    DELETE FROM wa_messages WHERE id IN (
+                        SELECT id FROM (
+                            SELECT id, ROW_NUMBER() OVER (PARTITION BY contact ORDER BY received_at DESC, id DESC) AS n
+                            FROM wa_messages
+                        ) WHERE n > ?
+                    )
+                """, (self.keep_per_contact,)).rowcount
+        if removed:
+            self._db.execute("PRAGMA incremental_vacuum").fetchall()
+            self._db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        self.compacted += removed
+        self._last_compact = now
+        return removed
+
+    def compact(self):
+        """✅ Apply retention now; returns how many messages were deleted."""
+        with self._lock:
+            self._flush(self.clock())
+            return self._compact(self.clock())
+
+    def close(self):
+        """Write queued messages and close the database."""
+        self.flush()
+        self.seen.flush()
+        self._db.close()
+
+    def stats(self):
+        """✅ Stored messages and contacts, counters and file size."""
+        with self._lock:
+            page_count = self._db.execute("PRAGMA page_count").fetchone()[0]
+            page_size = self._db.execute("PRAGMA page_size").fetchone()[0]
+            return {
+                "messages": self._db.execute("SELECT COUNT(*) FROM wa_messages").fetchone()[0],
+                "contacts": self._db.execute("SELECT COUNT(DISTINCT contact) FROM wa_messages").fetchone()[0],
+                "added": self.added,
+                "duplicates": self.duplicates,
+                "pending": len(self._pending),
+                "compacted": self.compacted,
+                "db_bytes": page_count * page_size,
+            }
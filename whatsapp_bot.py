@@ -1,55 +1,149 @@
 
 import os
+import threading
 import time
-import sqlite3
-import google.generativeai as genai
 from dotenv import load_dotenv
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.common.by import By
-from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
-from collections import deque
+from llm_gateway import LLMGateway
+import metrics
+from wa_capture import MessageCapture, extract_chat
+from wa_pipeline import ReplyPipeline
+from wa_store import ChatStore
 
 # 🔹 Load API Key from .env
 load_dotenv()
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-genai.configure(api_key=GEMINI_API_KEY)
-
-# 🔹 Initialize SQLite Database
-conn = sqlite3.connect("whatsapp_chat.db", check_same_thread=False)
-cursor = conn.cursor()
-cursor.execute("""
-CREATE TABLE IF NOT EXISTS chats (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    sender TEXT,
-    message TEXT UNIQUE,
-    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
-)
-""")
-conn.commit()
-
-# 🔹 Initialize Selenium WebDriver
-service = Service(ChromeDriverManager().install())
-driver = webdriver.Chrome(service=service)
-driver.get("https://web.whatsapp.com")
-
-input("🔹 Scan QR Code and press Enter to continue...")
-
-# ✅ Store processed messages efficiently
-processed_messages = deque(maxlen=50)
-
-def send_reply(message):
+
+# 🔹 Gemini calls go through one gateway: response cache, rate limit and concurrency cap
+LLM_RATE_PER_MINUTE = float(os.getenv("LLM_RATE_PER_MINUTE", "60"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", "3600"))
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", "1024"))
+
+# 🔹 "observer" reads new messages through a MutationObserver; "poll" is the old refresh-and-sleep loop
+WA_CAPTURE_MODE = os.getenv("WA_CAPTURE_MODE", "observer")
+WA_POLL_INTERVAL = float(os.getenv("WA_POLL_INTERVAL", "0.25"))
+
+# 🔹 Observer mode answers through a pipeline: replies are generated by WA_WORKERS threads, one thread types them
+WA_WORKERS = int(os.getenv("WA_WORKERS", "4"))
+WA_QUEUE_SIZE = int(os.getenv("WA_QUEUE_SIZE", "100"))
+
+# 🔹 Chat history: messages older than WA_RETENTION_DAYS (and beyond WA_KEEP_PER_CONTACT, if set) are compacted away
+WA_DB_PATH = os.getenv("WA_DB_PATH", "whatsapp_chat.db")
+WA_RETENTION_DAYS = float(os.getenv("WA_RETENTION_DAYS", "90"))
+WA_KEEP_PER_CONTACT = int(os.getenv("WA_KEEP_PER_CONTACT", "0")) or None
+WA_DEDUPE_WINDOW = int(os.getenv("WA_DEDUPE_WINDOW", str(7 * 86400)))
+
+# 🔹 Canned answers, matched by similarity and reloaded when the file changes; anything else goes to Gemini
+WA_FAQ_PATH = os.getenv("WA_FAQ_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "faq.json"))
+WA_FAQ_THRESHOLD = float(os.getenv("WA_FAQ_THRESHOLD", "0.6"))
+
+# 🔹 Heavy resources (Gemini, Chrome) are loaded on first use, see the accessors below
+_resources_lock = threading.Lock()
+_gemini_models = {}
+_llm_gateway = None
+_capture = None
+_driver = None
+_pipeline = None
+_chat_store = None
+_faq_index = None
+
+
+
+def get_driver():
+    """Starts Chrome with WhatsApp Web on first use and waits for the QR code scan."""
+    global _driver
+    with _resources_lock:
+        if _driver is None:
+            from selenium import webdriver
+            from selenium.webdriver.chrome.service import Service
+            from webdriver_manager.chrome import ChromeDriverManager
+
+            # 🔹 Initialize Selenium WebDriver
+            service = Service(ChromeDriverManager().install())
+            _driver = webdriver.Chrome(service=service)
+            _driver.get("https://web.whatsapp.com")
+
+            input("🔹 Scan QR Code and press Enter to continue...")
+        return _driver
+
+
+def get_gemini_model(name="gemini-pro"):
+    """Configures Gemini once and returns a reusable model handle."""
+    with _resources_lock:
+        if name not in _gemini_models:
+            import google.generativeai as genai
+            if not _gemini_models:
+                genai.configure(api_key=GEMINI_API_KEY)
+            _gemini_models[name] = genai.GenerativeModel(name)
+        return _gemini_models[name]
+
+
+def get_llm_gateway():
+    """Returns the shared Gemini gateway (cache, rate limit, retries)."""
+    global _llm_gateway
+    with _resources_lock:
+        if _llm_gateway is None:
+            _llm_gateway = LLMGateway(get_gemini_model, default_model="gemini-pro",
+                                      rate_per_minute=LLM_RATE_PER_MINUTE, max_concurrency=LLM_MAX_CONCURRENCY,
+                                      cache_ttl=LLM_CACHE_TTL, cache_size=LLM_CACHE_SIZE)
+        return _llm_gateway
+
+
+def get_chat_store():
+    """Returns the WhatsApp chat store, moving rows over from the old chats table on first use."""
+    global _chat_store
+    with _resources_lock:
+        if _chat_store is None:
+            _chat_store = ChatStore(WA_DB_PATH, retention_days=WA_RETENTION_DAYS, keep_per_contact=WA_KEEP_PER_CONTACT,
+                                    dedupe_window=WA_DEDUPE_WINDOW)
+        return _chat_store
+
+
+def get_faq_index():
+    """Returns the FAQ index, built from WA_FAQ_PATH on first use."""
+    global _faq_index
+    with _resources_lock:
+        if _faq_index is None:
+            from faq_index import ReloadingFaqIndex
+            _faq_index = ReloadingFaqIndex(WA_FAQ_PATH, threshold=WA_FAQ_THRESHOLD)
+        return _faq_index
+
+
+def get_capture():
+    """Returns the MutationObserver-based message capture for the WhatsApp Web page."""
+    global _capture
+    driver = get_driver()
+    with _resources_lock:
+        if _capture is None:
+            _capture = MessageCapture(driver, poll_interval=WA_POLL_INTERVAL)
+        return _capture
+
+
+def warm_up():
+    """Loads Gemini and opens WhatsApp Web up front, for long-running deployments."""
+    get_llm_gateway().model()
+    get_chat_store()
+    get_faq_index()
+    get_driver()
+    print("🔥 WhatsApp bot ready.")
+
+def send_reply(message, pause=1):
     """Sends a reply in the current chat."""
     try:
-        message_box = WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located((By.XPATH, "//footer//div[@contenteditable='true']"))
-        )
-        message_box.send_keys(message)
-        time.sleep(1)
-        message_box.send_keys(Keys.ENTER)
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.common.keys import Keys
+        from selenium.webdriver.support.ui import WebDriverWait
+        from selenium.webdriver.support import expected_conditions as EC
+
+        with metrics.timer("whatsapp", "send"):
+            message_box = WebDriverWait(get_driver(), 10).until(
+                EC.presence_of_element_located((By.XPATH, "//footer//div[@contenteditable='true']"))
+            )
+            message_box.send_keys(message)
+            if pause:
+                time.sleep(pause)
+            message_box.send_keys(Keys.ENTER)
+        metrics.count("whatsapp", "sent")
         print("✅ Reply sent successfully!")
     except Exception as e:
         print(f"⚠️ Error sending reply: {str(e)}")
@@ -57,10 +151,15 @@ def send_reply(message):
 def send_whatsapp_message(contact, message):
     """Send WhatsApp message to a contact."""
     try:
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.common.keys import Keys
+        from selenium.webdriver.support.ui import WebDriverWait
+        from selenium.webdriver.support import expected_conditions as EC
+
         print(f"🔍 Searching for contact: {contact}")
 
         # Locate and enter contact name in search box
-        search_box = WebDriverWait(driver, 15).until(
+        search_box = WebDriverWait(get_driver(), 15).until(
             EC.presence_of_element_located((By.XPATH, "//div[@title='Search input textbox']"))
         )
         search_box.clear()
@@ -78,6 +177,11 @@ def send_whatsapp_message(contact, message):
 def get_unread_chats():
     """Finds unread chats and refreshes elements before accessing."""
     try:
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support.ui import WebDriverWait
+        from selenium.webdriver.support import expected_conditions as EC
+
+        driver = get_driver()
         time.sleep(2)  # Allow elements to fully load
         driver.refresh()  # Ensure the page is up-to-date
         WebDriverWait(driver, 10).until(
@@ -89,44 +193,90 @@ def get_unread_chats():
         return []
 
 def get_latest_message():
-    """Extracts the latest message and sender name."""
+    """Extracts the sender name, the latest message and its WhatsApp message id."""
     try:
+        driver = get_driver()
         time.sleep(2)
 
-        # Extract sender's name
-        sender_elements = driver.find_elements(By.XPATH, "//header//span[contains(@class, 'selectable-text')]")
-        sender_name = sender_elements[0].text if sender_elements else "Unknown"
+        # Chat name and latest incoming message in one script call, however long the chat is
+        with metrics.timer("whatsapp", "fetch"):
+            snapshot = extract_chat(driver, limit=1)
+        sender_name = snapshot["chat"] or "Unknown"
+        if not snapshot["messages"]:
+            return sender_name, None, None
 
-        # Extract latest message text
-        messages = driver.find_elements(By.XPATH, "//div[contains(@class, 'message-in')]//span[@dir='ltr']")
-        if not messages:
-            return sender_name, None
-        
-        last_message = messages[-1].text.strip()
-        return sender_name, last_message.encode('utf-8', 'ignore').decode('utf-8')  # Handle special characters
+        last = snapshot["messages"][-1]
+        last_message = last["text"].encode('utf-8', 'ignore').decode('utf-8')  # Handle special characters
+        return sender_name, last_message, last["id"]
 
     except Exception as e:
         print(f"⚠️ Error getting latest message: {str(e)}")
-        return "Unknown", None
+        return "Unknown", None, None
 
 def summarize_text(text):
     """Summarizes long messages using Gemini AI."""
     try:
-        model = genai.GenerativeModel("gemini-pro")
-        summary = model.generate_content(f"Summarize this text: {text}")
-        return summary.text if summary else "Summary unavailable."
+        with metrics.timer("whatsapp", "summarize"):
+            summary = get_llm_gateway().generate(f"Summarize this text: {text}")
+        return summary or "Summary unavailable."
     except Exception as e:
         return f"⚠️ Summarization Error: {str(e)}"
 
 def generate_ai_response(text):
     """Generates AI-based responses using Gemini."""
     try:
-        model = genai.GenerativeModel("gemini-pro")
-        response = model.generate_content(text)
-        return response.text if response else "I couldn't process your request."
+        with metrics.timer("whatsapp", "llm"):
+            response = get_llm_gateway().generate(text)
+        return response or "I couldn't process your request."
     except Exception as e:
         return f"⚠️ AI Error: {str(e)}"
 
+def respond_to_message(sender, message, pause=1):
+    """Answers a message in the open chat."""
+    reply = compose_reply(sender, message)
+    if reply:
+        send_reply(reply, pause)
+
+def compose_reply(sender, message):
+    """Returns the reply text for a message, without touching the page."""
+    print(f"📩 New message from {sender}: {message}")
+
+    # Summarize long messages
+    if len(message) > 100:
+        summarized_text = summarize_text(message)
+        metrics.count("whatsapp", "summarized")
+        return f"🔹 Summary: {summarized_text}"
+
+    # Greetings and customer service queries, answered locally from the FAQ file
+    with metrics.timer("whatsapp", "classify"):
+        answer = get_faq_index().answer(message)
+    if answer:
+        metrics.count("whatsapp", "faq_answered")
+        return answer
+
+    # Generate AI response for other queries
+    metrics.count("whatsapp", "llm_answered")
+    return generate_ai_response(message)
+
+def answer_incoming(incoming):
+    """Records a captured message and returns its reply, or None if this message id was already answered."""
+    with metrics.timer("whatsapp", "db_write"):
+        added = get_chat_store().add(incoming["chat"], incoming["id"], incoming["text"], incoming.get("sender"))
+    if not added:
+        metrics.count("whatsapp", "duplicates")
+        return None
+    return compose_reply(incoming["sender"], incoming["text"])
+
+def send_to_chat(chat, message):
+    """Sends a message to a chat from the pipeline's sender thread, opening the chat first if needed."""
+    capture = get_capture()
+    with capture.lock:  # the reader uses the same page
+        if capture.open(chat) is not None:
+            send_reply(message, pause=0)
+            return
+        send_whatsapp_message(chat, message)  # not in the chat list: fall back to search
+        capture.current_chat = None
+
 def handle_chat():
     """Processes incoming messages and replies accordingly."""
     while True:
@@ -140,48 +290,16 @@ def handle_chat():
             try:
                 chat.click()
                 time.sleep(2)
-                sender, message = get_latest_message()
-                if not message or message in processed_messages:
+                sender, message, msg_id = get_latest_message()
+                if not message:
                     continue
-
-                processed_messages.append(message)
-
-                print(f"📩 New message from {sender}: {message}")
-                cursor.execute("INSERT OR IGNORE INTO chats (sender, message) VALUES (?, ?)", (sender, message))
-                conn.commit()
-
-                # Auto-reply logic
-                auto_replies = {
-                    "hi": "Hello! How can I assist you today? 😊",
-                    "hello": "Hi there! Need any help? 🚀",
-                    "how are you": "I'm an AI assistant, always ready to help! 🤖"
-                }
-                if message.lower() in auto_replies:
-                    send_reply(auto_replies[message.lower()])
+                with metrics.timer("whatsapp", "db_write"):
+                    added = get_chat_store().add(sender, msg_id, message)
+                if not added:
+                    metrics.count("whatsapp", "duplicates")
                     continue
 
-                # Summarize long messages
-                if len(message) > 100:
-                    summarized_text = summarize_text(message)
-                    send_reply(f"🔹 Summary: {summarized_text}")
-                    continue
-
-                # Customer service queries
-                common_questions = {
-                    "what are your services?": "We offer AI-powered chat automation, smart replies, and data analytics! 🚀",
-                    "how to contact support?": "You can reach us at support@example.com or call +1234567890 📞",
-                    "where are you located?": "We are based in Bangalore, India! 🌍"
-                }
-
-                for question, answer in common_questions.items():
-                    if question in message.lower():
-                        send_reply(answer)
-                        break
-                else:
-                    # Generate AI response for other queries
-                    ai_response = generate_ai_response(message)
-                    send_reply(ai_response)
-
+                respond_to_message(sender, message)
                 time.sleep(1)
             except Exception as e:
                 print(f"⚠️ Error processing chat: {str(e)}")
@@ -190,11 +308,28 @@ def handle_chat():
         print("🔄 Refreshing unread messages list...")
         time.sleep(2)
 
-try:
-    while True:
-        handle_chat()
-        time.sleep(5)
-except KeyboardInterrupt:
-    print("\n🚀 Bot Stopped. Closing database...")
-    conn.close()
-    driver.quit()
+def handle_chat_events(should_run=lambda: True):
+    """Answers messages as the page reports them; a slow Gemini reply no longer holds up other chats."""
+    global _pipeline
+    _pipeline = ReplyPipeline(get_capture().messages(should_run), answer_incoming, send_to_chat,
+                              workers=WA_WORKERS, max_queue=WA_QUEUE_SIZE)
+    _pipeline.run()
+
+if __name__ == "__main__":
+    try:
+        warm_up()
+        if WA_CAPTURE_MODE == "poll":
+            while True:
+                handle_chat()
+                time.sleep(5)
+        handle_chat_events()
+    except KeyboardInterrupt:
+        if _pipeline is not None:
+            print(f"📊 Pipeline: {_pipeline.stats()}")
+        if _faq_index is not None:
+            print(f"📊 FAQ: {_faq_index.stats()}")
+        print("\n🚀 Bot Stopped. Closing database...")
+        if _chat_store is not None:
+            _chat_store.close()
+        if _driver is not None:
+            _driver.quit()